@@ -0,0 +1,79 @@
+import json
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator
+from bson import ObjectId
+from flask import Response, request, stream_with_context
+from app.core.config import STREAM_BATCH_SIZE
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_document(document: Dict[str, Any]) -> str:
+    return json.dumps(document, default=_json_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def wants_ndjson() -> bool:
+    return request.args.get('format', '').lower() == 'ndjson' or NDJSON_MIMETYPE in request.headers.get('Accept', '')
+
+
+def iter_json_array(documents: Iterable[Dict[str, Any]], chunk_size: int = STREAM_BATCH_SIZE,
+                    counter: Dict[str, int] = None) -> Iterator[str]:
+    counter = counter if counter is not None else {}
+    counter['count'] = 0
+    separator = '['
+    chunk = []
+    for document in documents:
+        chunk.append(encode_document(document))
+        if len(chunk) >= chunk_size:
+            counter['count'] += len(chunk)
+            yield separator + ','.join(chunk)
+            separator = ','
+            chunk = []
+    counter['count'] += len(chunk)
+    yield (separator + ','.join(chunk) if chunk else ('[' if separator == '[' else '')) + ']'
+
+
+def iter_json_object(fields: Dict[str, Any], documents: Iterable[Dict[str, Any]], chunk_size: int = STREAM_BATCH_SIZE) -> Iterator[str]:
+    head = encode_document(fields)
+    yield (head[:-1] + ',' if fields else '{') + '"data":'
+    counter = {}
+    yield from iter_json_array(documents, chunk_size, counter)
+    yield f',"count":{counter["count"]}}}'
+
+
+def iter_ndjson(documents: Iterable[Dict[str, Any]], chunk_size: int = STREAM_BATCH_SIZE) -> Iterator[str]:
+    chunk = []
+    for document in documents:
+        chunk.append(encode_document(document))
+        if len(chunk) >= chunk_size:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def prefetch_first(documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    documents = iter(documents)
+    first = next(documents, None)
+    return chain([first], documents) if first is not None else iter(())
+
+
+def stream_chunks(chunks: Iterable[Any], mimetype: str, headers: Dict[str, str] = None) -> Response:
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers={'X-Accel-Buffering': 'no', **(headers or {})})
+
+
+def stream_documents(documents: Iterable[Dict[str, Any]], fields: Dict[str, Any] = None) -> Response:
+    documents = prefetch_first(documents)
+    if wants_ndjson():
+        return stream_chunks(iter_ndjson(documents), NDJSON_MIMETYPE)
+    if fields is None:
+        return stream_chunks(iter_json_array(documents), 'application/json')
+    return stream_chunks(iter_json_object(fields, documents), 'application/json')
@@ -1,10 +1,14 @@
 from flask import Blueprint, jsonify, request
-from app.core.database import DatabaseManager
+from app.api.streaming import stream_documents, wants_ndjson
+from app.core.database import CHRONOLOGICAL, SENSOR_LIST_PROJECTION, DatabaseManager
+from app.core.pagination import InvalidCursorError
+from app.core.projection import ACTION_HISTORY_FIELDS, CHART_PROJECTION, SENSOR_FIELDS, InvalidFieldsError, parse_fields
 from datetime import datetime, timedelta, timezone
 from app.core.logger_config import logger
 from app.services.led_control_service import LEDControlService
 from app.services.led_stats_service import LEDStatsService
 from app.services.status_service import StatusService
+from app.services.downsampling_service import InvalidDownsamplingError, downsample_documents, parse_method
 from app.core.timezone_utils import get_vietnam_timezone, create_vietnam_datetime
 from bson import ObjectId
 
@@ -52,212 +56,47 @@ def sensor_data_list():
         except ValueError:
             sample = 1
 
-        query_filter = {}
+        after = request.args.get('after') or None
+        before = request.args.get('before') or None
+        estimated = request.args.get('estimated', 'false').lower() in ('true', '1', 'yes')
+        projection = parse_fields(request.args.get('fields'), SENSOR_FIELDS, SENSOR_LIST_PROJECTION)
 
-        logger.info(f"Sensor data list query filter: {query_filter}")
         logger.info(f"CRUD params - page: {page}, per_page: {per_page}, sort: {sort_field}:{sort_order}, search: '{search_term}' ({search_criteria})")
 
-        if search_term:
-            import re
-            time_patterns = [
-                r'^(\d{1,2}):(\d{1,2}):(\d{1,2})\s+(\d{1,2})/(\d{1,2})/(\d{4})$',
-                r'^(\d{1,2}):(\d{1,2}):(\d{1,2})$',
-                r'^(\d{1,2}):(\d{1,2})$',
-                r'^(\d{1,2})/(\d{1,2})/(\d{4})$',
-                r'^(\d{1,2}):(\d{1,2})\s+(\d{1,2})/(\d{1,2})/(\d{4})$'
-            ]
-
-            is_time_search = any(re.match(pattern, search_term) for pattern in time_patterns)
-
-            if is_time_search or search_criteria == 'time':
-                data = db.search_by_time_string(search_term)
-
-                if sample and sample > 1:
-                    data = data[::sample]
-
-                if sort_field in ['temperature', 'humidity', 'light']:
-                    reverse = sort_order == 'desc'
-                    data.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
-                elif sort_field == 'timestamp':
-                    reverse = sort_order == 'desc'
-
-                    def get_timestamp_for_sort(x):
-                        ts = x.get('timestamp')
-                        if isinstance(ts, str):
-                            try:
-                                from dateutil import parser
-                                return parser.parse(ts)
-                            except:
-                                return datetime.min
-                        elif isinstance(ts, datetime):
-                            return ts
-                        else:
-                            return datetime.min
-                    data.sort(key=get_timestamp_for_sort, reverse=reverse)
-
-                total_count = len(data)
-                start_idx = (page - 1) * per_page
-                end_idx = start_idx + per_page
-                paginated_data = data[start_idx:end_idx]
-
-                result = {
-                    'data': paginated_data,
-                    'pagination': {
-                        'page': page,
-                        'per_page': per_page,
-                        'total_count': total_count,
-                        'total_pages': max(1, (total_count + per_page - 1) // per_page),
-                        'has_prev': page > 1,
-                        'has_next': page < max(1, (total_count + per_page - 1) // per_page)
-                    },
-                    'sort': {'field': sort_field, 'order': sort_order},
-                    'search': {'term': search_term, 'criteria': search_criteria}
-                }
-            else:
-                criteria = {}
-
-                if search_criteria == 'all':
-                    criteria['text_search'] = search_term
-                elif search_criteria == 'time':
-                    data = db.search_by_time_string(search_term)
-
-                    if sort_field in ['temperature', 'humidity', 'light']:
-                        reverse = sort_order == 'desc'
-                        data.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
-                    elif sort_field == 'timestamp':
-                        reverse = sort_order == 'desc'
-                        data.sort(key=lambda x: x.get('timestamp') or datetime.min, reverse=reverse)
-
-                    if sample and sample > 1:
-                        data = data[::sample]
-
-                    total_count = len(data)
-                    start_idx = (page - 1) * per_page
-                    end_idx = start_idx + per_page
-                    paginated_data = data[start_idx:end_idx]
-
-                    result = {
-                        'data': paginated_data,
-                        'pagination': {
-                            'page': page,
-                            'per_page': per_page,
-                            'total_count': total_count,
-                            'total_pages': max(1, (total_count + per_page - 1) // per_page),
-                            'has_prev': page > 1,
-                            'has_next': page < max(1, (total_count + per_page - 1) // per_page)
-                        },
-                        'sort': {'field': sort_field, 'order': sort_order},
-                        'search': {'term': search_term, 'criteria': search_criteria}
-                    }
-
-                    for doc in result['data']:
-                        if '_id' in doc:
-                            doc['_id'] = str(doc['_id'])
-
-                    logger.info(f"Returned {len(result['data'])} sensor data records (sampling ratio 1:{sample})")
-
-                    return jsonify({
-                        "status": "success",
-                        "data": result['data'],
-                        "pagination": result['pagination'],
-                        "sort": result['sort'],
-                        "search": result['search'],
-                        "count": len(result['data']),
-                        "total_count": result['pagination']['total_count']
-                    })
-                elif search_criteria in ['temperature', 'humidity', 'light']:
-                    if search_term.replace('.', '').isdigit():
-                        search_value = float(search_term)
-                        criteria[f'{search_criteria}_min'] = search_value
-                        criteria[f'{search_criteria}_max'] = search_value
-
-                data = db.search_by_multiple_criteria(criteria)
-
-                if sample and sample > 1:
-                    data = data[::sample]
-
-                if sort_field in ['temperature', 'humidity', 'light']:
-                    reverse = sort_order == 'desc'
-                    data.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
-                elif sort_field == 'timestamp':
-                    reverse = sort_order == 'desc'
-
-                    def get_timestamp_for_sort(x):
-                        ts = x.get('timestamp')
-                        if isinstance(ts, str):
-                            try:
-                                from dateutil import parser
-                                return parser.parse(ts)
-                            except:
-                                return datetime.min
-                        elif isinstance(ts, datetime):
-                            return ts
-                        else:
-                            return datetime.min
-                    data.sort(key=get_timestamp_for_sort, reverse=reverse)
-
-                total_count = len(data)
-                start_idx = (page - 1) * per_page
-                end_idx = start_idx + per_page
-                paginated_data = data[start_idx:end_idx]
-
-                result = {
-                    'data': paginated_data,
-                    'pagination': {
-                        'page': page,
-                        'per_page': per_page,
-                        'total_count': total_count,
-                        'total_pages': max(1, (total_count + per_page - 1) // per_page),
-                        'has_prev': page > 1,
-                        'has_next': page < max(1, (total_count + per_page - 1) // per_page)
-                    },
-                    'sort': {'field': sort_field, 'order': sort_order},
-                    'search': {'term': search_term, 'criteria': search_criteria}
-                }
-        else:
-            data = db.get_recent_data(limit=None)
-
-            if sample and sample > 1:
-                data = data[::sample]
-
-            if sort_field in ['temperature', 'humidity', 'light']:
-                reverse = sort_order == 'desc'
-                data.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
-            elif sort_field == 'timestamp':
-                reverse = sort_order == 'desc'
-
-                def get_timestamp_for_sort(x):
-                    ts = x.get('timestamp')
-                    if isinstance(ts, str):
-                        try:
-                            from dateutil import parser
-                            return parser.parse(ts)
-                        except:
-                            return datetime.min
-                    elif isinstance(ts, datetime):
-                        return ts
-                    else:
-                        return datetime.min
-                data.sort(key=get_timestamp_for_sort, reverse=reverse)
-
-            total_count = len(data)
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            paginated_data = data[start_idx:end_idx]
+        query = db.build_sensor_search_query(search_term, search_criteria)
+        streaming = limit_arg is not None and limit_arg.lower() == 'all' and (
+            request.args.get('stream', 'false').lower() in ('true', '1', 'yes') or wants_ndjson())
+        if streaming:
+            documents = db.iter_sensor_search(query, sort_field, sort_order, sample, projection=projection) if query is not None else []
+            return stream_documents(documents, fields={
+                "status": "success",
+                "sort": {"field": sort_field, "order": sort_order},
+                "search": {"term": search_term, "criteria": search_criteria}
+            })
 
+        if query is None:
             result = {
-                'data': paginated_data,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total_count': total_count,
-                    'total_pages': max(1, (total_count + per_page - 1) // per_page),
-                    'has_prev': page > 1,
-                    'has_next': page < max(1, (total_count + per_page - 1) // per_page)
-                },
-                'sort': {'field': sort_field, 'order': sort_order},
-                'search': {'term': '', 'criteria': 'all'}
+                'data': [],
+                'pagination': {'mode': 'page', 'page': page, 'per_page': per_page, 'total_count': 0,
+                               'total_exact': True, 'total_source': 'exact', 'total_pages': 1,
+                               'has_prev': page > 1, 'has_next': False, 'next_cursor': None, 'prev_cursor': None}
             }
+        else:
+            result = db.find_sensor_page(
+                query,
+                sort_field=sort_field,
+                sort_order=sort_order,
+                page=page,
+                per_page=per_page,
+                window=None if search_term else limit,
+                sample=sample,
+                projection=projection,
+                after=after,
+                before=before,
+                estimated=estimated
+            )
+        result['sort'] = {'field': sort_field, 'order': sort_order}
+        result['search'] = {'term': search_term, 'criteria': search_criteria if search_term else 'all'}
 
         for doc in result['data']:
             if '_id' in doc:
@@ -275,6 +114,8 @@ def sensor_data_list():
             "total_count": result['pagination']['total_count']
         })
 
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        return jsonify({"status": "error", "message": str(e), "data": []}), 400
     except Exception as e:
         logger.error(f"Error in sensor_data_list: {e}")
         return jsonify({
@@ -286,7 +127,12 @@ def sensor_data_list():
 
 @sensors_bp.route("/sensor-data")
 def sensor_data():
-    data = db.get_recent_data(limit=1)
+    try:
+        projection = parse_fields(request.args.get('fields'), SENSOR_FIELDS)
+    except InvalidFieldsError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    data = db.get_recent_data(limit=1, projection=projection)
     if data:
         doc = data[0]
         if '_id' in doc:
@@ -378,6 +224,12 @@ def chart_data():
     time_period = request.args.get('timePeriod', None)
     date_str = request.args.get('date', None)
     limit_arg = request.args.get('limit', None)
+    points = request.args.get('points', type=int)
+    try:
+        method = parse_method(request.args.get('method'))
+        projection = parse_fields(request.args.get('fields'), SENSOR_FIELDS, CHART_PROJECTION)
+    except (InvalidFieldsError, InvalidDownsamplingError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
     limit = 50
     is_all_data = False
@@ -392,6 +244,16 @@ def chart_data():
         except (ValueError, TypeError):
             limit = 50
 
+    if is_all_data and not points:
+        query = {}
+        if date_str:
+            try:
+                query = db.sensor_date_query(date_str)
+            except ValueError:
+                pass
+        logger.info(f"Streaming all chart data - date_str: {date_str}")
+        return stream_documents(db.iter_sensor_data(query, CHRONOLOGICAL, projection))
+
     vn_tz = get_vietnam_timezone()
     end_time = datetime.now(vn_tz)
 
@@ -404,7 +266,7 @@ def chart_data():
             start_time = selected_date_local
             end_time = selected_date_local.replace(hour=23, minute=59, second=59, microsecond=999999)
 
-            data = db.search_by_time_range_optimized(start_time, end_time)
+            data = db.search_by_time_range_optimized(start_time, end_time, projection=projection)
 
             def get_timestamp_for_sort(x):
                 ts = x.get('timestamp')
@@ -424,7 +286,7 @@ def chart_data():
                 data = data[-limit:]
 
         except ValueError:
-            data = db.get_recent_data(limit=limit)
+            data = db.get_recent_data(limit=limit, projection=projection)
 
             def get_timestamp_for_sort(x):
                 ts = x.get('timestamp')
@@ -441,7 +303,7 @@ def chart_data():
             data.sort(key=get_timestamp_for_sort)
     else:
         if is_all_data:
-            data = db.get_recent_data(limit=None)
+            data = db.get_recent_data(limit=None, projection=projection)
 
             def get_timestamp_for_sort(x):
                 ts = x.get('timestamp')
@@ -457,7 +319,7 @@ def chart_data():
                     return datetime.min
             data.sort(key=get_timestamp_for_sort)
         else:
-            data = db.get_recent_data(limit=limit)
+            data = db.get_recent_data(limit=limit, projection=projection)
 
             def get_timestamp_for_sort(x):
                 ts = x.get('timestamp')
@@ -473,7 +335,10 @@ def chart_data():
                     return datetime.min
             data.sort(key=get_timestamp_for_sort)
 
-    logger.info(f"Chart data request - date_str: {date_str}, time_period: {time_period}, limit: {limit_arg}")
+    if points:
+        data = downsample_documents(data, points, method)
+
+    logger.info(f"Chart data request - date_str: {date_str}, time_period: {time_period}, limit: {limit_arg}, points: {points}")
     logger.info(f"Mode: {'Historical' if date_str else 'Realtime'}, All Data: {is_all_data}")
     logger.info(f"Found {len(data)} records (limit: {limit})")
 
@@ -572,8 +437,13 @@ def action_history():
         if limit > 0 and limit < per_page:
             per_page = limit
 
+        after = request.args.get('after') or None
+        before = request.args.get('before') or None
+        estimated = request.args.get('estimated', 'false').lower() in ('true', '1', 'yes')
+        projection = parse_fields(request.args.get('fields'), ACTION_HISTORY_FIELDS)
+
         logger.info(
-            f"Action history CRUD params - page: {page}, per_page: {per_page}, sort: {sort_field}:{sort_order}, search: '{search_term}', device: {device_filter}, state: {state_filter}")
+            f"Action history CRUD params - page: {page}, per_page: {per_page}, sort: {sort_field}:{sort_order}, search: '{search_term}', device: {device_filter}, state: {state_filter}, cursor: {'after' if after else 'before' if before else 'none'}")
 
         result = db.search_action_history(
             search_term=search_term,
@@ -582,7 +452,11 @@ def action_history():
             sort_field=sort_field,
             sort_order=sort_order,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            after=after,
+            before=before,
+            estimated=estimated,
+            projection=projection
         )
 
         for doc in result['data']:
@@ -599,6 +473,8 @@ def action_history():
             "total_count": result['pagination']['total_count']
         })
 
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        return jsonify({"status": "error", "message": str(e), "data": []}), 400
     except Exception as e:
         logger.error(f"Error in action_history: {e}")
         return jsonify({"status": "error", "message": str(e), "data": []}), 500
@@ -609,13 +485,17 @@ def led_stats():
     try:
         use_cache = request.args.get('cache', 'true').lower() == 'true'
         date = request.args.get('date', None)
+        start_date = request.args.get('start_date', None)
+        end_date = request.args.get('end_date', None)
 
-        stats = led_stats_service.get_led_stats(use_cache=use_cache, date=date)
+        stats = led_stats_service.get_led_stats(use_cache=use_cache, date=date, start_date=start_date, end_date=end_date)
 
         return jsonify({
             "status": "success",
             "data": stats,
             "date": date,
+            "start_date": start_date,
+            "end_date": end_date,
             "timestamp": datetime.now(get_vietnam_timezone()).isoformat()
         })
 
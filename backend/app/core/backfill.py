@@ -0,0 +1,147 @@
+import argparse
+import sys
+from datetime import datetime
+from typing import Any, Dict
+from pymongo import UpdateOne
+from app.core.logger_config import logger
+from app.core.config import MONGODB_COLLECTION_NAME
+from app.core.mongo_pool import mongo_pool
+from app.core.indexes import ACTION_HISTORY_COLLECTION, DATA_CALENDAR_COLLECTION, LED_DAILY_STATS_COLLECTION
+from app.core.sequence import SEQUENCE_FIELD, mark_sequence_complete, reserve_sequence
+from app.core.timezone_utils import get_current_vietnam_time, get_local_time_fields
+
+LOCAL_TIME_COLLECTIONS = [MONGODB_COLLECTION_NAME, ACTION_HISTORY_COLLECTION]
+LOCAL_DATE_EXPRESSION = {'$dateToString': {'date': '$timestamp', 'format': '%Y-%m-%d', 'timezone': '+07:00'}}
+
+
+def backfill_local_time_fields(collection_name: str, batch_size: int = 1000) -> int:
+    collection = mongo_pool.get_collection(collection_name)
+    query = {'local_date': {'$exists': False}, 'timestamp': {'$type': 'date'}}
+    last_id = None
+    updated = 0
+
+    while True:
+        batch_query = {**query, '_id': {'$gt': last_id}} if last_id is not None else query
+        documents = list(collection.find(batch_query, {'timestamp': 1}).sort('_id', 1).limit(batch_size))
+        if not documents:
+            break
+
+        operations = [UpdateOne({'_id': document['_id']}, {'$set': get_local_time_fields(document['timestamp'])})
+                      for document in documents if isinstance(document.get('timestamp'), datetime)]
+        if operations:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+        last_id = documents[-1]['_id']
+        logger.info(f"Backfilled local time fields on {collection_name}: {updated} documents")
+
+    return updated
+
+
+def backfill_sequence(collection_name: str, batch_size: int = 1000) -> int:
+    collection = mongo_pool.get_collection(collection_name)
+    query = {SEQUENCE_FIELD: {'$exists': False}}
+    last_id = None
+    updated = 0
+
+    while True:
+        batch_query = {**query, '_id': {'$gt': last_id}} if last_id is not None else query
+        documents = list(collection.find(batch_query, {'_id': 1}).sort('_id', 1).limit(batch_size))
+        if not documents:
+            break
+
+        first = reserve_sequence(collection_name, len(documents))
+        operations = [UpdateOne({'_id': document['_id'], SEQUENCE_FIELD: {'$exists': False}}, {'$set': {SEQUENCE_FIELD: first + offset}})
+                      for offset, document in enumerate(documents)]
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+        last_id = documents[-1]['_id']
+        logger.info(f"Backfilled sampling sequence on {collection_name}: {updated} documents")
+
+    mark_sequence_complete(collection_name)
+    return updated
+
+
+def _count_of(counts: str, state: str) -> Dict[str, Any]:
+    return {'$reduce': {'input': {'$objectToArray': {'$ifNull': [counts, {}]}}, 'initialValue': 0,
+                        'in': {'$cond': [{'$eq': ['$$this.k', state]}, '$$this.v', '$$value']}}}
+
+
+def _max_counts(stored: str, rebuilt: str) -> Dict[str, Any]:
+    states = {'$setUnion': [{'$map': {'input': {'$objectToArray': {'$ifNull': [counts, {}]}}, 'in': '$$this.k'}}
+                            for counts in (stored, rebuilt)]}
+    return {'$arrayToObject': {'$map': {'input': states, 'as': 'state', 'in': {
+        'k': '$$state', 'v': {'$max': [_count_of(stored, '$$state'), _count_of(rebuilt, '$$state')]}
+    }}}}
+
+
+def rebuild_led_daily_stats() -> int:
+    backfill_local_time_fields(ACTION_HISTORY_COLLECTION)
+
+    pipeline = [
+        {'$match': {'led': {'$type': 'string'}, 'state': {'$regex': '^[A-Za-z0-9]+$'}, 'local_date': {'$type': 'string'}}},
+        {'$group': {'_id': {'local_date': '$local_date', 'led': '$led', 'state': '$state'}, 'count': {'$sum': 1}}},
+        {'$group': {'_id': {'local_date': '$_id.local_date', 'led': '$_id.led'}, 'counts': {'$push': {'k': '$_id.state', 'v': '$count'}}}},
+        {'$project': {'_id': {'$concat': ['$_id.local_date', '|', '$_id.led']}, 'local_date': '$_id.local_date',
+                      'led': '$_id.led', 'counts': {'$arrayToObject': '$counts'}}},
+        {'$merge': {'into': LED_DAILY_STATS_COLLECTION, 'on': '_id', 'whenNotMatched': 'insert', 'whenMatched': [
+            {'$set': {'local_date': '$$new.local_date', 'led': '$$new.led', 'counts': _max_counts('$counts', '$$new.counts')}}
+        ]}}
+    ]
+    mongo_pool.get_collection(ACTION_HISTORY_COLLECTION).aggregate(pipeline, allowDiskUse=True)
+
+    stats_collection = mongo_pool.get_collection(LED_DAILY_STATS_COLLECTION)
+    stats_collection.update_one({'_id': 'meta'}, {'$set': {'counters_since': ''}}, upsert=True)
+    rebuilt = stats_collection.count_documents({'local_date': {'$exists': True}})
+    logger.info(f"Rebuilt LED daily stats: {rebuilt} day/LED counters")
+    return rebuilt
+
+
+def rebuild_data_calendar(collection_name: str) -> int:
+    pipeline = [
+        {'$match': {'timestamp': {'$type': 'date'}}},
+        {'$group': {'_id': LOCAL_DATE_EXPRESSION, 'count': {'$sum': 1}, 'first': {'$min': '$timestamp'}, 'last': {'$max': '$timestamp'}}},
+        {'$project': {'_id': {'$concat': [collection_name, '|', '$_id']}, 'source': collection_name, 'local_date': '$_id',
+                      'count': 1, 'first': 1, 'last': 1}},
+        {'$merge': {'into': DATA_CALENDAR_COLLECTION, 'on': '_id', 'whenNotMatched': 'insert', 'whenMatched': [
+            {'$set': {'source': '$$new.source', 'local_date': '$$new.local_date', 'count': {'$max': ['$count', '$$new.count']},
+                      'first': {'$min': ['$first', '$$new.first']}, 'last': {'$max': ['$last', '$$new.last']}}}
+        ]}}
+    ]
+    mongo_pool.get_collection(collection_name).aggregate(pipeline, allowDiskUse=True)
+
+    calendar = mongo_pool.get_collection(DATA_CALENDAR_COLLECTION)
+    calendar.update_one({'_id': f'{collection_name}|meta'}, {'$set': {'rebuilt_at': get_current_vietnam_time()}}, upsert=True)
+    days = calendar.count_documents({'source': collection_name})
+    logger.info(f"Rebuilt data calendar for {collection_name}: {days} days")
+    return days
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill derived fields and rebuild materialized statistics')
+    parser.add_argument('--collection', action='append', help='collection to backfill (default: sensor data and action history)')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--led-stats', action='store_true', help='rebuild the per-day LED toggle counters from action history')
+    parser.add_argument('--calendar', action='store_true', help='rebuild the per-day calendar behind /available-dates and /available-led-dates')
+    parser.add_argument('--sequence', action='store_true', help='number sensor readings for database-side sample=N filtering')
+    args = parser.parse_args()
+
+    if args.sequence:
+        for collection_name in args.collection or [MONGODB_COLLECTION_NAME]:
+            print(f"{collection_name:<16}{backfill_sequence(collection_name, args.batch_size)} documents numbered")
+        return 0
+
+    if args.calendar:
+        for collection_name in args.collection or LOCAL_TIME_COLLECTIONS:
+            print(f"{collection_name:<16}{rebuild_data_calendar(collection_name)} days")
+        return 0
+
+    if args.led_stats:
+        print(f"{LED_DAILY_STATS_COLLECTION:<16}{rebuild_led_daily_stats()} counters rebuilt")
+        return 0
+
+    for collection_name in args.collection or LOCAL_TIME_COLLECTIONS:
+        updated = backfill_local_time_fields(collection_name, args.batch_size)
+        print(f"{collection_name:<16}{updated} documents updated")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+from pymongo import ReturnDocument
+from app.core.logger_config import logger
+from app.core.config import CACHE_GENERATION_POLL_SECONDS
+from app.core.mongo_pool import mongo_pool
+from app.core.sequence import SEQUENCE_COLLECTION
+
+
+def _generation_id(name: str) -> str:
+    return f'{name}:generation'
+
+
+class CacheGenerations:
+
+    def __init__(self, poll_seconds: float = CACHE_GENERATION_POLL_SECONDS):
+        self.poll_seconds = max(0.0, poll_seconds)
+        self._values: Dict[str, int] = {}
+        self._polled_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.polls = 0
+        self.bumps = 0
+        self.errors = 0
+
+    def _update(self, name: str, value: int) -> int:
+        with self._lock:
+            self._values[name] = max(value, self._values.get(name, 0))
+            self._polled_at[name] = time.monotonic()
+            return self._values[name]
+
+    def peek(self, name: str) -> int:
+        with self._lock:
+            return self._values.get(name, 0)
+
+    def current(self, name: str) -> int:
+        with self._lock:
+            polled_at = self._polled_at.get(name)
+            if polled_at is not None and time.monotonic() - polled_at < self.poll_seconds:
+                return self._values.get(name, 0)
+            self.polls += 1
+
+        try:
+            counter = mongo_pool.get_collection(SEQUENCE_COLLECTION).find_one({'_id': _generation_id(name)}, {'value': 1})
+            return self._update(name, counter['value'] if counter else 0)
+        except Exception as e:
+            logger.warning(f"Error reading cache generation for {name}, using last known value: {e}")
+            with self._lock:
+                self.errors += 1
+                self._polled_at[name] = time.monotonic()
+                return self._values.get(name, 0)
+
+    def bump(self, name: str) -> Optional[int]:
+        try:
+            counter = mongo_pool.get_collection(SEQUENCE_COLLECTION).find_one_and_update(
+                {'_id': _generation_id(name)}, {'$inc': {'value': 1}}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            with self._lock:
+                self.bumps += 1
+            return self._update(name, counter['value'])
+        except Exception as e:
+            logger.warning(f"Error bumping cache generation for {name}: {e}")
+            with self._lock:
+                self.errors += 1
+            return None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'poll_seconds': self.poll_seconds,
+                'polls': self.polls,
+                'bumps': self.bumps,
+                'errors': self.errors,
+                'generations': dict(self._values)
+            }
+
+
+cache_generations = CacheGenerations()
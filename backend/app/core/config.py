@@ -6,14 +6,52 @@ load_dotenv()
 MONGODB_CONNECTION_STRING = os.getenv('MONGODB_CONNECTION_STRING')
 MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'iot_database')
 MONGODB_COLLECTION_NAME = os.getenv('MONGODB_COLLECTION_NAME', 'sensor_data')
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', 2))
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', 50))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', 300000))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 5000))
+MONGODB_TIMEOUT_MS = int(os.getenv('MONGODB_TIMEOUT_MS', 10000))
+
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv('COUNT_CACHE_MAX_ENTRIES', 256))
+COUNT_CACHE_TTL_SECONDS = float(os.getenv('COUNT_CACHE_TTL_SECONDS', 30.0))
+DEVICE_STATE_CACHE_TTL_SECONDS = float(os.getenv('DEVICE_STATE_CACHE_TTL_SECONDS', 5.0))
+QUERY_CACHE_MAX_BYTES = int(os.getenv('QUERY_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv('QUERY_CACHE_TTL_SECONDS', 5.0))
+CACHE_GENERATION_POLL_SECONDS = float(os.getenv('CACHE_GENERATION_POLL_SECONDS', 1.0))
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 1000))
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 10000))
 
 MQTT_BROKER_HOST = os.getenv('MQTT_BROKER_HOST')
 MQTT_BROKER_PORT = int(os.getenv('MQTT_BROKER_PORT', 8883))
 MQTT_DATA_TOPIC = os.getenv('MQTT_DATA_TOPIC', 'esp32/iot/data')
+MQTT_DEFAULT_DEVICE_ID = os.getenv('MQTT_DEFAULT_DEVICE_ID', 'iot')
 MQTT_CONTROL_TOPIC = os.getenv('MQTT_CONTROL_TOPIC', 'esp32/iot/control')
 MQTT_ACTION_HISTORY_TOPIC = os.getenv('MQTT_ACTION_HISTORY_TOPIC', 'esp32/iot/action-history')
 MQTT_USERNAME = os.getenv('MQTT_USERNAME')
 MQTT_PASSWORD = os.getenv('MQTT_PASSWORD')
+MQTT_TLS_ENABLED = os.getenv('MQTT_TLS_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+MQTT_PROTOCOL_VERSION = os.getenv('MQTT_PROTOCOL_VERSION', '3.1.1')
+MQTT_SHARED_SUBSCRIPTION_GROUP = os.getenv('MQTT_SHARED_SUBSCRIPTION_GROUP', '')
+MQTT_EMBEDDED_RECEIVER = os.getenv('MQTT_EMBEDDED_RECEIVER', 'True').lower() in ('true', '1', 'yes', 'on')
+MQTT_PAYLOAD_CODECS = os.getenv('MQTT_PAYLOAD_CODECS', '')
+MQTT_DEFAULT_PAYLOAD_CODEC = os.getenv('MQTT_DEFAULT_PAYLOAD_CODEC', 'json').lower()
+
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 100))
+INGEST_FLUSH_INTERVAL_SECONDS = float(os.getenv('INGEST_FLUSH_INTERVAL_SECONDS', 1.0))
+INGEST_BUFFER_MAX_PENDING = int(os.getenv('INGEST_BUFFER_MAX_PENDING', 1000))
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 5000))
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', 4))
+INGEST_OVERFLOW_POLICY = os.getenv('INGEST_OVERFLOW_POLICY', 'drop_oldest').lower()
+INGEST_BLOCK_TIMEOUT_SECONDS = float(os.getenv('INGEST_BLOCK_TIMEOUT_SECONDS', 0.5))
+INGEST_DATA_DIR = os.getenv('INGEST_DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data'))
+INGEST_SPILL_PATH = os.getenv('INGEST_SPILL_PATH', os.path.join(INGEST_DATA_DIR, 'ingest_spill.jsonl'))
+INGEST_WRITE_TIMEOUT_SECONDS = float(os.getenv('INGEST_WRITE_TIMEOUT_SECONDS', 2.0))
+INGEST_SPOOL_DIR = os.getenv('INGEST_SPOOL_DIR', os.path.join(INGEST_DATA_DIR, 'spool'))
+INGEST_SPOOL_SEGMENT_BYTES = int(os.getenv('INGEST_SPOOL_SEGMENT_BYTES', 4 * 1024 * 1024))
+INGEST_SPOOL_MAX_BYTES = int(os.getenv('INGEST_SPOOL_MAX_BYTES', 256 * 1024 * 1024))
+INGEST_SPOOL_REPLAY_INTERVAL_SECONDS = float(os.getenv('INGEST_SPOOL_REPLAY_INTERVAL_SECONDS', 2.0))
+INGEST_DEDUP_CACHE_SIZE = int(os.getenv('INGEST_DEDUP_CACHE_SIZE', 10000))
+INGEST_DEDUP_WINDOW_SECONDS = float(os.getenv('INGEST_DEDUP_WINDOW_SECONDS', 0.5))
 
 TEMP_NORMAL_MIN = float(os.getenv('TEMP_NORMAL_MIN', 25.0))
 TEMP_NORMAL_MAX = float(os.getenv('TEMP_NORMAL_MAX', 35.0))
@@ -0,0 +1,203 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from bson import json_util
+from app.core.logger_config import logger
+from app.core.config import COUNT_CACHE_MAX_ENTRIES, COUNT_CACHE_TTL_SECONDS
+
+_MISSING = object()
+
+
+class UnsupportedFilter(Exception):
+    pass
+
+
+def normalize_filter(query: Dict[str, Any]) -> str:
+    return json_util.dumps(query or {}, sort_keys=True, separators=(',', ':'))
+
+
+def _field_value(document: Dict[str, Any], path: str) -> Any:
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _comparable(left: Any, right: Any) -> Tuple[Any, Any]:
+    if isinstance(left, datetime) and isinstance(right, datetime):
+        if left.tzinfo is None:
+            left = left.replace(tzinfo=timezone.utc)
+        if right.tzinfo is None:
+            right = right.replace(tzinfo=timezone.utc)
+    return left, right
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return any(_equals(item, expected) for item in value)
+    left, right = _comparable(value, expected)
+    try:
+        return left == right
+    except TypeError:
+        return False
+
+
+def _compare(value: Any, operator: str, bound: Any) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    left, right = _comparable(value, bound)
+    if isinstance(left, (int, float)) != isinstance(right, (int, float)) or isinstance(left, bool) != isinstance(right, bool):
+        return False
+    try:
+        if operator == '$gt':
+            return left > right
+        if operator == '$gte':
+            return left >= right
+        if operator == '$lt':
+            return left < right
+        return left <= right
+    except TypeError:
+        return False
+
+
+def _match_condition(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict) or not any(key.startswith('$') for key in condition):
+        return _equals(value, condition)
+
+    options = condition.get('$options', '')
+    for operator, operand in condition.items():
+        if operator in ('$gt', '$gte', '$lt', '$lte'):
+            if not _compare(value, operator, operand):
+                return False
+        elif operator == '$in':
+            if not any(_equals(value, item) for item in operand):
+                return False
+        elif operator == '$nin':
+            if any(_equals(value, item) for item in operand):
+                return False
+        elif operator == '$ne':
+            if _equals(value, operand):
+                return False
+        elif operator == '$exists':
+            if (value is not _MISSING) != bool(operand):
+                return False
+        elif operator == '$regex':
+            if not isinstance(value, str):
+                return False
+            flags = re.IGNORECASE if 'i' in options else 0
+            if not re.search(operand, value, flags):
+                return False
+        elif operator == '$mod':
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or int(value) % operand[0] != operand[1]:
+                return False
+        elif operator == '$options':
+            continue
+        else:
+            raise UnsupportedFilter(operator)
+
+    return True
+
+
+def matches_filter(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches_filter(document, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_filter(document, clause) for clause in condition):
+                return False
+        elif key == '$nor':
+            if any(matches_filter(document, clause) for clause in condition):
+                return False
+        elif key.startswith('$'):
+            raise UnsupportedFilter(key)
+        elif not _match_condition(_field_value(document, key), condition):
+            return False
+    return True
+
+
+class CountCache:
+
+    def __init__(self, max_entries: int = COUNT_CACHE_MAX_ENTRIES, ttl_seconds: float = COUNT_CACHE_TTL_SECONDS):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Tuple[str, str], Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.increments = 0
+        self.invalidations = 0
+
+    def get(self, collection_name: str, query: Dict[str, Any], generation: int = 0) -> Optional[int]:
+        key = (collection_name, normalize_filter(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['generation'] != generation or time.monotonic() - entry['cached_at'] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['count']
+
+    def set(self, collection_name: str, query: Dict[str, Any], count: int, generation: int = 0):
+        if not self.max_entries:
+            return
+        key = (collection_name, normalize_filter(query))
+        with self._lock:
+            self._entries[key] = {'query': query, 'count': count, 'generation': generation, 'cached_at': time.monotonic()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_inserts(self, collection_name: str, documents: List[Dict[str, Any]], generation: int = 0):
+        if not documents:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == collection_name]:
+                entry = self._entries[key]
+                if entry['generation'] != generation - 1:
+                    del self._entries[key]
+                    self.invalidations += 1
+                    continue
+                try:
+                    added = sum(1 for document in documents if matches_filter(document, entry['query']))
+                except Exception as e:
+                    logger.debug(f"Dropping cached count for {collection_name} {key[1]}: {e}")
+                    del self._entries[key]
+                    self.invalidations += 1
+                    continue
+                entry['generation'] = generation
+                if added:
+                    entry['count'] += added
+                    self.increments += added
+
+    def invalidate(self, collection_name: Optional[str] = None):
+        with self._lock:
+            keys = [key for key in self._entries if collection_name is None or key[0] == collection_name]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'increments': self.increments,
+                'invalidations': self.invalidations
+            }
+
+
+count_cache = CountCache()
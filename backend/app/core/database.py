@@ -1,20 +1,47 @@
-from pymongo import MongoClient
-from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+import threading
+from pymongo import MongoClient, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from app.core.logger_config import logger
-from app.core.config import MONGODB_CONNECTION_STRING, MONGODB_DB_NAME, MONGODB_COLLECTION_NAME
-from app.core.timezone_utils import get_current_vietnam_time, convert_from_vietnam_time, convert_to_vietnam_time, get_vietnam_timezone
+from app.core.config import MONGODB_COLLECTION_NAME, STREAM_BATCH_SIZE
+from app.core.mongo_pool import decodes_vietnam_time, mongo_pool
+from app.core.count_cache import count_cache
+from app.core.query_cache import query_cache
+from app.core.cache_generations import cache_generations
+from app.core.device_state import DEVICE_STATE_COLLECTION, LED_IDS, device_state_cache, led_state_from_record
+from app.core.indexes import DATA_CALENDAR_COLLECTION, LED_DAILY_STATS_COLLECTION, ensure_indexes
+from app.core.backfill import rebuild_data_calendar
+from app.core.sequence import SEQUENCE_FIELD, assign_sequence, mark_sequence_complete, sequence_complete
+from app.core.projection import with_sort_keys
+from app.core.pagination import InvalidCursorError, fetch_keyset_page, keyset_sort, page_cursors
+from app.core.timezone_utils import (get_current_vietnam_time, convert_from_vietnam_time, convert_to_vietnam_time, get_vietnam_timezone,
+                                     create_vietnam_datetime, get_local_time_fields)
+
+SENSOR_SORT_FIELDS = ('timestamp', 'temperature', 'humidity', 'light')
+SENSOR_LIST_PROJECTION = {'timestamp': 1, 'temperature': 1, 'humidity': 1, 'light': 1, 'device_id': 1}
+RECENT_FIRST = [('timestamp', -1), ('_id', -1)]
+CHRONOLOGICAL = [('timestamp', 1), ('_id', 1)]
 
 
 class DatabaseManager:
 
+    _led_stats_meta_ready = False
+    _sequence_ready = False
+    _sequence_checked = False
+    _calendar_lock = threading.Lock()
+
     def __init__(self):
         self.mongo_client: Optional[MongoClient] = None
         self.db = None
         self.collection = None
+        self.vietnam_time_codec = False
         self.connect()
 
     def _convert_timestamps_to_vietnam(self, data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.vietnam_time_codec:
+            return data_list
         for item in data_list:
             if 'timestamp' in item and isinstance(item['timestamp'], datetime):
                 item['timestamp'] = convert_to_vietnam_time(item['timestamp'])
@@ -22,34 +49,272 @@ class DatabaseManager:
 
     def connect(self) -> bool:
         try:
-            self.mongo_client = MongoClient(
-                MONGODB_CONNECTION_STRING,
-                tlsAllowInvalidCertificates=True,
-                serverSelectionTimeoutMS=10000,
-                connectTimeoutMS=10000,
-                socketTimeoutMS=10000
-            )
-            self.db = self.mongo_client[MONGODB_DB_NAME]
-            self.collection = self.db[MONGODB_COLLECTION_NAME]
+            self.mongo_client = mongo_pool.get_client()
+            self.db = mongo_pool.get_database()
+            self.collection = mongo_pool.get_collection(MONGODB_COLLECTION_NAME)
+            self.vietnam_time_codec = decodes_vietnam_time(self.db)
+            return True
 
-            self.mongo_client.admin.command('ping')
-            logger.info("Connected to MongoDB successfully")
+        except Exception as e:
+            logger.error(f"MongoDB connection failed: {e}")
+            return False
 
+    def _get_collection(self, collection_name: str) -> Collection:
+        return mongo_pool.get_collection(collection_name)
+
+    def _count(self, collection: Collection, query: Dict[str, Any], estimated: bool = False) -> Tuple[int, str]:
+        if estimated and not query:
+            try:
+                return collection.estimated_document_count(), 'estimated'
+            except Exception as e:
+                logger.warning(f"Estimated count failed for {collection.name}, falling back to exact count: {e}")
+
+        generation = cache_generations.current(collection.name)
+        cached = count_cache.get(collection.name, query, generation)
+        if cached is not None:
+            return cached, 'cache'
+
+        total_count = collection.count_documents(query)
+        count_cache.set(collection.name, query, total_count, generation)
+        return total_count, 'exact'
+
+    def _paginate(self, collection: Collection, query: Dict[str, Any], sort_field: str, sort_order: str,
+                  page: int, per_page: int, after: Optional[str] = None, before: Optional[str] = None,
+                  estimated: bool = False, projection: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        total_count, total_source = self._count(collection, query, estimated)
+        total_pages = max(1, (total_count + per_page - 1) // per_page)
+
+        if after or before:
+            page_result = fetch_keyset_page(collection, query, sort_field, sort_order, per_page, after=after, before=before, projection=projection)
+            data = page_result['data']
+            pagination = {
+                'mode': 'cursor',
+                'page': None,
+                'per_page': per_page,
+                'total_count': total_count,
+                'total_exact': total_source == 'exact',
+                'total_source': total_source,
+                'total_pages': total_pages,
+                'has_prev': page_result['has_prev'],
+                'has_next': page_result['has_next'],
+                'next_cursor': page_result['next_cursor'],
+                'prev_cursor': page_result['prev_cursor']
+            }
+        else:
+            direction = -1 if sort_order.lower() == 'desc' else 1
+            cursor = collection.find(query, projection).sort(keyset_sort(sort_field, direction)).skip((page - 1) * per_page).limit(per_page)
+            data = list(cursor)
+            pagination = {
+                'mode': 'page',
+                'page': page,
+                'per_page': per_page,
+                'total_count': total_count,
+                'total_exact': total_source == 'exact',
+                'total_source': total_source,
+                'total_pages': total_pages,
+                'has_prev': page > 1,
+                'has_next': page < total_pages,
+                **page_cursors(data, sort_field, sort_order, page > 1, page < total_pages)
+            }
+
+        return self._convert_timestamps_to_vietnam(data), pagination
+
+    def _window_pipeline(self, query: Dict[str, Any], sort: List[Tuple[str, int]], window: Optional[int], sample: int) -> List[Dict[str, Any]]:
+        pipeline = [{'$match': query}, {'$sort': dict(RECENT_FIRST)}]
+        if window:
+            pipeline.append({'$limit': window})
+        if sample > 1:
+            pipeline.extend([
+                {'$setWindowFields': {'sortBy': dict(RECENT_FIRST), 'output': {'_sample_index': {'$documentNumber': {}}}}},
+                {'$match': {'$expr': {'$eq': [{'$mod': [{'$subtract': ['$_sample_index', 1]}, sample]}, 0]}}}
+            ])
+        if sort != RECENT_FIRST:
+            pipeline.append({'$sort': dict(sort)})
+        return pipeline
+
+    def _paginate_window(self, query: Dict[str, Any], sort_field: str, sort_order: str, page: int, per_page: int,
+                         window: Optional[int], sample: int, projection: Optional[Dict[str, Any]] = None,
+                         estimated: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        matched, total_source = self._count(self.collection, query, estimated)
+        total_count = min(matched, window) if window else matched
+        if sample > 1:
+            total_count = (total_count + sample - 1) // sample
+        total_pages = max(1, (total_count + per_page - 1) // per_page)
+
+        direction = -1 if sort_order.lower() == 'desc' else 1
+        pipeline = self._window_pipeline(query, keyset_sort(sort_field, direction), window, sample)
+        pipeline.extend([{'$skip': (page - 1) * per_page}, {'$limit': per_page}])
+        if projection:
+            pipeline.append({'$project': projection})
+        elif sample > 1:
+            pipeline.append({'$project': {'_sample_index': 0}})
+
+        data = list(self.collection.aggregate(pipeline, allowDiskUse=True))
+        pagination = {
+            'mode': 'page',
+            'page': page,
+            'per_page': per_page,
+            'total_count': total_count,
+            'total_exact': total_source == 'exact',
+            'total_source': total_source,
+            'total_pages': total_pages,
+            'has_prev': page > 1,
+            'has_next': page < total_pages,
+            'next_cursor': None,
+            'prev_cursor': None
+        }
+        return self._convert_timestamps_to_vietnam(data), pagination
+
+    def sequence_sampling_ready(self) -> bool:
+        if DatabaseManager._sequence_ready:
             return True
+        try:
+            if sequence_complete(MONGODB_COLLECTION_NAME):
+                DatabaseManager._sequence_ready = True
+            elif not DatabaseManager._sequence_checked:
+                DatabaseManager._sequence_checked = True
+                if self.collection.find_one({SEQUENCE_FIELD: {'$exists': False}}, {'_id': 1}) is None:
+                    mark_sequence_complete(MONGODB_COLLECTION_NAME)
+                    DatabaseManager._sequence_ready = True
+                else:
+                    logger.warning("Sensor readings without a sampling sequence found, sample=N falls back to a window scan "
+                                   "until 'python -m app.core.backfill --sequence' has run")
+        except Exception as e:
+            logger.error(f"Error checking sampling sequence: {e}")
+        return DatabaseManager._sequence_ready
+
+    def _windowed_query(self, query: Dict[str, Any], window: Optional[int] = None, sample: int = 1) -> Dict[str, Any]:
+        conditions = [query] if query else []
+        if window:
+            boundary = list(self.collection.find(query, {'timestamp': 1}).sort(RECENT_FIRST).skip(window - 1).limit(1))
+            if boundary:
+                timestamp, last_id = boundary[0].get('timestamp'), boundary[0]['_id']
+                conditions.append({'$or': [{'timestamp': {'$gt': timestamp}}, {'timestamp': timestamp, '_id': {'$gte': last_id}}]})
+        if sample > 1:
+            conditions.append({SEQUENCE_FIELD: {'$mod': [sample, 0]}})
+        if not conditions:
+            return {}
+        return conditions[0] if len(conditions) == 1 else {'$and': conditions}
+
+    def _load_sensor_page(self, query: Dict[str, Any], sort_field: str, sort_order: str, page: int, per_page: int,
+                          window: Optional[int], sample: int, projection: Optional[Dict[str, Any]], after: Optional[str],
+                          before: Optional[str], estimated: bool) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        if sample > 1 and not query and self.sequence_sampling_ready():
+            query = self._windowed_query(query, window, sample)
+            window, sample = None, 1
+        elif window and sample <= 1:
+            query = self._windowed_query(query, window)
+            window = None
+
+        if sample <= 1:
+            return self._paginate(self.collection, query, sort_field, sort_order, page, per_page, after, before, estimated, projection)
+        if after or before:
+            raise InvalidCursorError("Cursor pagination is not available for this sampled search, use page instead")
+        return self._paginate_window(query, sort_field, sort_order, page, per_page, window, sample, projection, estimated)
+
+    def find_sensor_page(self, query: Dict[str, Any], sort_field: str = 'timestamp', sort_order: str = 'desc',
+                         page: int = 1, per_page: int = 10, window: Optional[int] = None, sample: int = 1,
+                         projection: Optional[Dict[str, Any]] = None, after: Optional[str] = None,
+                         before: Optional[str] = None, estimated: bool = False) -> Dict[str, Any]:
+        try:
+            projection = with_sort_keys(projection, sort_field)
+            key = {'query': query, 'sort': [sort_field, sort_order], 'page': None if after or before else page, 'per_page': per_page,
+                   'window': window, 'sample': sample, 'projection': projection, 'after': after, 'before': before, 'estimated': estimated}
+            data, pagination = query_cache.get_or_load(self.collection.name, key, lambda: self._load_sensor_page(
+                query, sort_field, sort_order, page, per_page, window, sample, projection, after, before, estimated))
+
+            logger.info(f"Sensor page query: {len(data)} records ({pagination['mode']} mode, page {pagination['page']}/{pagination['total_pages']})")
+            return {'data': data, 'pagination': pagination}
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
-            logger.error(f"MongoDB connection failed: {e}")
+            logger.error(f"Sensor page query error: {e}")
+            return {'data': [], 'pagination': {'page': 1, 'per_page': per_page, 'total_count': 0, 'total_pages': 1, 'has_prev': False, 'has_next': False}}
+
+    def ensure_indexes(self) -> bool:
+        try:
+            ensure_indexes()
+            return True
+        except Exception as e:
+            logger.error(f"Error creating indexes: {e}")
+            return False
+
+    def _record_inserts(self, collection: Collection, documents: List[Dict[str, Any]]):
+        if documents:
+            generation = cache_generations.bump(collection.name)
+            if generation is None:
+                query_cache.invalidate(collection.name)
+                count_cache.invalidate(collection.name)
+            else:
+                count_cache.record_inserts(collection.name, documents, generation)
+        self.record_calendar_days(collection.name, documents)
+
+    def record_calendar_days(self, collection_name: str, documents: List[Dict[str, Any]]) -> bool:
+        days: Dict[str, Dict[str, Any]] = {}
+        for document in documents:
+            timestamp = document.get('timestamp')
+            if not isinstance(timestamp, datetime) or not document.get('local_date'):
+                continue
+            day = days.setdefault(document['local_date'], {'count': 0, 'first': timestamp, 'last': timestamp})
+            day['count'] += 1
+            day['first'] = min(day['first'], timestamp)
+            day['last'] = max(day['last'], timestamp)
+
+        if not days:
+            return False
+
+        try:
+            self._get_collection(DATA_CALENDAR_COLLECTION).bulk_write([
+                UpdateOne(
+                    {'_id': f'{collection_name}|{local_date}'},
+                    {'$inc': {'count': day['count']}, '$min': {'first': day['first']}, '$max': {'last': day['last']},
+                     '$setOnInsert': {'source': collection_name, 'local_date': local_date}},
+                    upsert=True
+                ) for local_date, day in days.items()
+            ], ordered=False)
+            return True
+        except Exception as e:
+            logger.error(f"Error updating data calendar for {collection_name}: {e}")
             return False
 
+    def get_available_dates(self, collection_name: str) -> List[str]:
+        calendar = self._get_collection(DATA_CALENDAR_COLLECTION)
+        if not calendar.find_one({'_id': f'{collection_name}|meta'}):
+            with DatabaseManager._calendar_lock:
+                if not calendar.find_one({'_id': f'{collection_name}|meta'}):
+                    rebuild_data_calendar(collection_name)
+
+        cursor = calendar.find({'source': collection_name}, {'local_date': 1, '_id': 0}).sort('local_date', -1)
+        return [day['local_date'] for day in cursor]
+
+    def _add_local_time_fields(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        if isinstance(document.get('timestamp'), datetime):
+            document.update(get_local_time_fields(document['timestamp']))
+        return document
+
+    def _assign_sequence(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        try:
+            return assign_sequence(MONGODB_COLLECTION_NAME, documents)
+        except Exception as e:
+            logger.error(f"Error reserving sampling sequence: {e}")
+            return documents
+
+    def _prepare_sensor_document(self, sensor_data: Dict[str, Any]) -> Dict[str, Any]:
+        if 'timestamp' not in sensor_data:
+            sensor_data['timestamp'] = get_current_vietnam_time()
+        else:
+            if isinstance(sensor_data['timestamp'], datetime):
+                sensor_data['timestamp'] = convert_from_vietnam_time(sensor_data['timestamp'])
+        return self._add_local_time_fields(sensor_data)
+
     def insert_sensor_data(self, sensor_data: Dict[str, Any]) -> Optional[str]:
         try:
-            if 'timestamp' not in sensor_data:
-                sensor_data['timestamp'] = get_current_vietnam_time()
-            else:
-                if isinstance(sensor_data['timestamp'], datetime):
-                    sensor_data['timestamp'] = convert_from_vietnam_time(sensor_data['timestamp'])
+            sensor_data = self._prepare_sensor_document(sensor_data)
+            self._assign_sequence([sensor_data])
 
             result = self.collection.insert_one(sensor_data)
+            self._record_inserts(self.collection, [sensor_data])
             logger.info(f"Data saved in MongoDB with ID: {result.inserted_id}")
 
             logger.info(f"Temperature: {sensor_data.get('temperature')}°C, "
@@ -61,17 +326,46 @@ class DatabaseManager:
             logger.error(f"Error inserting sensor data: {e}")
             return None
 
+    def insert_sensor_data_batch(self, sensor_data_list: List[Dict[str, Any]]) -> int:
+        if not sensor_data_list:
+            return 0
+
+        documents = self._assign_sequence([self._prepare_sensor_document(item) for item in sensor_data_list])
+        try:
+            result = self.collection.insert_many(documents, ordered=False)
+            inserted = len(result.inserted_ids)
+            self._record_inserts(self.collection, documents)
+        except BulkWriteError as e:
+            inserted = e.details.get('nInserted', 0)
+            write_errors = e.details.get('writeErrors', [])
+            failed = {error.get('index') for error in write_errors}
+            self._record_inserts(self.collection, [document for index, document in enumerate(documents) if index not in failed])
+            duplicates = sum(1 for error in write_errors if error.get('code') == 11000)
+            if duplicates:
+                logger.info(f"Skipped {duplicates} duplicate sensor readings already stored")
+            if len(write_errors) > duplicates:
+                logger.warning(f"Sensor batch partially inserted: {inserted}/{len(documents)}, errors: {len(write_errors) - duplicates}")
+            inserted += duplicates
+
+        logger.info(f"Sensor batch saved in MongoDB: {inserted} records")
+        return inserted
+
     def insert_action_history(self, action_data: Dict[str, Any], collection_name: Optional[str] = 'action_history') -> Optional[str]:
         try:
-            collection = self.db[collection_name]
+            collection = self._get_collection(collection_name)
 
             if 'timestamp' not in action_data:
                 action_data['timestamp'] = get_current_vietnam_time()
             else:
                 if isinstance(action_data['timestamp'], datetime):
                     action_data['timestamp'] = convert_from_vietnam_time(action_data['timestamp'])
+            self._add_local_time_fields(action_data)
 
             result = collection.insert_one(action_data)
+            self._record_inserts(collection, [action_data])
+            if collection_name == 'action_history':
+                self.update_device_state(action_data)
+                self.record_led_daily_stats(action_data)
             logger.info(f"Action history stored in MongoDB with ID: {result.inserted_id}")
             return str(result.inserted_id)
 
@@ -88,14 +382,69 @@ class DatabaseManager:
             return InsertResult(result_id)
         return None
 
-    def get_recent_data(self, limit: Optional[int] = 10) -> List[Dict[str, Any]]:
-        try:
-            cursor = self.collection.find().sort("timestamp", -1)
-            if limit is not None:
-                cursor = cursor.limit(limit)
-            data = list(cursor)
+    def iter_documents(self, collection: Collection, query: Dict[str, Any], sort: List[Tuple[str, int]],
+                       projection: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+                       batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        cursor = collection.find(query, projection).sort(sort).batch_size(batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+        return self._iter_cursor(cursor)
 
-            data = self._convert_timestamps_to_vietnam(data)
+    def _iter_cursor(self, cursor) -> Iterator[Dict[str, Any]]:
+        try:
+            if self.vietnam_time_codec:
+                yield from cursor
+                return
+            for document in cursor:
+                if isinstance(document.get('timestamp'), datetime):
+                    document['timestamp'] = convert_to_vietnam_time(document['timestamp'])
+                yield document
+        finally:
+            cursor.close()
+
+    def iter_sensor_data(self, query: Dict[str, Any], sort: List[Tuple[str, int]] = RECENT_FIRST,
+                         projection: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        return self.iter_documents(self.collection, query, sort, projection, limit)
+
+    def iter_sensor_search(self, query: Dict[str, Any], sort_field: str = 'timestamp', sort_order: str = 'desc', sample: int = 1,
+                           window: Optional[int] = None, projection: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        sort = keyset_sort(sort_field, -1 if sort_order.lower() == 'desc' else 1)
+        if sample > 1 and not query and self.sequence_sampling_ready():
+            return self.iter_sensor_data(self._windowed_query(query, window, sample), sort, projection)
+        if sample > 1 or window:
+            pipeline = self._window_pipeline(query, sort, window, sample)
+            if projection:
+                pipeline.append({'$project': projection})
+            elif sample > 1:
+                pipeline.append({'$project': {'_sample_index': 0}})
+            return self._iter_cursor(self.collection.aggregate(pipeline, allowDiskUse=True, batchSize=STREAM_BATCH_SIZE))
+        return self.iter_sensor_data(query, sort, projection)
+
+    def sensor_time_range_query(self, start_time: datetime, end_time: datetime, device_id: Optional[str] = None) -> Dict[str, Any]:
+        start_utc = convert_from_vietnam_time(start_time) if start_time.tzinfo else start_time.replace(tzinfo=get_vietnam_timezone())
+        end_utc = convert_from_vietnam_time(end_time) if end_time.tzinfo else end_time.replace(tzinfo=get_vietnam_timezone())
+
+        query = {
+            "timestamp": {
+                "$gte": start_utc,
+                "$lte": end_utc
+            }
+        }
+        if device_id:
+            query['device_id'] = device_id
+        return query
+
+    def sensor_date_query(self, date_str: str, device_id: Optional[str] = None) -> Dict[str, Any]:
+        year, month, day = map(int, date_str.split('-'))
+        start_date = create_vietnam_datetime(year, month, day, 0, 0, 0)
+        end_date = create_vietnam_datetime(year, month, day, 23, 59, 59, 999999)
+        return self.sensor_time_range_query(start_date, end_date, device_id)
+
+    def get_recent_data(self, limit: Optional[int] = 10, device_id: Optional[str] = None,
+                        projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        try:
+            query = {'device_id': device_id} if device_id else {}
+            data = list(self.iter_sensor_data(query, [('timestamp', -1)], projection, limit))
 
             logger.info(f"Retrieved {len(data)} recent records")
             return data
@@ -104,10 +453,11 @@ class DatabaseManager:
             logger.error(f"Error retrieving data: {e}")
             return []
 
-    def get_recent_action_history(self, limit: int = 50, collection_name: Optional[str] = 'action_history') -> List[Dict[str, Any]]:
+    def get_recent_action_history(self, limit: int = 50, collection_name: Optional[str] = 'action_history',
+                                  projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         try:
-            collection = self.db[collection_name]
-            cursor = collection.find().sort("timestamp", -1).limit(limit)
+            collection = self._get_collection(collection_name)
+            cursor = collection.find({}, projection).sort("timestamp", -1).limit(limit)
             data = list(cursor)
 
             data = self._convert_timestamps_to_vietnam(data)
@@ -128,7 +478,7 @@ class DatabaseManager:
                                                 per_page: int = 10,
                                                 collection_name: Optional[str] = 'action_history') -> Dict[str, Any]:
         try:
-            collection = self.db[collection_name]
+            collection = self._get_collection(collection_name)
 
             base_query = {}
 
@@ -143,27 +493,21 @@ class DatabaseManager:
 
             if search_term:
                 try:
-                    from datetime import datetime, timedelta
+                    import re
                     search_lower = search_term.lower()
                     search_original = search_term.strip()
+                    current_date = get_current_vietnam_time()
 
-                    time_date_pattern = r'^(\d{1,2}):(\d{1,2}):(\d{1,2})\s+(\d{1,2})/(\d{1,2})/(\d{4})$'
-                    import re
-                    time_date_match = re.match(time_date_pattern, search_original)
+                    time_date_match = re.match(r'^(\d{1,2}):(\d{1,2}):(\d{1,2})\s+(\d{1,2})/(\d{1,2})/(\d{4})$', search_original)
 
                     if time_date_match:
-                        hour = int(time_date_match.group(1))
-                        minute = int(time_date_match.group(2))
-                        second = int(time_date_match.group(3))
-                        day = int(time_date_match.group(4))
-                        month = int(time_date_match.group(5))
-                        year = int(time_date_match.group(6))
+                        hour, minute, second, day, month, year = (int(group) for group in time_date_match.groups())
 
                         try:
-                            search_datetime = datetime(year, month, day, hour, minute, second)
+                            search_datetime = create_vietnam_datetime(year, month, day, hour, minute, second)
                             start_time = search_datetime - timedelta(seconds=30)
                             end_time = search_datetime + timedelta(seconds=30)
-                            base_query['timestamp'] = {'$gte': start_time, '$lte': end_time}
+                            base_query['timestamp'] = {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}
                             logger.info(f"Searching for exact time: {search_datetime}")
                         except ValueError:
                             logger.error(f"Invalid datetime: {search_original}")
@@ -181,10 +525,9 @@ class DatabaseManager:
                         year = int(date_part[2])
 
                         try:
-                            start_time = datetime(year, month, day, hour, minute, 0)
-                            end_time = datetime(year, month, day, hour, minute, 59, 999999)
-                            base_query['timestamp'] = {'$gte': start_time, '$lte': end_time}
-                            logger.info(f"Searching for time: {start_time} to {end_time}")
+                            base_query['local_date'] = date(year, month, day).isoformat()
+                            base_query['local_time'] = {'$gte': f'{hour:02d}:{minute:02d}:00', '$lte': f'{hour:02d}:{minute:02d}:59'}
+                            logger.info(f"Searching for time: {hour:02d}:{minute:02d} {base_query['local_date']}")
                         except ValueError:
                             logger.error(f"Invalid datetime: {search_original}")
                             pass
@@ -196,128 +539,34 @@ class DatabaseManager:
                         year = int(parts[2])
 
                         try:
-                            start_date = datetime(year, month, day, 0, 0, 0)
-                            end_date = datetime(year, month, day, 23, 59, 59)
-                            base_query['timestamp'] = {'$gte': start_date, '$lte': end_date}
-                            logger.info(f"Searching for date: {start_date.date()}")
+                            base_query['local_date'] = date(year, month, day).isoformat()
+                            logger.info(f"Searching for date: {base_query['local_date']}")
                         except ValueError:
                             logger.error(f"Invalid date: {search_original}")
                             pass
 
                     elif re.match(r'^(\d{1,2}):(\d{1,2}):(\d{1,2})$', search_original):
-                        parts = search_original.split(':')
-                        hour = int(parts[0])
-                        minute = int(parts[1])
-                        second = int(parts[2])
-
-                        cursor = collection.find(base_query)
-                        all_data = list(cursor)
-
-                        filtered_data = []
-                        for doc in all_data:
-                            if doc.get('timestamp'):
-                                timestamp_str = str(doc['timestamp'])
-                                if search_original in timestamp_str:
-                                    filtered_data.append(doc)
-
-                        filtered_data.sort(key=lambda x: x.get(sort_field, ''), reverse=(sort_order == 'desc'))
-                        total_count = len(filtered_data)
-                        start_idx = (page - 1) * per_page
-                        end_idx = start_idx + per_page
-                        data = filtered_data[start_idx:end_idx]
-
-                        total_pages = max(1, (total_count + per_page - 1) // per_page)
-                        result = {
-                            'data': data,
-                            'pagination': {
-                                'page': page,
-                                'per_page': per_page,
-                                'total_count': total_count,
-                                'total_pages': total_pages,
-                                'has_prev': page > 1,
-                                'has_next': page < total_pages
-                            },
-                            'filters': {
-                                'device': device_filter,
-                                'state': state_filter,
-                                'search': search_term
-                            },
-                            'sort': {
-                                'field': sort_field,
-                                'order': sort_order
-                            }
-                        }
-
-                        logger.info(f"Action history time search executed: {len(data)} records, page {page}/{total_pages}")
-                        return result
+                        hour, minute, second = (int(part) for part in search_original.split(':'))
+                        base_query['local_time'] = f'{hour:02d}:{minute:02d}:{second:02d}'
+                        logger.info(f"Searching for time of day: {base_query['local_time']}")
 
                     elif search_lower.isdigit() and len(search_lower) == 4:
                         year = int(search_lower)
-                        start_date = datetime(year, 1, 1)
-                        end_date = datetime(year, 12, 31, 23, 59, 59)
-                        base_query['timestamp'] = {'$gte': start_date, '$lte': end_date}
+                        base_query['local_date'] = {'$gte': f'{year:04d}-01-01', '$lte': f'{year:04d}-12-31'}
                         logger.info(f"Searching for year: {year}")
 
                     elif search_lower in ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12']:
                         month = int(search_lower)
-                        current_year = datetime.now().year
-                        start_date = datetime(current_year, month, 1)
-                        if month == 12:
-                            end_date = datetime(current_year + 1, 1, 1) - timedelta(seconds=1)
-                        else:
-                            end_date = datetime(current_year, month + 1, 1) - timedelta(seconds=1)
-                        base_query['timestamp'] = {'$gte': start_date, '$lte': end_date}
+                        base_query['local_date'] = {'$regex': f'^{current_date.year:04d}-{month:02d}-'}
                         logger.info(f"Searching for month: {month}")
 
                     elif search_lower.isdigit() and 1 <= int(search_lower) <= 31:
                         day = int(search_lower)
-                        current_date = datetime.now()
-                        start_date = current_date.replace(day=day, hour=0, minute=0, second=0, microsecond=0)
-                        end_date = current_date.replace(day=day, hour=23, minute=59, second=59, microsecond=999999)
-                        base_query['timestamp'] = {'$gte': start_date, '$lte': end_date}
+                        base_query['local_date'] = current_date.date().replace(day=day).isoformat()
                         logger.info(f"Searching for day: {day}")
 
                     else:
-                        cursor = collection.find(base_query)
-                        all_data = list(cursor)
-
-                        filtered_data = []
-                        for doc in all_data:
-                            if doc.get('timestamp'):
-                                timestamp_str = str(doc['timestamp'])
-                                if search_term.lower() in timestamp_str.lower():
-                                    filtered_data.append(doc)
-
-                        filtered_data.sort(key=lambda x: x.get(sort_field, ''), reverse=(sort_order == 'desc'))
-                        total_count = len(filtered_data)
-                        start_idx = (page - 1) * per_page
-                        end_idx = start_idx + per_page
-                        data = filtered_data[start_idx:end_idx]
-
-                        total_pages = max(1, (total_count + per_page - 1) // per_page)
-                        result = {
-                            'data': data,
-                            'pagination': {
-                                'page': page,
-                                'per_page': per_page,
-                                'total_count': total_count,
-                                'total_pages': total_pages,
-                                'has_prev': page > 1,
-                                'has_next': page < total_pages
-                            },
-                            'filters': {
-                                'device': device_filter,
-                                'state': state_filter,
-                                'search': search_term
-                            },
-                            'sort': {
-                                'field': sort_field,
-                                'order': sort_order
-                            }
-                        }
-
-                        logger.info(f"Action history search executed: {len(data)} records, page {page}/{total_pages}")
-                        return result
+                        base_query.update(self._local_time_text_query(search_original))
 
                 except Exception as e:
                     logger.error(f"Error in search logic: {e}")
@@ -327,7 +576,7 @@ class DatabaseManager:
 
             skip = (page - 1) * per_page
 
-            total_count = collection.count_documents(base_query)
+            total_count, _ = self._count(collection, base_query)
 
             cursor = collection.find(base_query).sort(sort_criteria).skip(skip).limit(per_page)
             data = list(cursor)
@@ -399,9 +648,10 @@ class DatabaseManager:
             logger.error(f"Error retrieving data by time range: {e}")
             return []
 
-    def get_filtered_data(self, query_filter: Dict[str, Any], limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+    def get_filtered_data(self, query_filter: Dict[str, Any], limit: Optional[int] = 100,
+                          projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         try:
-            cursor = self.collection.find(query_filter).sort("timestamp", -1)
+            cursor = self.collection.find(query_filter, projection).sort("timestamp", -1)
             if limit is not None:
                 cursor = cursor.limit(limit)
             data = list(cursor)
@@ -440,7 +690,10 @@ class DatabaseManager:
                                       sort_order: str = 'desc',
                                       page: int = 1,
                                       per_page: int = 10,
-                                      limit: Optional[int] = None) -> Dict[str, Any]:
+                                      limit: Optional[int] = None,
+                                      after: Optional[str] = None,
+                                      before: Optional[str] = None,
+                                      estimated: bool = False) -> Dict[str, Any]:
         try:
             base_query = query_filter or {}
 
@@ -458,7 +711,7 @@ class DatabaseManager:
                     except ValueError:
                         pass
 
-                    search_conditions.append({"timestamp": {"$regex": search_term, "$options": "i"}})
+                    search_conditions.extend(self._local_time_text_query(search_term)["$or"])
 
                 elif search_criteria == 'temperature':
                     try:
@@ -482,40 +735,33 @@ class DatabaseManager:
                         search_conditions.append({"light": {"$regex": search_term, "$options": "i"}})
 
                 elif search_criteria == 'time':
-                    search_conditions.append({"timestamp": {"$regex": search_term, "$options": "i"}})
+                    search_conditions.extend(self._local_time_text_query(search_term)["$or"])
 
                 if search_conditions:
                     base_query["$or"] = search_conditions
 
-            sort_criteria = [(sort_field, -1 if sort_order == 'desc' else 1)]
-
-            skip = (page - 1) * per_page
-
-            total_count = self.collection.count_documents(base_query)
-
-            cursor = self.collection.find(base_query).sort(sort_criteria)
-
             if limit:
-                cursor = cursor.limit(limit)
-            else:
-                cursor = cursor.skip(skip).limit(per_page)
-
-            data = list(cursor)
-
-            data = self._convert_timestamps_to_vietnam(data)
-
-            total_pages = max(1, (total_count + per_page - 1) // per_page) if not limit else 1
-
-            result = {
-                'data': data,
-                'pagination': {
+                sort_criteria = [(sort_field, -1 if sort_order == 'desc' else 1)]
+                total_count, total_source = self._count(self.collection, base_query, estimated)
+                data = self._convert_timestamps_to_vietnam(list(self.collection.find(base_query).sort(sort_criteria).limit(limit)))
+                total_pages = 1
+                pagination = {
                     'page': page,
                     'per_page': per_page,
                     'total_count': total_count,
+                    'total_exact': total_source == 'exact',
+                    'total_source': total_source,
                     'total_pages': total_pages,
                     'has_prev': page > 1,
                     'has_next': page < total_pages
-                },
+                }
+            else:
+                data, pagination = self._paginate(self.collection, base_query, sort_field, sort_order, page, per_page, after, before, estimated)
+                total_pages = pagination['total_pages']
+
+            result = {
+                'data': data,
+                'pagination': pagination,
                 'sort': {
                     'field': sort_field,
                     'order': sort_order
@@ -529,6 +775,8 @@ class DatabaseManager:
             logger.info(f"CRUD query executed: {len(data)} records, page {page}/{total_pages}")
             return result
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Error in CRUD operations: {e}")
             return {
@@ -546,12 +794,10 @@ class DatabaseManager:
             }
 
     def close_connection(self):
-        try:
-            if self.mongo_client:
-                self.mongo_client.close()
-                logger.info("MongoDB connection closed")
-        except Exception as e:
-            logger.error(f"Error closing MongoDB connection: {e}")
+        self.mongo_client = None
+        self.db = None
+        self.collection = None
+        logger.info("MongoDB connection released to shared pool")
 
     def is_connected(self) -> bool:
         try:
@@ -562,22 +808,11 @@ class DatabaseManager:
             pass
         return False
 
-    def search_by_time_range_optimized(self, start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
+    def search_by_time_range_optimized(self, start_time: datetime, end_time: datetime, device_id: Optional[str] = None,
+                                       projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         try:
-            start_utc = convert_from_vietnam_time(start_time) if start_time.tzinfo else start_time.replace(tzinfo=get_vietnam_timezone())
-            end_utc = convert_from_vietnam_time(end_time) if end_time.tzinfo else end_time.replace(tzinfo=get_vietnam_timezone())
-
-            query = {
-                "timestamp": {
-                    "$gte": start_utc,
-                    "$lte": end_utc
-                }
-            }
-
-            cursor = self.collection.find(query).sort("timestamp", 1)
-            data = list(cursor)
-
-            data = self._convert_timestamps_to_vietnam(data)
+            query = self.sensor_time_range_query(start_time, end_time, device_id)
+            data = list(self.iter_sensor_data(query, [('timestamp', 1)], projection))
 
             logger.info(f"Time range search found {len(data)} records from {start_time} to {end_time}")
             return data
@@ -586,7 +821,7 @@ class DatabaseManager:
             logger.error(f"Time range search error: {e}")
             return []
 
-    def search_by_multiple_criteria(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def search_by_multiple_criteria(self, criteria: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         try:
             query = {}
 
@@ -661,10 +896,7 @@ class DatabaseManager:
                 is_time_format = any(re.match(pattern, search_term) for pattern in time_patterns)
 
                 if is_time_format:
-                    time_search_data = self.search_by_time_string(search_term)
-                    if time_search_data:
-                        time_ids = [item['_id'] for item in time_search_data if '_id' in item]
-                        query['_id'] = {'$in': time_ids}
+                    query.setdefault('$and', []).append(self._time_string_query(search_term))
                 else:
                     or_conditions = []
 
@@ -678,12 +910,12 @@ class DatabaseManager:
                     except ValueError:
                         pass
 
-                    or_conditions.append({'timestamp': {'$regex': search_term, '$options': 'i'}})
+                    or_conditions.extend(self._local_time_text_query(search_term)['$or'])
 
                     if or_conditions:
                         query['$or'] = or_conditions
 
-            cursor = self.collection.find(query).sort("timestamp", -1)
+            cursor = self.collection.find(query, projection).sort("timestamp", -1)
             data = list(cursor)
 
             data = self._convert_timestamps_to_vietnam(data)
@@ -696,46 +928,33 @@ class DatabaseManager:
             return []
 
     def search_with_pagination_optimized(self, query: Dict[str, Any], page: int = 1, per_page: int = 10,
-                                         sort_field: str = "timestamp", sort_order: str = "desc") -> Dict[str, Any]:
+                                         sort_field: str = "timestamp", sort_order: str = "desc",
+                                         after: Optional[str] = None, before: Optional[str] = None,
+                                         estimated: bool = False) -> Dict[str, Any]:
         try:
-            skip = (page - 1) * per_page
-
-            sort_direction = -1 if sort_order.lower() == "desc" else 1
-            sort_criteria = [(sort_field, sort_direction)]
-
-            total_count = self.collection.count_documents(query)
-
-            cursor = self.collection.find(query).sort(sort_criteria).skip(skip).limit(per_page)
-            data = list(cursor)
-
-            data = self._convert_timestamps_to_vietnam(data)
-
-            total_pages = max(1, (total_count + per_page - 1) // per_page)
+            data, pagination = self._paginate(self.collection, query, sort_field, sort_order, page, per_page, after, before, estimated)
 
             result = {
                 'data': data,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total_count': total_count,
-                    'total_pages': total_pages,
-                    'has_prev': page > 1,
-                    'has_next': page < total_pages
-                }
+                'pagination': pagination
             }
 
-            logger.info(f"Paginated search: {len(data)} records, page {page}/{total_pages}")
+            logger.info(f"Paginated search: {len(data)} records ({pagination['mode']} mode, page {pagination['page']}/{pagination['total_pages']})")
             return result
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Paginated search error: {e}")
             return {'data': [], 'pagination': {'page': 1, 'per_page': per_page, 'total_count': 0, 'total_pages': 1, 'has_prev': False, 'has_next': False}}
 
     def search_action_history(self, search_term: str = '', device_filter: str = 'all',
                               state_filter: str = 'all', sort_field: str = 'timestamp',
-                              sort_order: str = 'desc', page: int = 1, per_page: int = 10) -> Dict[str, Any]:
+                              sort_order: str = 'desc', page: int = 1, per_page: int = 10,
+                              after: Optional[str] = None, before: Optional[str] = None,
+                              estimated: bool = False, projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         try:
-            action_collection = self.db.get_collection('action_history')
+            action_collection = self._get_collection('action_history')
             query = {}
 
             if device_filter and device_filter != 'all':
@@ -827,29 +1046,15 @@ class DatabaseManager:
                         end_time = search_datetime.replace(second=59, microsecond=999999)
                         query['timestamp'] = {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}
 
-            sort_direction = -1 if sort_order.lower() == "desc" else 1
-            sort_criteria = [(sort_field, sort_direction)]
-
-            skip = (page - 1) * per_page
-            total_count = action_collection.count_documents(query)
-
-            cursor = action_collection.find(query).sort(sort_criteria).skip(skip).limit(per_page)
-            data = list(cursor)
-
-            data = self._convert_timestamps_to_vietnam(data)
-
-            total_pages = max(1, (total_count + per_page - 1) // per_page)
+            projection = with_sort_keys(projection, sort_field)
+            key = {'query': query, 'sort': [sort_field, sort_order], 'page': None if after or before else page, 'per_page': per_page,
+                   'projection': projection, 'after': after, 'before': before, 'estimated': estimated}
+            data, pagination = query_cache.get_or_load(action_collection.name, key, lambda: self._paginate(
+                action_collection, query, sort_field, sort_order, page, per_page, after, before, estimated, projection))
 
             result = {
                 'data': data,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total_count': total_count,
-                    'total_pages': total_pages,
-                    'has_prev': page > 1,
-                    'has_next': page < total_pages
-                },
+                'pagination': pagination,
                 'filters': {
                     'device': device_filter,
                     'state': state_filter,
@@ -861,16 +1066,18 @@ class DatabaseManager:
                 }
             }
 
-            logger.info(f"Action history search: {len(data)} records, page {page}/{total_pages}")
+            logger.info(f"Action history search: {len(data)} records ({pagination['mode']} mode, page {pagination['page']}/{pagination['total_pages']})")
             return result
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Action history search error: {e}")
             return {'data': [], 'pagination': {'page': 1, 'per_page': per_page, 'total_count': 0, 'total_pages': 1, 'has_prev': False, 'has_next': False}}
 
     def get_recent_action_history_optimized(self, limit: int = 50) -> List[Dict[str, Any]]:
         try:
-            action_collection = self.db.get_collection('action_history')
+            action_collection = self._get_collection('action_history')
             cursor = action_collection.find().sort("timestamp", -1).limit(limit)
             data = list(cursor)
 
@@ -885,7 +1092,7 @@ class DatabaseManager:
 
     def save_action_history(self, action_data: Dict[str, Any]) -> bool:
         try:
-            action_collection = self.db.get_collection('action_history')
+            action_collection = self._get_collection('action_history')
 
             if 'timestamp' in action_data:
                 timestamp = action_data['timestamp']
@@ -894,10 +1101,18 @@ class DatabaseManager:
                 else:
                     from app.core.timezone_utils import convert_to_utc
                     action_data['timestamp'] = convert_to_utc(timestamp)
+            self._add_local_time_fields(action_data)
 
-            result = action_collection.insert_one(action_data)
+            try:
+                result = action_collection.insert_one(action_data)
+            except DuplicateKeyError:
+                logger.info(f"Duplicate action history ignored: {action_data.get('type', 'unknown')} - {action_data.get('led', 'unknown')}")
+                return True
 
             if result.inserted_id:
+                self._record_inserts(action_collection, [action_data])
+                self.update_device_state(action_data)
+                self.record_led_daily_stats(action_data)
                 logger.info(f"Action history saved: {action_data.get('type', 'unknown')} - {action_data.get('led', 'unknown')}")
                 return True
             else:
@@ -908,40 +1123,68 @@ class DatabaseManager:
             logger.error(f"Error saving action history: {e}")
             return False
 
+    def update_device_state(self, action_data: Dict[str, Any], led_id: Optional[str] = None) -> bool:
+        led_state = led_state_from_record(action_data, led_id)
+        if not led_state:
+            return False
+
+        led_id, state = led_state
+        timestamp = action_data.get('timestamp')
+        guard = {'_id': led_id}
+        if isinstance(timestamp, datetime):
+            guard['$or'] = [{'timestamp': {'$lte': timestamp}}, {'timestamp': {'$exists': False}}]
+
+        try:
+            self._get_collection(DEVICE_STATE_COLLECTION).update_one(
+                guard,
+                {'$set': {'state': state, 'timestamp': timestamp, 'updated_at': get_current_vietnam_time()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            logger.debug(f"Ignoring stale state for {led_id}: {state} at {timestamp}")
+            return False
+        except Exception as e:
+            logger.error(f"Error updating device state for {led_id}: {e}")
+            device_state_cache.invalidate()
+            return False
+
+        device_state_cache.update(led_id, state)
+        return True
+
+    def _find_latest_led_record(self, led_id: str) -> Optional[Dict[str, Any]]:
+        return self._get_collection('action_history').find_one(
+            {
+                '$or': [
+                    {'led': led_id},
+                    {'device': led_id},
+                    {'action': {'$regex': f'^{led_id}_'}}
+                ]
+            },
+            sort=[('timestamp', -1)]
+        )
+
     def get_latest_led_status(self) -> Dict[str, str]:
+        led_states = device_state_cache.get()
+        if led_states is not None:
+            return led_states
+
         try:
-            action_collection = self.db.get_collection('action_history')
-
-            led_states = {'LED1': 'OFF', 'LED2': 'OFF', 'LED3': 'OFF', 'LED4': 'OFF'}
-
-            for led_id in ['LED1', 'LED2', 'LED3', 'LED4']:
-                latest_record = action_collection.find_one(
-                    {
-                        '$or': [
-                            {'led': led_id},
-                            {'device': led_id},
-                            {'action': {'$regex': f'^{led_id}_'}}
-                        ]
-                    },
-                    sort=[('timestamp', -1)]
-                )
-
-                if latest_record:
-                    state = None
-                    if 'state' in latest_record:
-                        state = latest_record['state']
-                    elif 'action' in latest_record:
-                        action = latest_record['action']
-                        if '_' in action and action.startswith(led_id):
-                            state = action.split('_')[1]
-
-                    if state:
-                        state_str = str(state).upper()
-                        if state_str in ['ON', '1', 'TRUE']:
-                            led_states[led_id] = 'ON'
-                        elif state_str in ['OFF', '0', 'FALSE']:
-                            led_states[led_id] = 'OFF'
+            led_states = {led_id: 'OFF' for led_id in LED_IDS}
+            stored = {doc['_id']: doc.get('state') for doc in self._get_collection(DEVICE_STATE_COLLECTION).find({'_id': {'$in': LED_IDS}})}
+
+            for led_id in LED_IDS:
+                if led_id in stored:
+                    led_states[led_id] = stored[led_id] or 'OFF'
+                    continue
+
+                latest_record = self._find_latest_led_record(led_id)
+                if latest_record and self.update_device_state(latest_record, led_id):
+                    led_states[led_id] = led_state_from_record(latest_record, led_id)[1]
+                else:
+                    self._get_collection(DEVICE_STATE_COLLECTION).update_one(
+                        {'_id': led_id}, {'$setOnInsert': {'state': 'OFF', 'updated_at': get_current_vietnam_time()}}, upsert=True)
 
+            device_state_cache.set(led_states)
             logger.info(f"Latest LED status retrieved: {led_states}")
             return led_states
 
@@ -949,139 +1192,200 @@ class DatabaseManager:
             logger.error(f"Error getting latest LED status: {e}")
             return {'LED1': 'OFF', 'LED2': 'OFF', 'LED3': 'OFF', 'LED4': 'OFF'}
 
-    def get_led_toggle_stats(self, date: str = None) -> Dict[str, int]:
+    def record_led_daily_stats(self, action_data: Dict[str, Any]) -> bool:
+        led = action_data.get('led')
+        state = action_data.get('state')
+        local_date = action_data.get('local_date')
+        if not isinstance(led, str) or not isinstance(state, str) or not state.isalnum() or not local_date:
+            return False
+
+        try:
+            stats_collection = self._get_collection(LED_DAILY_STATS_COLLECTION)
+            if not DatabaseManager._led_stats_meta_ready:
+                stats_collection.update_one({'_id': 'meta'}, {'$setOnInsert': {'counters_since': local_date}}, upsert=True)
+                DatabaseManager._led_stats_meta_ready = True
+
+            stats_collection.update_one(
+                {'_id': f'{local_date}|{led}'},
+                {'$inc': {f'counts.{state}': 1}, '$set': {'local_date': local_date, 'led': led}},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error updating LED daily stats: {e}")
+            return False
+
+    def _led_toggle_counts_from_history(self, start_date: Optional[str], end_date: Optional[str]) -> Dict[str, int]:
+        match = {'led': {'$in': LED_IDS}, 'state': 'ON'}
+        timestamp_range = {}
+        if start_date:
+            year, month, day = map(int, start_date.split('-'))
+            timestamp_range['$gte'] = convert_from_vietnam_time(create_vietnam_datetime(year, month, day))
+        if end_date:
+            year, month, day = map(int, end_date.split('-'))
+            timestamp_range['$lt'] = convert_from_vietnam_time(create_vietnam_datetime(year, month, day) + timedelta(days=1))
+        if timestamp_range:
+            match['timestamp'] = timestamp_range
+
+        pipeline = [{'$match': match}, {'$group': {'_id': '$led', 'count': {'$sum': 1}}}]
+        return {row['_id']: row['count'] for row in self._get_collection('action_history').aggregate(pipeline)}
+
+    def get_led_toggle_stats(self, date: str = None, start_date: str = None, end_date: str = None) -> Dict[str, int]:
         try:
-            from app.core.timezone_utils import get_vietnam_timezone, create_vietnam_datetime
-            action_collection = self.db.get_collection('action_history')
-            
-            led_stats = {
-                'LED1': 0,
-                'LED2': 0,
-                'LED3': 0,
-                'LED4': 0
-            }
-            
-            query_base = {}
             if date:
-                try:
-                    vn_tz = get_vietnam_timezone()
-                    selected_date = datetime.strptime(date, '%Y-%m-%d')
-                    start_time = create_vietnam_datetime(
-                        selected_date.year, selected_date.month, selected_date.day,
-                        hour=0, minute=0, second=0, microsecond=0
-                    )
-                    end_time = start_time.replace(hour=23, minute=59, second=59, microsecond=999999)
-                    
-                    query_base['timestamp'] = {
-                        '$gte': convert_from_vietnam_time(start_time),
-                        '$lte': convert_from_vietnam_time(end_time)
-                    }
-                    logger.info(f"Filtering LED stats by date: {date} ({start_time} to {end_time})")
-                except ValueError as e:
-                    logger.warning(f"Invalid date format: {date}, using all data. Error: {e}")
-            
-            for led_id in ['LED1', 'LED2', 'LED3', 'LED4']:
-                query = {
-                    **query_base,
-                    'led': led_id,
-                    'state': {'$in': ['ON']}
-                }
-                count = action_collection.count_documents(query)
-                led_stats[led_id] = count
-            
-            logger.info(f"LED toggle stats retrieved (date={date}): {led_stats}")
+                start_date = end_date = date
+            try:
+                for value in (start_date, end_date):
+                    if value:
+                        datetime.strptime(value, '%Y-%m-%d')
+            except ValueError as e:
+                logger.warning(f"Invalid date format: {start_date}..{end_date}, using all data. Error: {e}")
+                start_date = end_date = None
+
+            led_stats = {led_id: 0 for led_id in LED_IDS}
+            stats_collection = self._get_collection(LED_DAILY_STATS_COLLECTION)
+            counters_since = (stats_collection.find_one({'_id': 'meta'}) or {}).get('counters_since')
+            history_end = end_date
+
+            if counters_since is not None:
+                date_range = {'$gt': counters_since}
+                if start_date:
+                    date_range['$gte'] = start_date
+                if end_date:
+                    date_range['$lte'] = end_date
+                pipeline = [
+                    {'$match': {'local_date': date_range, 'led': {'$in': LED_IDS}}},
+                    {'$group': {'_id': '$led', 'count': {'$sum': '$counts.ON'}}}
+                ]
+                for row in stats_collection.aggregate(pipeline):
+                    led_stats[row['_id']] += row['count']
+                history_end = min(end_date, counters_since) if end_date else counters_since
+
+            if counters_since != '' and not (start_date and history_end and history_end < start_date):
+                for led_id, count in self._led_toggle_counts_from_history(start_date, history_end).items():
+                    led_stats[led_id] += count
+
+            logger.info(f"LED toggle stats retrieved ({start_date}..{end_date}): {led_stats}")
             return led_stats
-            
+
         except Exception as e:
             logger.error(f"Error getting LED toggle stats: {e}")
             return {'LED1': 0, 'LED2': 0, 'LED3': 0, 'LED4': 0}
 
-    def search_by_time_string(self, time_string: str) -> List[Dict[str, Any]]:
-        try:
-            import re
-            from app.core.timezone_utils import get_vietnam_timezone, create_vietnam_datetime
+    def _time_string_query(self, time_string: str) -> Optional[Dict[str, Any]]:
+        import re
+        from app.core.timezone_utils import get_vietnam_timezone, create_vietnam_datetime
+
+        current_time = datetime.now(get_vietnam_timezone())
+
+        if re.match(r'^(\d{1,2}):(\d{1,2}):(\d{1,2})\s+(\d{1,2})/(\d{1,2})/(\d{4})$', time_string):
+            parts = time_string.split()
+            time_part = parts[0].split(':')
+            date_part = parts[1].split('/')
+
+            hour = int(time_part[0])
+            minute = int(time_part[1])
+            second = int(time_part[2])
+            day = int(date_part[0])
+            month = int(date_part[1])
+            year = int(date_part[2])
+
+            search_datetime = create_vietnam_datetime(year, month, day, hour, minute, second)
+            start_time = search_datetime
+            end_time = search_datetime.replace(microsecond=999999)
+            return {'timestamp': {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}}
+
+        elif re.match(r'^(\d{1,2}):(\d{1,2}):(\d{1,2})$', time_string):
+            parts = time_string.split(':')
+            hour = int(parts[0])
+            minute = int(parts[1])
+            second = int(parts[2])
+
+            search_datetime = current_time.replace(hour=hour, minute=minute, second=second, microsecond=0)
+            start_time = search_datetime
+            end_time = search_datetime.replace(microsecond=999999)
+            return {'timestamp': {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}}
+
+        elif re.match(r'^(\d{1,2}):(\d{1,2})$', time_string):
+            parts = time_string.split(':')
+            hour = int(parts[0])
+            minute = int(parts[1])
+
+            search_datetime = current_time.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            start_time = search_datetime
+            end_time = search_datetime.replace(second=59, microsecond=999999)
+            return {'timestamp': {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}}
+
+        elif re.match(r'^(\d{1,2})/(\d{1,2})/(\d{4})$', time_string):
+            parts = time_string.split('/')
+            day = int(parts[0])
+            month = int(parts[1])
+            year = int(parts[2])
 
-            query = {}
-            current_time = datetime.now(get_vietnam_timezone())
-
-            if re.match(r'^(\d{1,2}):(\d{1,2}):(\d{1,2})\s+(\d{1,2})/(\d{1,2})/(\d{4})$', time_string):
-                parts = time_string.split()
-                time_part = parts[0].split(':')
-                date_part = parts[1].split('/')
-
-                hour = int(time_part[0])
-                minute = int(time_part[1])
-                second = int(time_part[2])
-                day = int(date_part[0])
-                month = int(date_part[1])
-                year = int(date_part[2])
-
-                search_datetime = create_vietnam_datetime(year, month, day, hour, minute, second)
-                start_time = search_datetime
-                end_time = search_datetime.replace(microsecond=999999)
-                query['timestamp'] = {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}
-
-            elif re.match(r'^(\d{1,2}):(\d{1,2}):(\d{1,2})$', time_string):
-                parts = time_string.split(':')
-                hour = int(parts[0])
-                minute = int(parts[1])
-                second = int(parts[2])
-
-                search_datetime = current_time.replace(hour=hour, minute=minute, second=second, microsecond=0)
-                start_time = search_datetime
-                end_time = search_datetime.replace(microsecond=999999)
-                query['timestamp'] = {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}
-
-            elif re.match(r'^(\d{1,2}):(\d{1,2})$', time_string):
-                parts = time_string.split(':')
-                hour = int(parts[0])
-                minute = int(parts[1])
-
-                search_datetime = current_time.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                start_time = search_datetime
-                end_time = search_datetime.replace(second=59, microsecond=999999)
-                query['timestamp'] = {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}
-
-            elif re.match(r'^(\d{1,2})/(\d{1,2})/(\d{4})$', time_string):
-                parts = time_string.split('/')
-                day = int(parts[0])
-                month = int(parts[1])
-                year = int(parts[2])
-
-                start_date = create_vietnam_datetime(year, month, day, 0, 0, 0)
-                end_date = create_vietnam_datetime(year, month, day, 23, 59, 59, 999999)
-                query['timestamp'] = {'$gte': convert_from_vietnam_time(start_date), '$lte': convert_from_vietnam_time(end_date)}
-
-            elif re.match(r'^(\d{1,2}):(\d{1,2})\s+(\d{1,2})/(\d{1,2})/(\d{4})$', time_string):
-                parts = time_string.split()
-                time_part = parts[0].split(':')
-                date_part = parts[1].split('/')
-
-                hour = int(time_part[0])
-                minute = int(time_part[1])
-                day = int(date_part[0])
-                month = int(date_part[1])
-                year = int(date_part[2])
-
-                start_time = create_vietnam_datetime(year, month, day, hour, minute, 0)
-                end_time = create_vietnam_datetime(year, month, day, hour, minute, 59, 999999)
-                query['timestamp'] = {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}
+            start_date = create_vietnam_datetime(year, month, day, 0, 0, 0)
+            end_date = create_vietnam_datetime(year, month, day, 23, 59, 59, 999999)
+            return {'timestamp': {'$gte': convert_from_vietnam_time(start_date), '$lte': convert_from_vietnam_time(end_date)}}
 
-            else:
-                cursor = self.collection.find({})
-                all_data = list(cursor)
+        elif re.match(r'^(\d{1,2}):(\d{1,2})\s+(\d{1,2})/(\d{1,2})/(\d{4})$', time_string):
+            parts = time_string.split()
+            time_part = parts[0].split(':')
+            date_part = parts[1].split('/')
+
+            hour = int(time_part[0])
+            minute = int(time_part[1])
+            day = int(date_part[0])
+            month = int(date_part[1])
+            year = int(date_part[2])
+
+            start_time = create_vietnam_datetime(year, month, day, hour, minute, 0)
+            end_time = create_vietnam_datetime(year, month, day, hour, minute, 59, 999999)
+            return {'timestamp': {'$gte': convert_from_vietnam_time(start_time), '$lte': convert_from_vietnam_time(end_time)}}
 
-                filtered_data = []
-                for doc in all_data:
-                    if doc.get('timestamp'):
-                        timestamp_str = str(doc['timestamp'])
-                        if time_string in timestamp_str:
-                            filtered_data.append(doc)
+        return None
+
+    def _local_time_text_query(self, text: str) -> Dict[str, Any]:
+        import re
+        prefix = f'^{re.escape(text.strip())}'
+        return {'$or': [{'local_date': {'$regex': prefix}}, {'local_time': {'$regex': prefix}}]}
 
-                filtered_data = self._convert_timestamps_to_vietnam(filtered_data)
+    def build_sensor_search_query(self, search_term: str, search_criteria: str = 'all') -> Optional[Dict[str, Any]]:
+        search_term = (search_term or '').strip()
+        if not search_term:
+            return {}
 
-                logger.info(f"Text search in timestamp found {len(filtered_data)} records")
-                return filtered_data
+        if search_criteria in ('temperature', 'humidity', 'light'):
+            try:
+                return {search_criteria: float(search_term)}
+            except ValueError:
+                return None
+
+        try:
+            time_query = self._time_string_query(search_term)
+        except ValueError:
+            logger.warning(f"Invalid date/time in search: {search_term}")
+            return None
+        if time_query is not None:
+            return time_query
+        if search_criteria == 'time':
+            return self._local_time_text_query(search_term)
+
+        conditions = []
+        try:
+            search_value = float(search_term)
+            conditions.extend({field: search_value} for field in ('temperature', 'humidity', 'light'))
+        except ValueError:
+            pass
+        conditions.extend(self._local_time_text_query(search_term)['$or'])
+        return {'$or': conditions}
+
+    def search_by_time_string(self, time_string: str) -> List[Dict[str, Any]]:
+        try:
+            query = self._time_string_query(time_string)
+
+            if query is None:
+                data = self._convert_timestamps_to_vietnam(list(self.collection.find(self._local_time_text_query(time_string)).sort("timestamp", -1)))
+                logger.info(f"Text search in local date/time found {len(data)} records")
+                return data
 
             cursor = self.collection.find(query).sort("timestamp", -1)
             data = list(cursor)
@@ -1095,28 +1399,10 @@ class DatabaseManager:
             logger.error(f"Time string search error: {e}")
             return []
 
-    def get_data_by_date(self, date_str: str) -> List[Dict[str, Any]]:
+    def get_data_by_date(self, date_str: str, projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         try:
-            from datetime import datetime
-            from app.core.timezone_utils import create_vietnam_datetime, convert_from_vietnam_time
-            
-            year, month, day = map(int, date_str.split('-'))
-            
-            start_date = create_vietnam_datetime(year, month, day, 0, 0, 0)
-            end_date = create_vietnam_datetime(year, month, day, 23, 59, 59, 999999)
-            
-            query = {
-                'timestamp': {
-                    '$gte': convert_from_vietnam_time(start_date),
-                    '$lte': convert_from_vietnam_time(end_date)
-                }
-            }
-            
-            cursor = self.collection.find(query).sort("timestamp", -1)
-            data = list(cursor)
-            
-            data = self._convert_timestamps_to_vietnam(data)
-            
+            data = list(self.iter_sensor_data(self.sensor_date_query(date_str), [('timestamp', -1)], projection))
+
             logger.info(f"Retrieved {len(data)} records for date: {date_str}")
             return data
             
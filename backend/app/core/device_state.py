@@ -0,0 +1,74 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import DEVICE_STATE_CACHE_TTL_SECONDS
+
+DEVICE_STATE_COLLECTION = 'device_state'
+LED_IDS = ['LED1', 'LED2', 'LED3', 'LED4']
+
+
+def normalize_led_state(state: Any) -> Optional[str]:
+    state_str = str(state).upper()
+    if state_str in ['ON', '1', 'TRUE']:
+        return 'ON'
+    if state_str in ['OFF', '0', 'FALSE']:
+        return 'OFF'
+    return None
+
+
+def led_state_from_record(record: Dict[str, Any], led_id: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    led = led_id or record.get('led') or record.get('device')
+    action = record.get('action')
+    if not led and isinstance(action, str) and '_' in action:
+        led = action.split('_')[0]
+    if not led:
+        return None
+
+    state = None
+    if 'state' in record:
+        state = record['state']
+    elif isinstance(action, str) and '_' in action and action.startswith(led):
+        state = action.split('_')[1]
+
+    state = normalize_led_state(state) if state is not None else None
+    return (str(led).upper(), state) if state else None
+
+
+class DeviceStateCache:
+
+    def __init__(self, ttl_seconds: float = DEVICE_STATE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._states: Optional[Dict[str, str]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self) -> Optional[Dict[str, str]]:
+        with self._lock:
+            if self._states is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(self._states)
+
+    def set(self, states: Dict[str, str]):
+        with self._lock:
+            self._states = dict(states)
+            self._loaded_at = time.monotonic()
+
+    def update(self, led_id: str, state: str):
+        with self._lock:
+            if self._states is not None:
+                self._states[led_id] = state
+
+    def invalidate(self):
+        with self._lock:
+            self._states = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'ttl_seconds': self.ttl_seconds, 'hits': self.hits, 'misses': self.misses, 'loaded': self._states is not None}
+
+
+device_state_cache = DeviceStateCache()
@@ -0,0 +1,218 @@
+import argparse
+import sys
+from datetime import timedelta
+from typing import Any, Dict, List
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app.core.logger_config import logger
+from app.core.config import MONGODB_COLLECTION_NAME
+from app.core.mongo_pool import mongo_pool
+from app.core.timezone_utils import get_current_vietnam_time, convert_from_vietnam_time
+from app.core.pagination import keyset_sort, seek_condition
+
+ACTION_HISTORY_COLLECTION = 'action_history'
+LED_DAILY_STATS_COLLECTION = 'led_daily_stats'
+DATA_CALENDAR_COLLECTION = 'data_calendar'
+
+INGEST_KEY_INDEX = {
+    'keys': [('ingest_key', ASCENDING)],
+    'name': 'ingest_key_unique',
+    'unique': True,
+    'partialFilterExpression': {'ingest_key': {'$exists': True}}
+}
+
+INDEX_DEFINITIONS: Dict[str, List[Dict[str, Any]]] = {
+    MONGODB_COLLECTION_NAME: [
+        {'keys': [('timestamp', DESCENDING), ('_id', DESCENDING), ('sample_seq', ASCENDING)], 'name': 'timestamp_id_sample_seq'},
+        {'keys': [('device_id', ASCENDING), ('timestamp', DESCENDING)], 'name': 'device_id_timestamp'},
+        {'keys': [('temperature', ASCENDING), ('_id', ASCENDING)], 'name': 'temperature_id'},
+        {'keys': [('humidity', ASCENDING), ('_id', ASCENDING)], 'name': 'humidity_id'},
+        {'keys': [('light', ASCENDING), ('_id', ASCENDING)], 'name': 'light_id'},
+        {'keys': [('local_date', ASCENDING), ('timestamp', DESCENDING)], 'name': 'local_date_timestamp'},
+        {'keys': [('local_time', ASCENDING), ('timestamp', DESCENDING)], 'name': 'local_time_timestamp'},
+        INGEST_KEY_INDEX
+    ],
+    ACTION_HISTORY_COLLECTION: [
+        {'keys': [('timestamp', DESCENDING), ('_id', DESCENDING)], 'name': 'timestamp_id'},
+        {'keys': [('led', ASCENDING), ('timestamp', DESCENDING)], 'name': 'led_timestamp'},
+        {'keys': [('led', ASCENDING), ('state', ASCENDING), ('timestamp', DESCENDING)], 'name': 'led_state_timestamp'},
+        {'keys': [('device', ASCENDING), ('timestamp', DESCENDING)], 'name': 'device_timestamp'},
+        {'keys': [('action', ASCENDING), ('timestamp', DESCENDING)], 'name': 'action_timestamp'},
+        {'keys': [('local_date', ASCENDING), ('timestamp', DESCENDING)], 'name': 'local_date_timestamp'},
+        {'keys': [('local_time', ASCENDING), ('timestamp', DESCENDING)], 'name': 'local_time_timestamp'},
+        INGEST_KEY_INDEX
+    ],
+    LED_DAILY_STATS_COLLECTION: [
+        {'keys': [('local_date', ASCENDING), ('led', ASCENDING)], 'name': 'local_date_led'}
+    ],
+    DATA_CALENDAR_COLLECTION: [
+        {'keys': [('source', ASCENDING), ('local_date', DESCENDING)], 'name': 'source_local_date'}
+    ]
+}
+
+SUPERSEDED_INDEXES: Dict[str, List[str]] = {
+    MONGODB_COLLECTION_NAME: ['timestamp_id', 'timestamp_id_seq']
+}
+
+
+def _index_model(definition: Dict[str, Any]) -> IndexModel:
+    options = {key: value for key, value in definition.items() if key != 'keys'}
+    return IndexModel(definition['keys'], **options)
+
+
+def ensure_indexes(definitions: Dict[str, List[Dict[str, Any]]] = None) -> Dict[str, List[str]]:
+    definitions = definitions or INDEX_DEFINITIONS
+    created = {}
+
+    for collection_name, indexes in definitions.items():
+        collection = mongo_pool.get_collection(collection_name)
+        created[collection_name] = []
+        for definition in indexes:
+            try:
+                created[collection_name].extend(collection.create_indexes([_index_model(definition)]))
+            except OperationFailure as e:
+                logger.warning(f"Index '{definition['name']}' on {collection_name} not created: {e}")
+
+    if definitions is INDEX_DEFINITIONS:
+        drop_superseded_indexes()
+
+    logger.info(f"Indexes ensured: {created}")
+    return created
+
+
+def drop_superseded_indexes() -> List[str]:
+    dropped = []
+    for collection_name, names in SUPERSEDED_INDEXES.items():
+        collection = mongo_pool.get_collection(collection_name)
+        try:
+            existing = set(collection.index_information())
+        except OperationFailure as e:
+            logger.warning(f"Could not list indexes on {collection_name}: {e}")
+            continue
+        for name in names:
+            if name not in existing:
+                continue
+            try:
+                collection.drop_index(name)
+                dropped.append(f'{collection_name}.{name}')
+            except OperationFailure as e:
+                logger.warning(f"Superseded index '{name}' on {collection_name} not dropped: {e}")
+
+    if dropped:
+        logger.info(f"Dropped superseded indexes: {dropped}")
+    return dropped
+
+
+def canonical_queries() -> List[Dict[str, Any]]:
+    end_time = convert_from_vietnam_time(get_current_vietnam_time())
+    day_range = {'$gte': end_time - timedelta(days=1), '$lte': end_time}
+
+    return [
+        {'name': 'sensor_recent', 'collection': MONGODB_COLLECTION_NAME,
+         'filter': {}, 'sort': [('timestamp', DESCENDING)], 'limit': 10},
+        {'name': 'sensor_time_range', 'collection': MONGODB_COLLECTION_NAME,
+         'filter': {'timestamp': day_range}, 'sort': [('timestamp', ASCENDING)]},
+        {'name': 'sensor_device_recent', 'collection': MONGODB_COLLECTION_NAME,
+         'filter': {'device_id': 'iot'}, 'sort': [('timestamp', DESCENDING)], 'limit': 10},
+        {'name': 'sensor_page_timestamp', 'collection': MONGODB_COLLECTION_NAME,
+         'filter': {}, 'sort': keyset_sort('timestamp', DESCENDING), 'limit': 11},
+        {'name': 'sensor_seek_timestamp', 'collection': MONGODB_COLLECTION_NAME,
+         'filter': seek_condition('timestamp', end_time, ObjectId(), '$lt'), 'sort': keyset_sort('timestamp', DESCENDING), 'limit': 11},
+        {'name': 'sensor_sampled_page', 'collection': MONGODB_COLLECTION_NAME,
+         'filter': {'sample_seq': {'$mod': [100, 0]}}, 'sort': keyset_sort('timestamp', DESCENDING), 'limit': 11},
+        {'name': 'sensor_page_temperature', 'collection': MONGODB_COLLECTION_NAME,
+         'filter': {}, 'sort': keyset_sort('temperature', DESCENDING), 'limit': 11},
+        {'name': 'sensor_local_date', 'collection': MONGODB_COLLECTION_NAME,
+         'filter': {'local_date': '2024-01-15'}, 'sort': [('timestamp', DESCENDING)], 'limit': 10},
+        {'name': 'sensor_local_time_prefix', 'collection': MONGODB_COLLECTION_NAME,
+         'filter': {'local_time': {'$regex': '^10:30'}}, 'sort': [('local_time', ASCENDING)], 'limit': 10},
+        {'name': 'sensor_available_dates', 'collection': DATA_CALENDAR_COLLECTION,
+         'filter': {'source': MONGODB_COLLECTION_NAME}, 'projection': {'local_date': 1, '_id': 0},
+         'sort': [('local_date', DESCENDING)]},
+        {'name': 'action_recent', 'collection': ACTION_HISTORY_COLLECTION,
+         'filter': {}, 'sort': [('timestamp', DESCENDING)], 'limit': 50},
+        {'name': 'action_page_timestamp', 'collection': ACTION_HISTORY_COLLECTION,
+         'filter': {}, 'sort': keyset_sort('timestamp', DESCENDING), 'limit': 11},
+        {'name': 'action_led_state_page', 'collection': ACTION_HISTORY_COLLECTION,
+         'filter': {'led': 'LED1', 'state': {'$in': ['ON', 'on', '1', 'true', 'TRUE']}},
+         'sort': [('timestamp', DESCENDING)], 'limit': 10},
+        {'name': 'action_latest_led', 'collection': ACTION_HISTORY_COLLECTION,
+         'filter': {'$or': [{'led': 'LED1'}, {'device': 'LED1'}, {'action': {'$regex': '^LED1_'}}]},
+         'sort': [('timestamp', DESCENDING)], 'limit': 1},
+        {'name': 'action_local_time', 'collection': ACTION_HISTORY_COLLECTION,
+         'filter': {'local_time': '10:30:15'}, 'sort': [('timestamp', DESCENDING)], 'limit': 10},
+        {'name': 'action_toggle_count', 'collection': ACTION_HISTORY_COLLECTION,
+         'filter': {'led': 'LED1', 'state': {'$in': ['ON']}, 'timestamp': day_range}},
+        {'name': 'led_daily_stats_range', 'collection': LED_DAILY_STATS_COLLECTION,
+         'filter': {'local_date': {'$gte': '2024-01-01', '$lte': '2024-01-31'}}}
+    ]
+
+
+def _collect_stages(plan: Any, stages: List[str]):
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            _collect_stages(value, stages)
+    elif isinstance(plan, list):
+        for item in plan:
+            _collect_stages(item, stages)
+
+
+def plan_problems(explain: Dict[str, Any]) -> List[str]:
+    stages = []
+    _collect_stages(explain.get('queryPlanner', {}).get('winningPlan', {}), stages)
+
+    problems = []
+    if 'COLLSCAN' in stages:
+        problems.append('COLLSCAN')
+    if 'SORT' in stages:
+        problems.append('in-memory SORT')
+    return problems
+
+
+def verify_query_plans(queries: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    results = []
+
+    for query in queries or canonical_queries():
+        collection = mongo_pool.get_collection(query['collection'])
+        cursor = collection.find(query['filter'], query.get('projection'))
+        if query.get('sort'):
+            cursor = cursor.sort(query['sort'])
+        if query.get('limit'):
+            cursor = cursor.limit(query['limit'])
+
+        try:
+            problems = plan_problems(cursor.explain())
+        except Exception as e:
+            problems = [f"explain failed: {e}"]
+
+        results.append({'name': query['name'], 'collection': query['collection'], 'problems': problems})
+        if problems:
+            logger.warning(f"Query plan check failed for {query['name']}: {', '.join(problems)}")
+        else:
+            logger.info(f"Query plan check passed for {query['name']}")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create MongoDB indexes and verify canonical query plans')
+    parser.add_argument('--verify', action='store_true', help='explain canonical queries and flag COLLSCAN or in-memory SORT')
+    args = parser.parse_args()
+
+    ensure_indexes()
+    if not args.verify:
+        return 0
+
+    results = verify_query_plans()
+    failed = [result for result in results if result['problems']]
+    for result in results:
+        status = 'FAIL' if result['problems'] else 'ok'
+        print(f"{status:<5}{result['collection']:<16}{result['name']:<28}{', '.join(result['problems'])}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+from bson.codec_options import CodecOptions
+from pymongo import MongoClient, monitoring
+from pymongo.collection import Collection
+from pymongo.database import Database
+from app.core.logger_config import logger
+from app.core.timezone_utils import VIETNAM_TZ
+from app.core.config import (MONGODB_CONNECTION_STRING, MONGODB_DB_NAME, MONGODB_MIN_POOL_SIZE, MONGODB_MAX_POOL_SIZE,
+                             MONGODB_MAX_IDLE_TIME_MS, MONGODB_WAIT_QUEUE_TIMEOUT_MS, MONGODB_TIMEOUT_MS)
+
+VIETNAM_CODEC_OPTIONS = CodecOptions(tz_aware=True, tzinfo=VIETNAM_TZ)
+
+
+def decodes_vietnam_time(target) -> bool:
+    options = getattr(target, 'codec_options', None)
+    return bool(options is not None and options.tz_aware and options.tzinfo is VIETNAM_TZ)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.pool_clears = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        wait_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+        self._local.started = None
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'connections_open': self.connections_created - self.connections_closed,
+                'connections_created': self.connections_created,
+                'connections_closed': self.connections_closed,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'pool_clears': self.pool_clears,
+                'avg_checkout_wait_ms': round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_checkout_wait_ms': round(self.max_wait_ms, 3)
+            }
+
+
+class MongoConnectionPool:
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._client: Optional[MongoClient] = None
+        self._collections: Dict[str, Collection] = {}
+        self._stats_listener = PoolStatsListener()
+        self._initialized = True
+
+    def get_client(self) -> MongoClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = MongoClient(
+                        MONGODB_CONNECTION_STRING,
+                        tlsAllowInvalidCertificates=True,
+                        minPoolSize=MONGODB_MIN_POOL_SIZE,
+                        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+                        waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                        serverSelectionTimeoutMS=MONGODB_TIMEOUT_MS,
+                        connectTimeoutMS=MONGODB_TIMEOUT_MS,
+                        socketTimeoutMS=MONGODB_TIMEOUT_MS,
+                        event_listeners=[self._stats_listener],
+                        tz_aware=VIETNAM_CODEC_OPTIONS.tz_aware,
+                        tzinfo=VIETNAM_CODEC_OPTIONS.tzinfo
+                    )
+                    logger.info(f"MongoDB connection pool created (min={MONGODB_MIN_POOL_SIZE}, max={MONGODB_MAX_POOL_SIZE})")
+        return self._client
+
+    def get_database(self) -> Database:
+        return self.get_client()[MONGODB_DB_NAME]
+
+    def get_collection(self, name: str) -> Collection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self.get_database()[name]
+            self._collections[name] = collection
+        return collection
+
+    def warm_up(self) -> bool:
+        try:
+            client = self.get_client()
+            client.admin.command('ping')
+
+            if MONGODB_MIN_POOL_SIZE > 1:
+                with ThreadPoolExecutor(max_workers=MONGODB_MIN_POOL_SIZE) as executor:
+                    list(executor.map(lambda _: client.admin.command('ping'), range(MONGODB_MIN_POOL_SIZE)))
+
+            logger.info(f"Connected to MongoDB successfully (pool warmed: {self._stats_listener.snapshot()['connections_open']} connections)")
+            return True
+
+        except Exception as e:
+            logger.error(f"MongoDB connection pool warm-up failed: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self._stats_listener.snapshot()
+        stats.update({
+            'min_pool_size': MONGODB_MIN_POOL_SIZE,
+            'max_pool_size': MONGODB_MAX_POOL_SIZE,
+            'wait_queue_timeout_ms': MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            'vietnam_time_codec': decodes_vietnam_time(self._client),
+            'collections': sorted(self._collections.keys())
+        })
+        return stats
+
+    def close(self):
+        with self._lock:
+            try:
+                if self._client:
+                    self._client.close()
+                    logger.info("MongoDB connection pool closed")
+            except Exception as e:
+                logger.error(f"Error closing MongoDB connection pool: {e}")
+            finally:
+                self._client = None
+                self._collections = {}
+
+
+mongo_pool = MongoConnectionPool()
@@ -0,0 +1,98 @@
+import base64
+from typing import Any, Dict, Optional, Tuple
+from bson import json_util
+from pymongo.collection import Collection
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _direction(sort_order: str) -> int:
+    return -1 if str(sort_order).lower() == 'desc' else 1
+
+
+def encode_cursor(document: Dict[str, Any], sort_field: str, sort_order: str) -> str:
+    payload = json_util.dumps({
+        'f': sort_field,
+        'o': str(sort_order).lower(),
+        'v': document.get(sort_field),
+        'id': document.get('_id')
+    }, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, sort_field: str, sort_order: str) -> Tuple[Any, Any]:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {e}") from e
+
+    if not isinstance(payload, dict) or 'id' not in payload:
+        raise InvalidCursorError("Invalid pagination cursor")
+    if payload.get('f') != sort_field or payload.get('o') != str(sort_order).lower():
+        raise InvalidCursorError("Pagination cursor does not match the requested sort")
+
+    return payload.get('v'), payload['id']
+
+
+def seek_condition(sort_field: str, value: Any, last_id: Any, operator: str) -> Dict[str, Any]:
+    if sort_field == '_id':
+        return {'_id': {operator: last_id}}
+
+    if value is None:
+        if operator == '$gt':
+            return {'$or': [{sort_field: {'$ne': None}}, {sort_field: None, '_id': {'$gt': last_id}}]}
+        return {sort_field: None, '_id': {'$lt': last_id}}
+
+    conditions = [{sort_field: {operator: value}}, {sort_field: value, '_id': {operator: last_id}}]
+    if operator == '$lt':
+        conditions.append({sort_field: None})
+    return {'$or': conditions}
+
+
+def keyset_sort(sort_field: str, direction: int):
+    if sort_field == '_id':
+        return [('_id', direction)]
+    return [(sort_field, direction), ('_id', direction)]
+
+
+def page_cursors(data: list, sort_field: str, sort_order: str, has_prev: bool, has_next: bool) -> Dict[str, Optional[str]]:
+    return {
+        'next_cursor': encode_cursor(data[-1], sort_field, sort_order) if data and has_next else None,
+        'prev_cursor': encode_cursor(data[0], sort_field, sort_order) if data and has_prev else None
+    }
+
+
+def fetch_keyset_page(collection: Collection, query: Dict[str, Any], sort_field: str, sort_order: str, per_page: int,
+                      after: Optional[str] = None, before: Optional[str] = None,
+                      projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    direction = _direction(sort_order)
+    token = before or after
+    backwards = bool(before)
+
+    if token:
+        value, last_id = decode_cursor(token, sort_field, sort_order)
+        operator = '$lt' if (direction == -1) != backwards else '$gt'
+        seek = seek_condition(sort_field, value, last_id, operator)
+        query = {'$and': [query, seek]} if query else seek
+
+    scan_direction = -direction if backwards else direction
+    cursor = collection.find(query, projection).sort(keyset_sort(sort_field, scan_direction)).limit(per_page + 1)
+    data = list(cursor)
+
+    has_more = len(data) > per_page
+    data = data[:per_page]
+    if backwards:
+        data.reverse()
+
+    has_next = bool(token) if backwards else has_more
+    has_prev = has_more if backwards else bool(token)
+
+    return {
+        'data': data,
+        'has_next': has_next,
+        'has_prev': has_prev,
+        **page_cursors(data, sort_field, sort_order, has_prev, has_next)
+    }
@@ -0,0 +1,37 @@
+from typing import Any, Dict, Optional, Sequence
+
+SENSOR_FIELDS = ('_id', 'timestamp', 'temperature', 'humidity', 'light', 'device_id', 'local_date', 'local_time')
+ACTION_HISTORY_FIELDS = ('_id', 'timestamp', 'led', 'state', 'action', 'device', 'device_id', 'local_date', 'local_time')
+CHART_PROJECTION = {'_id': 0, 'timestamp': 1, 'temperature': 1, 'humidity': 1, 'light': 1}
+ALL_FIELDS = ('*', 'all')
+
+
+class InvalidFieldsError(ValueError):
+    pass
+
+
+def parse_fields(value: Optional[str], allowed: Sequence[str],
+                 default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    if value is None or not value.strip():
+        return dict(default) if default else None
+    if value.strip().lower() in ALL_FIELDS:
+        return None
+
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise InvalidFieldsError(f"Unknown field(s): {', '.join(unknown)}; expected {', '.join(allowed)} or *")
+
+    projection = {field: 1 for field in fields}
+    if '_id' not in projection:
+        projection['_id'] = 0
+    return projection
+
+
+def with_sort_keys(projection: Optional[Dict[str, Any]], sort_field: str) -> Optional[Dict[str, Any]]:
+    if projection is None:
+        return None
+    projection = {key: value for key, value in projection.items() if value}
+    projection[sort_field] = 1
+    projection['_id'] = 1
+    return projection
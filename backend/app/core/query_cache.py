@@ -0,0 +1,110 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+from bson import json_util
+from app.core.config import QUERY_CACHE_MAX_BYTES, QUERY_CACHE_TTL_SECONDS
+from app.core.cache_generations import cache_generations
+from app.core.count_cache import normalize_filter
+
+
+def _estimate_size(value: Any) -> int:
+    try:
+        return len(json_util.dumps(value))
+    except Exception:
+        return 0
+
+
+class QueryCache:
+
+    def __init__(self, max_bytes: int = QUERY_CACHE_MAX_BYTES, ttl_seconds: float = QUERY_CACHE_TTL_SECONDS):
+        self.max_bytes = max(0, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Tuple[str, str], Dict[str, Any]]' = OrderedDict()
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key)
+        self.bytes -= entry['size']
+
+    def _lookup(self, key: Tuple[str, str], generation: int) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry['generation'] != generation or time.monotonic() - entry['cached_at'] > self.ttl_seconds:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Tuple[str, str], generation: int, value: Any):
+        size = _estimate_size(value)
+        if not size or size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != cache_generations.peek(key[0]):
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {'value': copy.deepcopy(value), 'generation': generation, 'size': size, 'cached_at': time.monotonic()}
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, collection_name: str, key_parts: Dict[str, Any], loader: Callable[[], Any]) -> Any:
+        if not self.max_bytes:
+            return loader()
+
+        key = (collection_name, normalize_filter(key_parts))
+        generation = cache_generations.current(collection_name)
+        with self._lock:
+            entry = self._lookup(key, generation)
+            if entry is not None:
+                self.hits += 1
+                return copy.deepcopy(entry['value'])
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        with loading:
+            generation = cache_generations.peek(collection_name)
+            with self._lock:
+                entry = self._lookup(key, generation)
+                if entry is not None:
+                    self.hits += 1
+                    return copy.deepcopy(entry['value'])
+                self.misses += 1
+
+            try:
+                value = loader()
+                self._store(key, generation, value)
+                return value
+            finally:
+                with self._lock:
+                    if self._loading.get(key) is loading:
+                        del self._loading[key]
+
+    def invalidate(self, collection_name: str = None):
+        with self._lock:
+            for key in [key for key in self._entries if collection_name is None or key[0] == collection_name]:
+                self._drop(key)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+query_cache = QueryCache()
@@ -0,0 +1,34 @@
+from typing import Any, Dict, List
+from pymongo import ReturnDocument
+from app.core.mongo_pool import mongo_pool
+
+SEQUENCE_COLLECTION = 'sequences'
+SEQUENCE_FIELD = 'sample_seq'
+
+
+def _counter_id(name: str) -> str:
+    return f'{name}:{SEQUENCE_FIELD}'
+
+
+def reserve_sequence(name: str, count: int = 1) -> int:
+    counter = mongo_pool.get_collection(SEQUENCE_COLLECTION).find_one_and_update(
+        {'_id': _counter_id(name)}, {'$inc': {'value': count}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return counter['value'] - count + 1
+
+
+def assign_sequence(name: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if documents:
+        first = reserve_sequence(name, len(documents))
+        for offset, document in enumerate(documents):
+            document[SEQUENCE_FIELD] = first + offset
+    return documents
+
+
+def sequence_complete(name: str) -> bool:
+    counter = mongo_pool.get_collection(SEQUENCE_COLLECTION).find_one({'_id': _counter_id(name)}, {'complete': 1})
+    return bool(counter and counter.get('complete'))
+
+
+def mark_sequence_complete(name: str):
+    mongo_pool.get_collection(SEQUENCE_COLLECTION).update_one({'_id': _counter_id(name)}, {'$set': {'complete': True}}, upsert=True)
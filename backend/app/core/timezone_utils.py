@@ -1,28 +1,67 @@
 from datetime import datetime, timedelta, timezone
-from typing import Tuple
+from typing import Any, Dict, Optional, Tuple
+
+
+VIETNAM_TZ = timezone(timedelta(hours=7))
 
 
 def get_vietnam_timezone() -> timezone:
-    return timezone(timedelta(hours=7))
+    return VIETNAM_TZ
+
+
+def is_vietnam_time(dt: datetime) -> bool:
+    return dt.tzinfo is VIETNAM_TZ or (dt.tzinfo is not None and dt.utcoffset() == VIETNAM_TZ.utcoffset(None))
 
 
 def get_current_vietnam_time() -> datetime:
-    return datetime.now(get_vietnam_timezone())
+    return datetime.now(VIETNAM_TZ)
 
 
 def convert_to_vietnam_time(dt: datetime) -> datetime:
     if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc).astimezone(get_vietnam_timezone())
-    return dt.astimezone(get_vietnam_timezone())
+        return dt.replace(tzinfo=timezone.utc).astimezone(VIETNAM_TZ)
+    if is_vietnam_time(dt):
+        return dt
+    return dt.astimezone(VIETNAM_TZ)
 
 
 def convert_from_vietnam_time(dt: datetime) -> datetime:
     if dt.tzinfo is None:
-        return dt.replace(tzinfo=get_vietnam_timezone()).astimezone(timezone.utc)
+        return dt.replace(tzinfo=VIETNAM_TZ).astimezone(timezone.utc)
     return dt.astimezone(timezone.utc)
 
 
 def create_vietnam_datetime(year: int, month: int, day: int,
                             hour: int = 0, minute: int = 0, second: int = 0,
                             microsecond: int = 0) -> datetime:
-    return datetime(year, month, day, hour, minute, second, microsecond, tzinfo=get_vietnam_timezone())
+    return datetime(year, month, day, hour, minute, second, microsecond, tzinfo=VIETNAM_TZ)
+
+
+def parse_device_timestamp(value) -> Optional[datetime]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, datetime):
+        return convert_from_vietnam_time(value)
+    if isinstance(value, (int, float)):
+        seconds = value / 1000 if value > 1e11 else value
+        try:
+            return datetime.fromtimestamp(seconds, tz=timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if isinstance(value, str):
+        try:
+            return convert_from_vietnam_time(datetime.fromisoformat(value.strip().replace('Z', '+00:00')))
+        except ValueError:
+            return None
+    return None
+
+
+def get_local_time_fields(dt: datetime) -> Dict[str, Any]:
+    local = convert_to_vietnam_time(dt)
+    return {
+        'local_date': local.strftime('%Y-%m-%d'),
+        'local_time': local.strftime('%H:%M:%S'),
+        'local_hour': local.hour,
+        'local_minute': local.minute,
+        'local_second': local.second
+    }
@@ -1,49 +1,59 @@
-from typing import Dict, Any
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 from app.core.database import DatabaseManager
+from app.core.mongo_pool import mongo_pool
 from app.services.mqtt_service import MQTTManager
+from app.services.ingestion_buffer import SensorIngestionBuffer
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.spool_service import SensorSpool, SpoolReplayer
+from app.services.validation_service import DataValidator
+from app.services.dedup_service import DuplicateFilter, build_ingest_key, INGEST_KEY_FIELD
 from app.core.logger_config import logger
-from app.core.timezone_utils import get_current_vietnam_time
 
 
 class IoTMQTTReceiver:
 
     def __init__(self):
         self.db_manager = DatabaseManager()
-        self.mqtt_manager = MQTTManager(message_callback=self.process_sensor_data, status_callback=self.process_action_status)
-        self._executor = ThreadPoolExecutor(max_workers=4)
-
-    def process_sensor_data(self, sensor_data: Dict[str, Any]):
+        self.db_manager.ensure_indexes()
+        self.duplicate_filter = DuplicateFilter()
+        self.spool = SensorSpool()
+        self.spool_replayer = SpoolReplayer(self.spool, self.db_manager)
+        self.ingest_buffer = SensorIngestionBuffer(self.db_manager, spool=self.spool)
+        self.ingest_pipeline = IngestPipeline(handler=self.store_sensor_data)
+        self.mqtt_manager = MQTTManager(message_callback=self.process_sensor_data)
+
+    def process_sensor_data(self, payload: Any, device_id: Optional[str] = None):
         try:
-            document_id = self.db_manager.insert_sensor_data(sensor_data)
-
-            if document_id:
-                logger.info(f"Sensor data processed successfully: {document_id}")
-            else:
-                logger.error("Failed to store sensor data in database")
+            received_at = datetime.now(timezone.utc)
+            readings = []
+            for reading in DataValidator.unpack_readings(payload):
+                if isinstance(reading, dict):
+                    if device_id:
+                        reading['device_id'] = device_id
+                    ingest_key = build_ingest_key(reading, device_id)
+                    if self.duplicate_filter.seen(ingest_key):
+                        logger.debug(f"Duplicate sensor reading suppressed: {ingest_key}")
+                        continue
+                    reading[INGEST_KEY_FIELD] = ingest_key
+                    if 'ts' not in reading and 'timestamp' not in reading:
+                        reading['timestamp'] = received_at
+                readings.append(reading)
+
+            if readings and not self.ingest_pipeline.submit(readings, device_id):
+                for reading in readings:
+                    if isinstance(reading, dict):
+                        self.duplicate_filter.forget(reading[INGEST_KEY_FIELD])
+                logger.error(f"Failed to queue {len(readings)} sensor readings for processing")
 
         except Exception as e:
             logger.error(f"Error processing sensor data: {e}")
 
-    def process_action_status(self, status_data: Dict[str, Any]):
-        try:
-            current_time = get_current_vietnam_time()
-            logger.info(f"process_action_status received at {current_time.isoformat()}: {status_data}")
-            if not isinstance(status_data, dict):
-                logger.warning(f"Invalid status data type: {status_data}")
-                return
-
-            led = status_data.get('led')
-            state = status_data.get('state')
-            if not led or not state:
-                logger.warning(f"Missing led/state in status message: {status_data}")
-                return
-
-            logger.info(f"LED status message validated: {led}={state}. LEDControlService will handle database storage.")
-
-        except Exception as e:
-            logger.error(f"Error processing action status: {e}")
+    def store_sensor_data(self, readings: List[Dict[str, Any]]) -> bool:
+        if not self.ingest_buffer.add_many(readings):
+            logger.error(f"Failed to queue {len(readings)} sensor readings for storage")
+            return False
+        return True
 
     def start_receiving(self):
         try:
@@ -55,6 +65,7 @@ class IoTMQTTReceiver:
                 logger.error("Failed to connect to MQTT broker")
                 return False
 
+            self.spool_replayer.start()
             self.mqtt_manager.start_loop()
             return True
 
@@ -69,11 +80,23 @@ class IoTMQTTReceiver:
     def stop(self):
         try:
             self.mqtt_manager.stop()
+            self.ingest_pipeline.stop()
+            self.ingest_buffer.close()
+            self.spool_replayer.stop()
+            self.spool.close()
             self.db_manager.close_connection()
             logger.info("IoT MQTT Receiver stopped successfully")
         except Exception as e:
             logger.error(f"Error stopping receiver: {e}")
 
+    def get_ingest_metrics(self) -> Dict[str, Any]:
+        return {
+            'queue': self.ingest_pipeline.get_metrics(),
+            'buffer': self.ingest_buffer.get_metrics(),
+            'spool': self.spool.get_metrics(),
+            'dedup': self.duplicate_filter.get_metrics()
+        }
+
     def get_recent_data(self, limit: int = 10):
         try:
             data = self.db_manager.get_recent_data(limit)
@@ -100,6 +123,7 @@ def main():
     receiver = None
 
     try:
+        mongo_pool.warm_up()
         receiver = IoTMQTTReceiver()
 
         logger.info("=== Recent Sensor Data ===")
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from app.core.config import INGEST_DEDUP_CACHE_SIZE, INGEST_DEDUP_WINDOW_SECONDS
+
+INGEST_KEY_FIELD = 'ingest_key'
+SEQUENCE_FIELDS = ('seq', 'sequence', 'msg_id')
+DEVICE_TIMESTAMP_FIELDS = ('ts', 'timestamp')
+IGNORED_FIELDS = ('_id', INGEST_KEY_FIELD)
+
+
+def build_ingest_key(payload: Dict[str, Any], device_id: Optional[str] = None, received_at: Optional[float] = None,
+                     window: float = INGEST_DEDUP_WINDOW_SECONDS) -> str:
+    device = device_id or payload.get('device_id') or 'default'
+
+    marker = None
+    for field in SEQUENCE_FIELDS:
+        if payload.get(field) is not None:
+            marker = f"seq:{payload[field]}"
+            break
+
+    if marker is None:
+        for field in DEVICE_TIMESTAMP_FIELDS:
+            if payload.get(field) is not None:
+                marker = f"ts:{payload[field]}"
+                break
+
+    if marker is None:
+        received_at = time.time() if received_at is None else received_at
+        marker = f"rx:{int(received_at // max(window, 0.001))}"
+
+    body = json.dumps({key: value for key, value in payload.items() if key not in IGNORED_FIELDS},
+                      sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(f"{device}|{marker}|{body}".encode('utf-8')).hexdigest()
+
+
+class DuplicateFilter:
+
+    def __init__(self, capacity: int = INGEST_DEDUP_CACHE_SIZE):
+        self.capacity = max(1, capacity)
+        self._keys: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {
+            'checked': 0,
+            'duplicates': 0,
+            'evicted': 0
+        }
+
+    def seen(self, key: str) -> bool:
+        with self._lock:
+            self._metrics['checked'] += 1
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                self._metrics['duplicates'] += 1
+                return True
+
+            self._keys[key] = None
+            if len(self._keys) > self.capacity:
+                self._keys.popitem(last=False)
+                self._metrics['evicted'] += 1
+            return False
+
+    def forget(self, key: str):
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics.update({
+                'size': len(self._keys),
+                'capacity': self.capacity
+            })
+        return metrics
@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+import numpy as np
+
+CHART_FIELDS = ('temperature', 'humidity', 'light')
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+MIN_POINTS = 4
+MAX_BUDGET_PASSES = 4
+
+
+class InvalidDownsamplingError(ValueError):
+    pass
+
+
+def parse_method(value: Any) -> str:
+    method = (value or 'lttb').strip().lower()
+    if method not in DOWNSAMPLING_METHODS:
+        raise InvalidDownsamplingError(f"Unknown downsampling method '{value}'; expected {', '.join(DOWNSAMPLING_METHODS)}")
+    return method
+
+
+def min_points(fields: Sequence[str] = CHART_FIELDS) -> int:
+    return MIN_POINTS * max(1, len(fields)) + 2
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    n = len(x)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    buckets = (threshold - 2) // 2
+    if buckets < 1:
+        return np.array([0, n - 1])
+
+    bucket_ids = (np.arange(n) * buckets) // n
+    order = np.lexsort((y, bucket_ids))
+    starts = np.searchsorted(bucket_ids[order], np.arange(buckets), side='left')
+    ends = np.searchsorted(bucket_ids[order], np.arange(buckets), side='right') - 1
+    return np.unique(np.concatenate(([0, n - 1], order[starts], order[ends])))
+
+
+def _timestamp_seconds(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return np.nan
+
+
+def _series(documents: List[Dict[str, Any]], field: str) -> np.ndarray:
+    values = np.empty(len(documents), dtype=np.float64)
+    for index, document in enumerate(documents):
+        try:
+            values[index] = float(document.get(field))
+        except (TypeError, ValueError):
+            values[index] = np.nan
+    return values
+
+
+def downsample_documents(documents: List[Dict[str, Any]], points: int, method: str = 'lttb',
+                         fields: Sequence[str] = CHART_FIELDS) -> List[Dict[str, Any]]:
+    points = max(points, min_points(fields))
+    if len(documents) <= points:
+        return documents
+
+    x = np.fromiter((_timestamp_seconds(document.get('timestamp')) for document in documents), dtype=np.float64, count=len(documents))
+    x = np.where(np.isnan(x), np.arange(len(documents), dtype=np.float64), x)
+    series = [(valid, y[valid]) for y in (_series(documents, field) for field in fields)
+              for valid in [np.flatnonzero(~np.isnan(y))] if len(valid)]
+    if not series:
+        return documents
+
+    def select(per_field: int) -> np.ndarray:
+        keep = [np.array([0, len(documents) - 1])]
+        for valid, y in series:
+            if method == 'minmax':
+                keep.append(valid[minmax_indices(y, per_field)])
+            else:
+                keep.append(valid[lttb_indices(x[valid], y, per_field)])
+        return np.unique(np.concatenate(keep))
+
+    per_field = (points - 2) // len(series)
+    selected = select(per_field)
+    for _ in range(MAX_BUDGET_PASSES):
+        spare = (points - len(selected)) // len(series)
+        if spare < 1:
+            break
+        candidate = select(per_field + spare)
+        if len(candidate) > points or len(candidate) <= len(selected):
+            break
+        per_field, selected = per_field + spare, candidate
+
+    return [documents[index] for index in selected]
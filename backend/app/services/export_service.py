@@ -0,0 +1,208 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.core.config import EXPORT_BATCH_SIZE
+from app.core.database import CHRONOLOGICAL, DatabaseManager
+from app.core.pagination import seek_condition
+from app.core.timezone_utils import convert_from_vietnam_time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+SENSOR_FIELDS = ('temperature', 'humidity', 'light')
+KEY_COLUMNS = ('_id', 'timestamp', 'device_id')
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+class _ChunkSink:
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parse_export_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    value = value.strip().replace('Z', '+00:00')
+    if 'T' in value:
+        value = re.sub(r' (\d{2}:?\d{2})$', r'+\1', value)
+    try:
+        return convert_from_vietnam_time(datetime.fromisoformat(value))
+    except ValueError as e:
+        raise ExportError(f"Invalid time '{value}', expected ISO 8601 (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS[+07:00])") from e
+
+
+def parse_sensors(value: Optional[str]) -> List[str]:
+    if not value:
+        return list(SENSOR_FIELDS)
+    sensors = [sensor.strip() for sensor in value.split(',') if sensor.strip()]
+    unknown = [sensor for sensor in sensors if sensor not in SENSOR_FIELDS]
+    if unknown or not sensors:
+        raise ExportError(f"Unknown sensor(s): {', '.join(unknown) or value}; expected {', '.join(SENSOR_FIELDS)}")
+    return sensors
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class ExportService:
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        self.db_manager = db_manager or DatabaseManager()
+
+    def build_query(self, start: Optional[str] = None, end: Optional[str] = None, device_id: Optional[str] = None,
+                    after: Optional[str] = None, after_id: Optional[str] = None) -> Dict[str, Any]:
+        conditions = []
+        time_range = {}
+        start_time, end_time = parse_export_time(start), parse_export_time(end)
+        if start_time:
+            time_range['$gte'] = start_time
+        if end_time and len(end.strip()) == 10:
+            time_range['$lt'] = end_time + timedelta(days=1)
+        elif end_time:
+            time_range['$lte'] = end_time
+        if time_range:
+            conditions.append({'timestamp': time_range})
+        if device_id:
+            conditions.append({'device_id': device_id})
+
+        after_time = parse_export_time(after)
+        if after_time and after_id:
+            try:
+                conditions.append(seek_condition('timestamp', after_time, ObjectId(after_id), '$gt'))
+            except InvalidId as e:
+                raise ExportError(f"Invalid after_id '{after_id}'") from e
+        elif after_time:
+            conditions.append({'timestamp': {'$gt': after_time}})
+
+        if not conditions:
+            return {}
+        return conditions[0] if len(conditions) == 1 else {'$and': conditions}
+
+    def iter_rows(self, query: Dict[str, Any], sensors: Sequence[str], limit: Optional[int] = None,
+                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        projection = {field: 1 for field in (*KEY_COLUMNS, *sensors)}
+        documents = self.db_manager.iter_documents(self.db_manager.collection, query, CHRONOLOGICAL, projection, limit, batch_size)
+        for document in documents:
+            row = {'_id': str(document['_id']), 'timestamp': document.get('timestamp'), 'device_id': document.get('device_id')}
+            for sensor in sensors:
+                row[sensor] = _float(document.get(sensor))
+            yield row
+
+    def columns(self, sensors: Sequence[str]) -> List[str]:
+        return [*KEY_COLUMNS, *sensors]
+
+    def iter_csv(self, rows: Iterable[Dict[str, Any]], columns: Sequence[str], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(columns)
+        for batch in _batches(rows, batch_size):
+            for row in batch:
+                values = [row.get(column) for column in columns]
+                writer.writerow(['' if value is None else value.isoformat() if isinstance(value, datetime) else value for value in values])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def iter_ndjson(self, rows: Iterable[Dict[str, Any]], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+        for batch in _batches(rows, batch_size):
+            yield ''.join(json.dumps(row, default=lambda value: value.isoformat(), separators=(',', ':')) + '\n' for row in batch)
+
+    def _schema(self, columns: Sequence[str]):
+        types = {'_id': pa.string(), 'timestamp': pa.timestamp('us', tz='+07:00'), 'device_id': pa.string()}
+        return pa.schema([(column, types.get(column, pa.float64())) for column in columns])
+
+    def _record_batch(self, batch: List[Dict[str, Any]], schema):
+        return pa.record_batch([pa.array([row.get(field.name) for row in batch], type=field.type) for field in schema], schema=schema)
+
+    def iter_arrow(self, rows: Iterable[Dict[str, Any]], columns: Sequence[str], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+        schema = self._schema(columns)
+        sink = _ChunkSink()
+        with pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema) as writer:
+            yield sink.drain()
+            for batch in _batches(rows, batch_size):
+                writer.write_batch(self._record_batch(batch, schema))
+                yield sink.drain()
+        yield sink.drain()
+
+    def iter_parquet(self, rows: Iterable[Dict[str, Any]], columns: Sequence[str], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+        schema = self._schema(columns)
+        sink = _ChunkSink()
+        with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='zstd') as writer:
+            for batch in _batches(rows, batch_size):
+                writer.write_batch(self._record_batch(batch, schema))
+                yield sink.drain()
+        yield sink.drain()
+
+    def encode(self, export_format: str, rows: Iterable[Dict[str, Any]], sensors: Sequence[str],
+               batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Any]:
+        columns = self.columns(sensors)
+        if export_format == 'csv':
+            return self.iter_csv(rows, columns, batch_size)
+        if export_format == 'ndjson':
+            return self.iter_ndjson(rows, batch_size)
+        if export_format == 'arrow':
+            return self.iter_arrow(rows, columns, batch_size)
+        return self.iter_parquet(rows, columns, batch_size)
+
+    def check_format(self, export_format: str):
+        if export_format not in EXPORT_FORMATS:
+            raise ExportError(f"Unknown format '{export_format}'; expected {', '.join(EXPORT_FORMATS)}")
+        if export_format in ('arrow', 'parquet') and pa is None:
+            raise ExportError(f"Format '{export_format}' requires pyarrow (pip install pyarrow)")
@@ -0,0 +1,263 @@
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+from bson import json_util
+from app.core.logger_config import logger
+from app.core.config import INGEST_QUEUE_SIZE, INGEST_WORKERS, INGEST_OVERFLOW_POLICY, INGEST_BLOCK_TIMEOUT_SECONDS, INGEST_SPILL_PATH
+from app.services.validation_service import DataValidator
+from app.services.spool_service import SPOOL_JSON_OPTIONS
+
+RELOADING_SUFFIX = '.reloading'
+
+
+class OverflowPolicy:
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop_oldest'
+    SPILL = 'spill'
+
+    ALL = [BLOCK, DROP_OLDEST, SPILL]
+
+
+class IngestPipeline:
+
+    def __init__(self, handler: Callable[[List[Dict[str, Any]]], bool], max_queue_size: int = INGEST_QUEUE_SIZE,
+                 workers: int = INGEST_WORKERS, overflow_policy: str = INGEST_OVERFLOW_POLICY,
+                 block_timeout: float = INGEST_BLOCK_TIMEOUT_SECONDS, spill_path: Optional[str] = INGEST_SPILL_PATH):
+        if overflow_policy not in OverflowPolicy.ALL:
+            logger.warning(f"Unknown ingest overflow policy '{overflow_policy}', falling back to '{OverflowPolicy.DROP_OLDEST}'")
+            overflow_policy = OverflowPolicy.DROP_OLDEST
+
+        self.handler = handler
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+        self.workers = max(1, workers)
+
+        shard_size = max(1, -(-max(1, max_queue_size) // self.workers))
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=shard_size) for _ in range(self.workers)]
+        self._spill_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._spilled_pending = self._count_spilled()
+        self._metrics_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._metrics = {
+            'enqueued': 0,
+            'readings': 0,
+            'processed': 0,
+            'invalid': 0,
+            'failed': 0,
+            'dropped': 0,
+            'spilled': 0,
+            'unspilled': 0,
+            'max_depth': 0
+        }
+
+        if self._spilled_pending:
+            logger.info(f"Found {self._spilled_pending} spilled batches from a previous run, reloading when idle")
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest-worker')
+        for shard in range(self.workers):
+            self._executor.submit(self._worker_loop, shard)
+
+        logger.info(f"Ingest pipeline started (workers={self.workers}, queue={shard_size} per device shard, overflow={self.overflow_policy})")
+
+    def _count(self, key: str, amount: int = 1):
+        with self._metrics_lock:
+            self._metrics[key] += amount
+
+    def _queue_for(self, device_id: Optional[str]) -> queue.Queue:
+        if self.workers == 1:
+            return self._queues[0]
+        return self._queues[zlib.crc32((device_id or '').encode('utf-8')) % self.workers]
+
+    def submit(self, readings: List[Dict[str, Any]], device_id: Optional[str] = None) -> bool:
+        if self._stop_event.is_set():
+            self._count('dropped', len(readings))
+            return False
+
+        shard_queue = self._queue_for(device_id)
+        try:
+            shard_queue.put_nowait(readings)
+            self._on_enqueued(shard_queue, len(readings))
+            return True
+        except queue.Full:
+            pass
+
+        if self.overflow_policy == OverflowPolicy.BLOCK:
+            try:
+                shard_queue.put(readings, timeout=self.block_timeout)
+                self._on_enqueued(shard_queue, len(readings))
+                return True
+            except queue.Full:
+                logger.warning(f"Ingest queue still full after {self.block_timeout}s, dropping {len(readings)} readings")
+                self._count('dropped', len(readings))
+                return False
+
+        if self.overflow_policy == OverflowPolicy.SPILL and self._spill(readings):
+            return True
+
+        while True:
+            try:
+                dropped = shard_queue.get_nowait()
+                shard_queue.task_done()
+                self._count('dropped', len(dropped))
+            except queue.Empty:
+                pass
+            try:
+                shard_queue.put_nowait(readings)
+                self._on_enqueued(shard_queue, len(readings))
+                return True
+            except queue.Full:
+                continue
+
+    def _on_enqueued(self, shard_queue: queue.Queue, readings: int):
+        depth = shard_queue.qsize()
+        with self._metrics_lock:
+            self._metrics['enqueued'] += 1
+            self._metrics['readings'] += readings
+            if depth > self._metrics['max_depth']:
+                self._metrics['max_depth'] = depth
+
+    def _spill(self, readings: List[Dict[str, Any]]) -> bool:
+        if not self.spill_path:
+            return False
+
+        try:
+            with self._spill_lock:
+                spill_dir = os.path.dirname(self.spill_path)
+                if spill_dir:
+                    os.makedirs(spill_dir, exist_ok=True)
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    f.write(json_util.dumps(readings, json_options=SPOOL_JSON_OPTIONS) + '\n')
+                self._spilled_pending += 1
+            self._count('spilled', len(readings))
+            return True
+        except Exception as e:
+            logger.error(f"Error spilling reading to disk: {e}")
+            return False
+
+    def _spill_files(self) -> List[str]:
+        if not self.spill_path:
+            return []
+        return [path for path in (self.spill_path + RELOADING_SUFFIX, self.spill_path) if os.path.exists(path)]
+
+    def _count_spilled(self) -> int:
+        pending = 0
+        for path in self._spill_files():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    pending += sum(1 for line in f if line.strip())
+            except OSError as e:
+                logger.error(f"Error reading spill file {path}: {e}")
+        return pending
+
+    def _reload_spilled(self) -> int:
+        if not self._spilled_pending or not self._reload_lock.acquire(blocking=False):
+            return 0
+
+        try:
+            reloading_path = self.spill_path + RELOADING_SUFFIX
+            with self._spill_lock:
+                if not os.path.exists(reloading_path):
+                    if not os.path.exists(self.spill_path):
+                        self._spilled_pending = 0
+                        return 0
+                    os.replace(self.spill_path, reloading_path)
+
+            with open(reloading_path, 'r', encoding='utf-8') as f:
+                lines = [line for line in f if line.strip()]
+
+            reloaded = 0
+            for index, line in enumerate(lines):
+                try:
+                    readings = json_util.loads(line, json_options=SPOOL_JSON_OPTIONS)
+                except Exception as e:
+                    logger.error(f"Skipping unreadable spilled reading: {e}")
+                    continue
+                if isinstance(readings, dict):
+                    readings = [readings]
+
+                try:
+                    self._process(readings)
+                except Exception as e:
+                    with open(reloading_path, 'w', encoding='utf-8') as f:
+                        f.writelines(lines[index:])
+                    logger.error(f"Error processing spilled readings, {len(lines) - index} batches kept for retry: {e}")
+                    with self._spill_lock:
+                        self._spilled_pending = max(0, self._spilled_pending - index)
+                    self._count('unspilled', reloaded)
+                    return reloaded
+                reloaded += len(readings)
+
+            os.remove(reloading_path)
+            with self._spill_lock:
+                self._spilled_pending = max(0, self._spilled_pending - len(lines))
+            self._count('unspilled', reloaded)
+            logger.info(f"Reloaded {reloaded} spilled readings from disk")
+            return reloaded
+
+        except Exception as e:
+            logger.error(f"Error reloading spilled readings: {e}")
+            return 0
+        finally:
+            self._reload_lock.release()
+
+    def _process(self, readings: List[Dict[str, Any]]):
+        valid, rejected = DataValidator.validate_sensor_batch(readings)
+        if rejected:
+            logger.debug(f"Invalid readings rejected: {rejected}")
+            self._count('invalid', len(rejected))
+        if not valid:
+            return
+
+        if self.handler(valid):
+            self._count('processed', len(valid))
+        else:
+            self._count('failed', len(valid))
+
+    def _worker_loop(self, shard: int):
+        shard_queue = self._queues[shard]
+        while True:
+            try:
+                readings = shard_queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    return
+                self._reload_spilled()
+                continue
+
+            try:
+                self._process(readings)
+            except Exception as e:
+                self._count('failed', len(readings))
+                logger.error(f"Ingest worker error: {e}")
+            finally:
+                shard_queue.task_done()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop_event.set()
+
+        deadline = time.monotonic() + timeout
+        while any(shard_queue.unfinished_tasks for shard_queue in self._queues) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._executor.shutdown(wait=True)
+        self._reload_spilled()
+
+        logger.info(f"Ingest pipeline stopped: {self.get_metrics()}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics.update({
+            'depth': sum(shard_queue.qsize() for shard_queue in self._queues),
+            'shard_depths': [shard_queue.qsize() for shard_queue in self._queues],
+            'capacity': sum(shard_queue.maxsize for shard_queue in self._queues),
+            'workers': self.workers,
+            'overflow_policy': self.overflow_policy,
+            'spilled_pending': self._spilled_pending
+        })
+        return metrics
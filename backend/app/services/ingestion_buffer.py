@@ -0,0 +1,171 @@
+import threading
+import time
+import pymongo
+from typing import Dict, Any, List, Optional
+from app.core.database import DatabaseManager
+from app.core.logger_config import logger
+from app.core.config import INGEST_BATCH_SIZE, INGEST_FLUSH_INTERVAL_SECONDS, INGEST_BUFFER_MAX_PENDING, INGEST_WRITE_TIMEOUT_SECONDS
+from app.services.spool_service import SensorSpool
+
+
+class SensorIngestionBuffer:
+
+    def __init__(self, db_manager: DatabaseManager, max_batch_size: int = INGEST_BATCH_SIZE,
+                 max_batch_age: float = INGEST_FLUSH_INTERVAL_SECONDS, max_pending: int = INGEST_BUFFER_MAX_PENDING,
+                 spool: Optional[SensorSpool] = None, write_timeout: float = INGEST_WRITE_TIMEOUT_SECONDS):
+        self.db_manager = db_manager
+        self.spool = spool
+        self.write_timeout = write_timeout
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_age = max(0.01, max_batch_age)
+        self.max_pending = max(self.max_batch_size, max_pending)
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._oldest_at: Optional[float] = None
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+
+        self._metrics = {
+            'received': 0,
+            'flushes': 0,
+            'flushed_records': 0,
+            'failed_records': 0,
+            'spooled_records': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+
+        self._flush_thread = threading.Thread(target=self._flush_loop, name='sensor-ingest-flusher', daemon=True)
+        self._flush_thread.start()
+
+    def add(self, sensor_data: Dict[str, Any]) -> bool:
+        return self.add_many([sensor_data])
+
+    def add_many(self, sensor_data_list: List[Dict[str, Any]]) -> bool:
+        if not sensor_data_list:
+            return True
+
+        with self._condition:
+            while len(self._buffer) >= self.max_pending and not self._closed:
+                self._condition.wait()
+
+            if self._closed:
+                logger.warning(f"Ingestion buffer is closed, dropping {len(sensor_data_list)} sensor readings")
+                return False
+
+            was_empty = not self._buffer
+            if was_empty:
+                self._oldest_at = time.monotonic()
+            self._buffer.extend(sensor_data_list)
+            self._metrics['received'] += len(sensor_data_list)
+
+            if was_empty or len(self._buffer) >= self.max_batch_size:
+                self._condition.notify_all()
+        return True
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = self._buffer[:self.max_batch_size]
+        self._buffer = self._buffer[self.max_batch_size:]
+        self._oldest_at = time.monotonic() if self._buffer else None
+        self._condition.notify_all()
+        return batch
+
+    def _flush_loop(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._buffer) >= self.max_batch_size:
+                        break
+                    if self._oldest_at is not None:
+                        remaining = self.max_batch_age - (time.monotonic() - self._oldest_at)
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+
+                if self._closed:
+                    return
+                batch = self._take_batch()
+
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> int:
+        if not batch:
+            return 0
+
+        with self._flush_lock:
+            started = time.perf_counter()
+            spooled = 0
+            if self.spool and not self.spool.db_available:
+                inserted = 0
+                spooled = self.spool.append_many(batch)
+            else:
+                try:
+                    with pymongo.timeout(self.write_timeout):
+                        inserted = self.db_manager.insert_sensor_data_batch(batch)
+                except Exception as e:
+                    inserted = 0
+                    logger.error(f"Error flushing {len(batch)} buffered sensor readings: {e}")
+                    if self.spool:
+                        self.spool.mark_unavailable()
+                        spooled = self.spool.append_many(batch)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            metrics = self._metrics
+            metrics['flushes'] += 1
+            metrics['flushed_records'] += inserted
+            metrics['spooled_records'] += spooled
+            metrics['failed_records'] += len(batch) - inserted - spooled
+            metrics['last_batch_size'] = len(batch)
+            metrics['max_batch_size'] = max(metrics['max_batch_size'], len(batch))
+            metrics['last_flush_ms'] = elapsed_ms
+            metrics['max_flush_ms'] = max(metrics['max_flush_ms'], elapsed_ms)
+            metrics['total_flush_ms'] += elapsed_ms
+
+        logger.info(f"Flushed {inserted}/{len(batch)} sensor readings in {elapsed_ms:.1f} ms (spooled: {spooled})")
+        return inserted + spooled
+
+    def flush(self) -> int:
+        inserted = 0
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+            if not batch:
+                return inserted
+            inserted += self._write_batch(batch)
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+
+        self._flush_thread.join(timeout=5)
+        drained = self.flush()
+        logger.info(f"Ingestion buffer drained on shutdown: {drained} records written")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._condition:
+            pending = len(self._buffer)
+        metrics = dict(self._metrics)
+        flushes = metrics['flushes']
+        return {
+            'pending': pending,
+            'received': metrics['received'],
+            'flushes': flushes,
+            'flushed_records': metrics['flushed_records'],
+            'failed_records': metrics['failed_records'],
+            'spooled_records': metrics['spooled_records'],
+            'last_batch_size': metrics['last_batch_size'],
+            'max_batch_size': metrics['max_batch_size'],
+            'avg_batch_size': round((metrics['flushed_records'] + metrics['failed_records'] + metrics['spooled_records']) / flushes, 2) if flushes else 0.0,
+            'last_flush_ms': round(metrics['last_flush_ms'], 3),
+            'max_flush_ms': round(metrics['max_flush_ms'], 3),
+            'avg_flush_ms': round(metrics['total_flush_ms'] / flushes, 3) if flushes else 0.0
+        }
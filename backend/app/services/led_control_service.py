@@ -1,12 +1,11 @@
-import paho.mqtt.client as mqtt
-import ssl
 import threading
-import time
 from datetime import datetime
 from typing import Dict, Optional
-from app.core.config import MQTT_BROKER_HOST, MQTT_BROKER_PORT, MQTT_USERNAME, MQTT_PASSWORD, MQTT_CONTROL_TOPIC, MQTT_ACTION_HISTORY_TOPIC
+from app.core.config import MQTT_CONTROL_TOPIC, MQTT_ACTION_HISTORY_TOPIC
 from app.core.logger_config import logger
 from app.core.database import DatabaseManager
+from app.services.mqtt_service import MQTTConnectionManager
+from app.services.dedup_service import DuplicateFilter, build_ingest_key, INGEST_KEY_FIELD
 
 
 class LEDControlService:
@@ -25,8 +24,7 @@ class LEDControlService:
         if self._initialized:
             return
 
-        self.client = None
-        self.is_connected = False
+        self.connection = MQTTConnectionManager()
         self._initialized = True
         self.db_manager = DatabaseManager()
         self.led_states = {
@@ -36,24 +34,19 @@ class LEDControlService:
             'LED4': 'OFF'
         }
         self.pending_commands = {}
+        self.duplicate_filter = DuplicateFilter()
         self._setup_persistent_connection()
 
-    def _setup_persistent_connection(self):
-        self.client = self._create_client()
-        self._connect_to_broker()
+    @property
+    def is_connected(self) -> bool:
+        return self.connection.is_connected
 
-    def _connect_to_broker(self):
+    def _setup_persistent_connection(self):
         try:
-            self.client.connect(MQTT_BROKER_HOST, MQTT_BROKER_PORT, 60)
-            self.client.loop_start()
-
-            timeout = 5
-            elapsed = 0
-            while not self.is_connected and elapsed < timeout:
-                time.sleep(0.1)
-                elapsed += 0.1
+            self.connection.register_handler(MQTT_ACTION_HISTORY_TOPIC, self._on_action_history)
+            self.connection.start()
 
-            if self.is_connected:
+            if self.connection.wait_until_connected(timeout=5):
                 logger.info("LED Control Service: Connected to MQTT broker")
             else:
                 logger.error("LED Control Service: Failed to connect to MQTT broker")
@@ -61,62 +54,17 @@ class LEDControlService:
         except Exception as e:
             logger.error(f"LED Control Service connection error: {e}")
 
-    def _create_client(self):
-        client = mqtt.Client()
-        client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
-
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        client.tls_set_context(context)
-
-        client.on_connect = self._on_connect
-        client.on_disconnect = self._on_disconnect
-        client.on_message = self._on_message
-
-        return client
-
-    def _on_connect(self, client, userdata, flags, rc):
-        if rc == 0:
-            self.is_connected = True
-            logger.info("LED Control Service: MQTT Connected")
-            client.subscribe(MQTT_ACTION_HISTORY_TOPIC)
-            logger.info(f"LED Control Service: Subscribed to {MQTT_ACTION_HISTORY_TOPIC}")
+    def _on_action_history(self, topic: str, status_data: Dict):
+        if isinstance(status_data, dict):
+            ingest_key = build_ingest_key(status_data)
+            if self.duplicate_filter.seen(ingest_key):
+                logger.debug(f"LED Control Service: Duplicate status message suppressed: {status_data}")
+                return
+            self._handle_led_status_confirmation(status_data, ingest_key)
         else:
-            self.is_connected = False
-            logger.error(f"LED Control Service: MQTT Connection failed, rc={rc}")
-
-    def _on_disconnect(self, client, userdata, rc):
-        self.is_connected = False
-        logger.warning("LED Control Service: MQTT Disconnected")
-        threading.Thread(target=self._reconnect, daemon=True).start()
-
-    def _reconnect(self):
-        time.sleep(2)
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                if not self.is_connected:
-                    self.client.reconnect()
-                    break
-            except Exception as e:
-                logger.error(f"LED Control Service: Reconnect attempt {attempt + 1} failed: {e}")
-                time.sleep(3)
-
-    def _on_message(self, client, userdata, msg):
-        try:
-            import json
-            topic = msg.topic
-            payload = msg.payload.decode('utf-8')
-
-            if topic == MQTT_ACTION_HISTORY_TOPIC:
-                status_data = json.loads(payload)
-                self._handle_led_status_confirmation(status_data)
+            logger.warning(f"LED Control Service: Invalid status data type: {status_data}")
 
-        except Exception as e:
-            logger.error(f"LED Control Service: Error processing message: {e}")
-
-    def _handle_led_status_confirmation(self, status_data: Dict):
+    def _handle_led_status_confirmation(self, status_data: Dict, ingest_key: Optional[str] = None):
         try:
             led = status_data.get('led')
             state = status_data.get('state')
@@ -144,6 +92,8 @@ class LEDControlService:
                         'device': led,
                         'description': f"Điều khiển {led} {state}"
                     }
+                    if ingest_key:
+                        action_record[INGEST_KEY_FIELD] = ingest_key
                     self.db_manager.save_action_history(action_record)
                     logger.info(f"LED Control Service: LED status confirmed and saved to database - {led} = {state}")
 
@@ -153,8 +103,7 @@ class LEDControlService:
     def send_led_command(self, led_id: str, action: str) -> bool:
         try:
             if not self.is_connected:
-                logger.warning("LED Control Service: Not connected, scheduling background reconnect and returning False")
-                threading.Thread(target=self._reconnect, daemon=True).start()
+                logger.warning("LED Control Service: Not connected, waiting for automatic reconnect and returning False")
                 return False
 
             mqtt_command = f"{led_id}_{action}"
@@ -165,13 +114,11 @@ class LEDControlService:
                 'timeout': 3
             }
 
-            result = self.client.publish(MQTT_CONTROL_TOPIC, mqtt_command)
-
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
+            if self.connection.publish(MQTT_CONTROL_TOPIC, mqtt_command):
                 logger.info(f"LED Control: Command '{mqtt_command}' sent successfully, waiting for confirmation")
                 return True
             else:
-                logger.error(f"LED Control: Failed to publish command, rc={result.rc}")
+                logger.error(f"LED Control: Failed to publish command '{mqtt_command}'")
                 if led_id in self.pending_commands:
                     del self.pending_commands[led_id]
                 return False
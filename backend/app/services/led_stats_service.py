@@ -1,16 +1,17 @@
 import time
-from typing import Dict, List
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
 from app.core.database import DatabaseManager
 from app.core.logger_config import logger
+from app.core.timezone_utils import get_current_vietnam_time
 
 
 class LEDStatsService:
     _instance = None
-    _cache = {
-        'data': None,
-        'timestamp': 0,
-        'ttl': 3
-    }
+    _cache: 'OrderedDict[str, Dict]' = OrderedDict()
+    CACHE_TTL = 3
+    MAX_CACHE_ENTRIES = 512
 
     def __new__(cls):
         if cls._instance is None:
@@ -25,27 +26,42 @@ class LEDStatsService:
         self.db_manager = DatabaseManager()
         self._initialized = True
 
-    def get_led_stats(self, use_cache: bool = True, date: str = None) -> List[Dict]:
+    def _is_past_date(self, value: Optional[str]) -> bool:
+        try:
+            return bool(value) and datetime.strptime(value, '%Y-%m-%d').date() < get_current_vietnam_time().date()
+        except ValueError:
+            return False
+
+    def get_led_stats(self, use_cache: bool = True, date: str = None,
+                      start_date: str = None, end_date: str = None) -> List[Dict]:
         try:
             current_time = time.time()
 
-            cache_key = date if date else 'today'
+            if date:
+                start_date = end_date = date
+            cache_key = f"{start_date or ''}..{end_date or ''}"
+
+            entry = self._cache.get(cache_key)
+            if use_cache and entry is not None:
+                cache_age = current_time - entry['timestamp']
+                if entry['immutable'] or cache_age < self.CACHE_TTL:
+                    logger.info(f"Returning cached LED stats for {cache_key} (age: {cache_age:.2f}s)")
+                    return entry['data']
 
-            if use_cache and self._cache['data'] is not None and not date:
-                cache_age = current_time - self._cache['timestamp']
-                if cache_age < self._cache['ttl']:
-                    logger.info(f"Returning cached LED stats (age: {cache_age:.2f}s)")
-                    return self._cache['data']
+            stats = self.db_manager.get_led_toggle_stats(start_date=start_date, end_date=end_date)
 
-            stats = self.db_manager.get_led_toggle_stats(date=date)
-            
             sorted_stats = self._sort_stats(stats)
 
-            if not date:
-                self._cache['data'] = sorted_stats
-                self._cache['timestamp'] = current_time
+            self._cache[cache_key] = {
+                'data': sorted_stats,
+                'timestamp': current_time,
+                'immutable': self._is_past_date(end_date)
+            }
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.MAX_CACHE_ENTRIES:
+                self._cache.popitem(last=False)
 
-            logger.info(f"LED stats refreshed from database (date={date}): {sorted_stats}")
+            logger.info(f"LED stats refreshed from database ({cache_key}): {sorted_stats}")
             return sorted_stats
 
         except Exception as e:
@@ -58,6 +74,5 @@ class LEDStatsService:
         return stats_list
 
     def clear_cache(self):
-        self._cache['data'] = None
-        self._cache['timestamp'] = 0
+        self._cache.clear()
         logger.info("LED stats cache cleared")
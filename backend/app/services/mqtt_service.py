@@ -1,29 +1,59 @@
 import paho.mqtt.client as mqtt
-import json
+import logging
 import ssl
 import os
+import threading
 import time
-from typing import Optional, Callable
+from typing import Any, Dict, List, Optional, Callable, Tuple
 from app.core.logger_config import logger
-from app.core.config import MQTT_BROKER_HOST, MQTT_BROKER_PORT, MQTT_DATA_TOPIC, MQTT_USERNAME, MQTT_PASSWORD, MQTT_ACTION_HISTORY_TOPIC
-from app.services.validation_service import DataValidator
+from app.services.payload_codecs import PayloadDecoder, PayloadDecodeError
+from app.core.config import (MQTT_BROKER_HOST, MQTT_BROKER_PORT, MQTT_DATA_TOPIC, MQTT_USERNAME, MQTT_PASSWORD,
+                             MQTT_TLS_ENABLED, MQTT_PROTOCOL_VERSION, MQTT_SHARED_SUBSCRIPTION_GROUP, MQTT_DEFAULT_DEVICE_ID)
 
 
-class MQTTManager:
+def extract_device_id(topic_filter: str, topic: str, default: Optional[str] = MQTT_DEFAULT_DEVICE_ID) -> Optional[str]:
+    filter_levels = topic_filter.split('/')
+    topic_levels = topic.split('/')
+    for index, level in enumerate(filter_levels):
+        if level in ('+', '#'):
+            return topic_levels[index] if index < len(topic_levels) and topic_levels[index] else default
+    return default
+
+
+class MQTTConnectionManager:
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
 
-    def __init__(self, message_callback: Optional[Callable] = None, status_callback: Optional[Callable] = None):
         self.mqtt_client: Optional[mqtt.Client] = None
-        self.message_callback = message_callback
-        self.status_callback = status_callback
         self.is_connected = False
+        self._routes: List[Tuple[str, str, int, Callable[[str, Any], None]]] = []
+        self._routes_lock = threading.Lock()
+        self._started = False
+        self._users = 0
+        self._connected_event = threading.Event()
+        self.payload_decoder = PayloadDecoder()
+        self._initialized = True
         self.setup_client()
 
     def setup_client(self):
         try:
             pid = os.getpid()
             ts = int(time.time())
-            client_id = f"python_iot_receiver_{pid}_{ts}"
-            self.mqtt_client = mqtt.Client(client_id=client_id)
+            client_id = f"python_iot_backend_{pid}_{ts}"
+            self._protocol = mqtt.MQTTv5 if MQTT_PROTOCOL_VERSION == '5' else mqtt.MQTTv311
+            self.mqtt_client = mqtt.Client(client_id=client_id, protocol=self._protocol)
             self._client_id = client_id
             self._reconnect_attempts = 0
 
@@ -34,10 +64,11 @@ class MQTTManager:
 
             self.mqtt_client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
 
-            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-            self.mqtt_client.tls_set_context(context)
+            if MQTT_TLS_ENABLED:
+                context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+                self.mqtt_client.tls_set_context(context)
 
             try:
                 self.mqtt_client.reconnect_delay_set(min_delay=1, max_delay=120)
@@ -49,28 +80,57 @@ class MQTTManager:
             self.mqtt_client.on_disconnect = self._on_disconnect
             self.mqtt_client.on_log = self._on_log
 
-            logger.info(f"MQTT client initialized (client_id={client_id})")
+            logger.info(f"MQTT client initialized (client_id={client_id}, protocol={MQTT_PROTOCOL_VERSION})")
 
         except Exception as e:
             logger.error(f"MQTT client initialization failed: {e}")
             raise
 
-    def _on_connect(self, client, userdata, flags, rc):
+    def register_handler(self, topic_filter: str, handler: Callable[[str, Any], None], qos: int = 0,
+                         shared_group: Optional[str] = None):
+        subscription = f"$share/{shared_group}/{topic_filter}" if shared_group else topic_filter
+        with self._routes_lock:
+            self._routes.append((topic_filter, subscription, qos, handler))
+
+        if self.is_connected:
+            self.mqtt_client.subscribe(subscription, qos)
+            logger.info(f"Subscribed to topic: {subscription}")
+
+    def unregister_handler(self, handler: Callable[[str, Any], None]):
+        with self._routes_lock:
+            removed = [route for route in self._routes if route[3] == handler]
+            self._routes = [route for route in self._routes if route[3] != handler]
+            remaining = {route[1] for route in self._routes}
+
+        for _, subscription, _, _ in removed:
+            if subscription not in remaining and self.is_connected:
+                self.mqtt_client.unsubscribe(subscription)
+                logger.info(f"Unsubscribed from topic: {subscription}")
+
+    def _subscriptions(self) -> Dict[str, int]:
+        subscriptions = {}
+        with self._routes_lock:
+            for _, subscription, qos, _ in self._routes:
+                subscriptions[subscription] = max(qos, subscriptions.get(subscription, 0))
+        return subscriptions
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
             self.is_connected = True
+            self._connected_event.set()
             logger.info(f"Connected to MQTT broker: {MQTT_BROKER_HOST}:{MQTT_BROKER_PORT} (client_id={getattr(self, '_client_id', 'unknown')})")
 
-            client.subscribe(MQTT_DATA_TOPIC)
-            logger.info(f"Subscribed to topic: {MQTT_DATA_TOPIC}")
-            client.subscribe(MQTT_ACTION_HISTORY_TOPIC)
-            logger.info(f"Subscribed to topic: {MQTT_ACTION_HISTORY_TOPIC}")
+            for topic_filter, qos in self._subscriptions().items():
+                client.subscribe(topic_filter, qos)
+                logger.info(f"Subscribed to topic: {topic_filter}")
 
         else:
             self.is_connected = False
             logger.error(f"Failed to connect to MQTT broker, return code: {rc}")
 
-    def _on_disconnect(self, client, userdata, rc):
+    def _on_disconnect(self, client, userdata, rc, properties=None):
         self.is_connected = False
+        self._connected_event.clear()
         if rc != 0:
             self._reconnect_attempts += 1
             logger.warning(
@@ -87,66 +147,74 @@ class MQTTManager:
     def _on_message(self, client, userdata, msg):
         try:
             topic = msg.topic
-            payload = msg.payload.decode('utf-8')
-
-            logger.info(f"Received message on topic '{topic}': {payload}")
-
-            if topic == MQTT_DATA_TOPIC:
-                sensor_data = json.loads(payload)
-                if not DataValidator.validate_sensor_data(sensor_data):
-                    logger.warning(f"Invalid data received: {sensor_data}")
-                    return
-                if self.message_callback:
-                    self.message_callback(sensor_data)
-            elif topic == MQTT_ACTION_HISTORY_TOPIC:
-                try:
-                    status_data = json.loads(payload)
-                except json.JSONDecodeError:
-                    logger.error(f"Invalid JSON status payload: {payload}")
-                    return
-                if self.status_callback:
-                    self.status_callback(status_data)
-            else:
+            with self._routes_lock:
+                handlers = [handler for topic_filter, _, _, handler in self._routes if mqtt.topic_matches_sub(topic_filter, topic)]
+
+            if not handlers:
                 logger.debug(f"Unhandled topic received: {topic}")
+                return
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Received message on topic '{topic}': {msg.payload!r}")
+
+            try:
+                data = self.payload_decoder.decode(topic, msg.payload)
+            except PayloadDecodeError as e:
+                logger.error(f"Undecodable payload on topic '{topic}' ({len(msg.payload)} bytes): {e}")
+                return
+
+            for handler in handlers:
+                try:
+                    handler(topic, data)
+                except Exception as e:
+                    logger.error(f"Error in handler for topic '{topic}': {e}")
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON data: {payload}, Error: {e}")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
 
-    def connect(self) -> bool:
-        try:
-            logger.info(f"Connecting to MQTT broker {MQTT_BROKER_HOST}:{MQTT_BROKER_PORT}...")
-            self.mqtt_client.connect(MQTT_BROKER_HOST, MQTT_BROKER_PORT, 60)
-            return True
-        except Exception as e:
-            logger.error(f"Error connecting to MQTT broker: {e}")
-            return False
+    def start(self) -> bool:
+        with self._lock:
+            self._users += 1
+            if self._started:
+                return True
 
-    def start_loop(self):
-        try:
-            logger.info("Starting MQTT message loop...")
-            self.mqtt_client.loop_forever()
-        except Exception as e:
-            logger.error(f"Error in MQTT loop: {e}")
-            raise
+            try:
+                logger.info(f"Connecting to MQTT broker {MQTT_BROKER_HOST}:{MQTT_BROKER_PORT}...")
+                self.mqtt_client.connect_async(MQTT_BROKER_HOST, MQTT_BROKER_PORT, 60)
+                self.mqtt_client.loop_start()
+                self._started = True
+                return True
+            except Exception as e:
+                self._users -= 1
+                logger.error(f"Error connecting to MQTT broker: {e}")
+                return False
+
+    def wait_until_connected(self, timeout: Optional[float] = None) -> bool:
+        return self._connected_event.wait(timeout)
 
     def stop(self):
-        try:
-            if self.mqtt_client:
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users or not self._started:
+                return
+
+            try:
                 self.mqtt_client.disconnect()
+                self.mqtt_client.loop_stop()
                 self.is_connected = False
+                self._connected_event.clear()
+                self._started = False
                 logger.info("MQTT client disconnected")
-        except Exception as e:
-            logger.error(f"Error stopping MQTT client: {e}")
+            except Exception as e:
+                logger.error(f"Error stopping MQTT client: {e}")
 
-    def publish_message(self, topic: str, message: str) -> bool:
+    def publish(self, topic: str, message: str, qos: int = 0) -> bool:
         try:
             if not self.is_connected:
                 logger.warning("MQTT client not connected")
                 return False
 
-            result = self.mqtt_client.publish(topic, message)
+            result = self.mqtt_client.publish(topic, message, qos)
 
             if result.rc == mqtt.MQTT_ERR_SUCCESS:
                 logger.info(f"Message published to topic '{topic}': {message}")
@@ -158,3 +226,49 @@ class MQTTManager:
         except Exception as e:
             logger.error(f"Error publishing message: {e}")
             return False
+
+
+class MQTTManager:
+
+    def __init__(self, message_callback: Optional[Callable] = None):
+        self.message_callback = message_callback
+        self.connection = MQTTConnectionManager()
+        self._stop_event = threading.Event()
+        self._registered = False
+
+    @property
+    def is_connected(self) -> bool:
+        return self.connection.is_connected
+
+    def _on_sensor_data(self, topic: str, sensor_data: Any):
+        if self.message_callback:
+            self.message_callback(sensor_data, extract_device_id(MQTT_DATA_TOPIC, topic))
+
+    def connect(self) -> bool:
+        if not self._registered:
+            self.connection.register_handler(MQTT_DATA_TOPIC, self._on_sensor_data, shared_group=MQTT_SHARED_SUBSCRIPTION_GROUP or None)
+            self._registered = True
+        return self.connection.start()
+
+    def start_loop(self):
+        try:
+            logger.info("Starting MQTT message loop...")
+            self._stop_event.clear()
+            while not self._stop_event.wait(1):
+                pass
+        except Exception as e:
+            logger.error(f"Error in MQTT loop: {e}")
+            raise
+
+    def stop(self):
+        try:
+            self._stop_event.set()
+            if self._registered:
+                self.connection.unregister_handler(self._on_sensor_data)
+                self._registered = False
+                self.connection.stop()
+        except Exception as e:
+            logger.error(f"Error stopping MQTT client: {e}")
+
+    def publish_message(self, topic: str, message: str) -> bool:
+        return self.connection.publish(topic, message)
@@ -0,0 +1,112 @@
+import json
+from typing import Any, Callable, Dict, List, Tuple
+import paho.mqtt.client as mqtt
+from app.core.logger_config import logger
+from app.core.config import MQTT_PAYLOAD_CODECS, MQTT_DEFAULT_PAYLOAD_CODEC
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+class PayloadDecodeError(ValueError):
+    pass
+
+
+def _decode_json(payload: memoryview) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload.tobytes())
+
+
+def _decode_msgpack(payload: memoryview) -> Any:
+    return msgpack.unpackb(payload, raw=False, timestamp=3)
+
+
+def _decode_cbor(payload: memoryview) -> Any:
+    return cbor2.loads(payload)
+
+
+CODECS: Dict[str, Callable[[memoryview], Any]] = {
+    'json': _decode_json,
+    'msgpack': _decode_msgpack,
+    'cbor': _decode_cbor
+}
+
+CODEC_AVAILABLE = {
+    'json': True,
+    'msgpack': msgpack is not None,
+    'cbor': cbor2 is not None
+}
+
+MARKER_BYTES = {
+    0x01: 'json',
+    0x02: 'msgpack',
+    0x03: 'cbor'
+}
+
+
+def parse_topic_codecs(spec: str) -> List[Tuple[str, str]]:
+    routes = []
+    for entry in spec.split(';'):
+        if not entry.strip():
+            continue
+        topic_filter, _, codec = entry.rpartition('=')
+        codec = codec.strip().lower()
+        if not topic_filter.strip() or codec not in CODECS:
+            logger.warning(f"Ignoring invalid payload codec mapping: '{entry}'")
+            continue
+        routes.append((topic_filter.strip(), codec))
+    return routes
+
+
+class PayloadDecoder:
+
+    def __init__(self, topic_codecs: str = MQTT_PAYLOAD_CODECS, default_codec: str = MQTT_DEFAULT_PAYLOAD_CODEC):
+        self.topic_codecs = parse_topic_codecs(topic_codecs)
+        self.default_codec = default_codec if default_codec in CODECS else 'json'
+
+        for _, codec in self.topic_codecs + [('', self.default_codec)]:
+            if not CODEC_AVAILABLE[codec]:
+                logger.warning(f"Payload codec '{codec}' is configured but its package is not installed")
+
+    def codec_for_topic(self, topic: str) -> str:
+        for topic_filter, codec in self.topic_codecs:
+            if mqtt.topic_matches_sub(topic_filter, topic):
+                return codec
+        return self.default_codec
+
+    def decode(self, topic: str, payload: bytes) -> Any:
+        view = memoryview(payload)
+        codec = MARKER_BYTES.get(view[0]) if view.nbytes else None
+        if codec:
+            view = view[1:]
+        else:
+            codec = self.codec_for_topic(topic)
+
+        if not CODEC_AVAILABLE[codec]:
+            raise PayloadDecodeError(f"codec '{codec}' is not installed")
+
+        try:
+            return CODECS[codec](view)
+        except Exception as e:
+            raise PayloadDecodeError(f"invalid {codec} payload: {e}") from e
+
+    def get_codecs(self) -> Dict[str, Any]:
+        return {
+            'available': [name for name, available in CODEC_AVAILABLE.items() if available],
+            'json_parser': 'orjson' if orjson is not None else 'json',
+            'default': self.default_codec,
+            'topics': dict(self.topic_codecs)
+        }
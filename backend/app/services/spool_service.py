@@ -0,0 +1,242 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import timezone
+from typing import Dict, Any, List, Optional
+from bson import ObjectId, json_util
+from bson.json_util import JSONOptions
+from app.core.logger_config import logger
+from app.core.config import (INGEST_SPOOL_DIR, INGEST_SPOOL_SEGMENT_BYTES, INGEST_SPOOL_MAX_BYTES,
+                             INGEST_SPOOL_REPLAY_INTERVAL_SECONDS, INGEST_BATCH_SIZE)
+
+SPOOL_JSON_OPTIONS = JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+RECORD_HEADER = struct.Struct('>II')
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.spool'
+
+
+class SensorSpool:
+
+    def __init__(self, spool_dir: str = INGEST_SPOOL_DIR, segment_bytes: int = INGEST_SPOOL_SEGMENT_BYTES,
+                 max_bytes: int = INGEST_SPOOL_MAX_BYTES):
+        self.spool_dir = spool_dir
+        self.segment_bytes = max(4096, segment_bytes)
+        self.max_bytes = max(self.segment_bytes, max_bytes)
+
+        self._lock = threading.Lock()
+        self._active_file = None
+        self._active_path: Optional[str] = None
+        self._active_size = 0
+        self._replaying_path: Optional[str] = None
+        self._db_available = True
+        self._metrics = {
+            'appended': 0,
+            'replayed': 0,
+            'dropped': 0,
+            'corrupt': 0
+        }
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._next_segment = self._scan_next_segment()
+
+        if self._segment_paths():
+            self._db_available = False
+            logger.info(f"Found pending spool segments in {self.spool_dir}, replay required")
+
+    @property
+    def db_available(self) -> bool:
+        return self._db_available
+
+    def mark_unavailable(self):
+        if self._db_available:
+            logger.warning("Database marked unavailable, spooling sensor readings to disk")
+        self._db_available = False
+
+    def _segment_paths(self) -> List[str]:
+        names = sorted(name for name in os.listdir(self.spool_dir)
+                       if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.spool_dir, name) for name in names]
+
+    def _scan_next_segment(self) -> int:
+        numbers = [int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for path in self._segment_paths()]
+        return max(numbers) + 1 if numbers else 1
+
+    def _open_segment(self):
+        self._active_path = os.path.join(self.spool_dir, f"{SEGMENT_PREFIX}{self._next_segment:010d}{SEGMENT_SUFFIX}")
+        self._next_segment += 1
+        self._active_file = open(self._active_path, 'ab')
+        self._active_size = 0
+
+    def _seal_active(self):
+        if self._active_file:
+            self._active_file.close()
+            self._active_file = None
+            self._active_path = None
+            self._active_size = 0
+
+    def _enforce_disk_limit(self):
+        segments = self._segment_paths()
+        total = sum(os.path.getsize(path) for path in segments)
+        for path in segments:
+            if total <= self.max_bytes or path == self._active_path:
+                break
+            if path == self._replaying_path:
+                continue
+            size = os.path.getsize(path)
+            dropped = len(self._read_segment(path))
+            os.remove(path)
+            total -= size
+            self._metrics['dropped'] += dropped
+            logger.error(f"Spool over {self.max_bytes} bytes, dropped oldest segment {os.path.basename(path)} ({dropped} records)")
+
+    def append_many(self, documents: List[Dict[str, Any]]) -> int:
+        if not documents:
+            return 0
+
+        with self._lock:
+            try:
+                if self._active_file is None:
+                    self._open_segment()
+
+                for document in documents:
+                    document.setdefault('_id', ObjectId())
+                    payload = json_util.dumps(document, json_options=SPOOL_JSON_OPTIONS).encode('utf-8')
+                    record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+                    self._active_file.write(record)
+                    self._active_size += len(record)
+
+                    if self._active_size >= self.segment_bytes:
+                        self._active_file.flush()
+                        os.fsync(self._active_file.fileno())
+                        self._seal_active()
+                        self._open_segment()
+
+                self._active_file.flush()
+                os.fsync(self._active_file.fileno())
+                self._metrics['appended'] += len(documents)
+                self._enforce_disk_limit()
+
+                return len(documents)
+
+            except Exception as e:
+                logger.error(f"Error writing {len(documents)} readings to spool: {e}")
+                return 0
+
+    def _read_segment(self, path: str) -> List[Dict[str, Any]]:
+        documents = []
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            length, checksum = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length:
+                logger.warning(f"Truncated record at end of spool segment {os.path.basename(path)}")
+                self._metrics['corrupt'] += 1
+                break
+            offset = start + length
+
+            if zlib.crc32(payload) != checksum:
+                logger.warning(f"Checksum mismatch in spool segment {os.path.basename(path)}, skipping record")
+                self._metrics['corrupt'] += 1
+                continue
+
+            documents.append(json_util.loads(payload.decode('utf-8'), json_options=SPOOL_JSON_OPTIONS))
+
+        return documents
+
+    def replay(self, db_manager, batch_size: int = INGEST_BATCH_SIZE) -> int:
+        with self._lock:
+            self._seal_active()
+            segments = self._segment_paths()
+
+        replayed = 0
+        for path in segments:
+            with self._lock:
+                if not os.path.exists(path):
+                    continue
+                self._replaying_path = path
+
+            try:
+                documents = self._read_segment(path)
+                for start in range(0, len(documents), batch_size):
+                    db_manager.insert_sensor_data_batch(documents[start:start + batch_size])
+            finally:
+                with self._lock:
+                    self._replaying_path = None
+
+            with self._lock:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    logger.warning(f"Spool segment {os.path.basename(path)} was already removed after replay")
+            replayed += len(documents)
+            self._metrics['replayed'] += len(documents)
+            logger.info(f"Replayed spool segment {os.path.basename(path)} ({len(documents)} records)")
+
+        with self._lock:
+            if not self._segment_paths():
+                self._db_available = True
+
+        return replayed
+
+    def has_backlog(self) -> bool:
+        return bool(self._segment_paths())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = self._segment_paths()
+            total_bytes = sum(os.path.getsize(path) for path in segments)
+        metrics = dict(self._metrics)
+        metrics.update({
+            'db_available': self._db_available,
+            'segments': len(segments),
+            'bytes': total_bytes,
+            'max_bytes': self.max_bytes
+        })
+        return metrics
+
+    def close(self):
+        with self._lock:
+            self._seal_active()
+
+
+class SpoolReplayer:
+
+    def __init__(self, spool: SensorSpool, db_manager, interval: float = INGEST_SPOOL_REPLAY_INTERVAL_SECONDS):
+        self.spool = spool
+        self.db_manager = db_manager
+        self.interval = max(0.1, interval)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='spool-replayer', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            if self.spool.db_available and not self.spool.has_backlog():
+                continue
+
+            try:
+                if not self.db_manager.is_connected():
+                    continue
+
+                started = time.perf_counter()
+                replayed = self.spool.replay(self.db_manager)
+                if replayed:
+                    logger.info(f"Spool replay finished: {replayed} records in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+            except Exception as e:
+                self.spool.mark_unavailable()
+                logger.error(f"Spool replay failed, will retry: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
@@ -1,10 +1,12 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from app.core.logger_config import logger
+from app.core.timezone_utils import parse_device_timestamp
 
 
 class DataValidator:
 
     REQUIRED_FIELDS = ['temperature', 'humidity', 'light']
+    BATCH_FIELD = 'readings'
 
     @classmethod
     def validate_sensor_data(cls, data: Dict[str, Any]) -> bool:
@@ -29,6 +31,43 @@ class DataValidator:
             logger.error(f"Error validating data: {e}")
             return False
 
+    @classmethod
+    def unpack_readings(cls, payload: Any) -> List[Any]:
+        if isinstance(payload, list):
+            return payload
+
+        if isinstance(payload, dict) and isinstance(payload.get(cls.BATCH_FIELD), list):
+            envelope = {key: value for key, value in payload.items() if key != cls.BATCH_FIELD}
+            return [{**envelope, **reading} if isinstance(reading, dict) else reading for reading in payload[cls.BATCH_FIELD]]
+
+        return [payload]
+
+    @classmethod
+    def validate_sensor_batch(cls, readings: List[Any]) -> Tuple[List[Dict[str, Any]], List[Any]]:
+        valid = []
+        rejected = []
+
+        for reading in readings:
+            if not isinstance(reading, dict) or not cls.validate_sensor_data(reading):
+                rejected.append(reading)
+                continue
+
+            raw_timestamp = reading.pop('ts', None) if 'ts' in reading else reading.get('timestamp')
+            if raw_timestamp is not None:
+                timestamp = parse_device_timestamp(raw_timestamp)
+                if timestamp is None:
+                    logger.warning(f"Invalid reading timestamp: {raw_timestamp}")
+                    rejected.append(reading)
+                    continue
+                reading['timestamp'] = timestamp
+
+            valid.append(reading)
+
+        if rejected:
+            logger.warning(f"Rejected {len(rejected)}/{len(readings)} readings in batch")
+
+        return valid, rejected
+
     @classmethod
     def _validate_temperature(cls, temperature: Any) -> bool:
         try:
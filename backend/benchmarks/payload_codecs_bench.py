@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import payload_codecs
+from app.services.payload_codecs import PayloadDecoder, MARKER_BYTES, CODEC_AVAILABLE
+
+MARKERS = {codec: bytes([marker]) for marker, codec in MARKER_BYTES.items()}
+
+
+def make_frames():
+    now_ms = int(time.time() * 1000)
+    single = {'temperature': 27.4, 'humidity': 61.3, 'light': 48.9}
+    batch = {
+        'device_id': 'esp32-01',
+        'readings': [
+            {'temperature': 27.4 + i * 0.1, 'humidity': 61.3, 'light': 48.9, 'ts': now_ms + i * 100}
+            for i in range(50)
+        ]
+    }
+    return {'single': (single, 1), 'batch50': (batch, 50)}
+
+
+def encoders():
+    result = {'json': lambda frame: json.dumps(frame, separators=(',', ':')).encode('utf-8')}
+    if CODEC_AVAILABLE['msgpack']:
+        result['msgpack'] = lambda frame: payload_codecs.msgpack.packb(frame, use_bin_type=True)
+    if CODEC_AVAILABLE['cbor']:
+        result['cbor'] = lambda frame: payload_codecs.cbor2.dumps(frame)
+    return result
+
+
+def bench(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare MQTT payload codecs on sensor frames')
+    parser.add_argument('--number', type=int, default=20000, help='decodes per timing run')
+    args = parser.parse_args()
+
+    decoder = PayloadDecoder(topic_codecs='', default_codec='json')
+    topic = 'esp32/iot/data'
+
+    print(f"json parser: {decoder.get_codecs()['json_parser']}")
+    print(f"{'frame':<10}{'codec':<18}{'bytes':>8}{'us/msg':>10}{'us/reading':>12}")
+
+    for frame_name, (frame, readings) in make_frames().items():
+        json_payload = encoders()['json'](frame)
+        legacy_us = bench(lambda: json.loads(json_payload.decode('utf-8')), args.number)
+        print(f"{frame_name:<10}{'json (legacy)':<18}{len(json_payload):>8}{legacy_us:>10.2f}{legacy_us / readings:>12.3f}")
+
+        for codec, encode in encoders().items():
+            payload = MARKERS[codec] + encode(frame)
+            assert decoder.decode(topic, payload) is not None
+            elapsed_us = bench(lambda: decoder.decode(topic, payload), args.number)
+            print(f"{frame_name:<10}{codec:<18}{len(payload):>8}{elapsed_us:>10.2f}{elapsed_us / readings:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import bson
+from bson import ObjectId
+from bson.codec_options import DEFAULT_CODEC_OPTIONS
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.mongo_pool import VIETNAM_CODEC_OPTIONS
+from app.core.timezone_utils import convert_to_vietnam_time
+
+
+def legacy_convert_to_vietnam_time(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=7)))
+    return dt.astimezone(timezone(timedelta(hours=7)))
+
+
+def make_batches(rows: int, batch_size: int):
+    start = datetime(2025, 1, 1, 17, 0, tzinfo=timezone.utc)
+    step = timedelta(days=1) / rows
+    documents = [{
+        '_id': ObjectId(),
+        'timestamp': start + step * i,
+        'temperature': 27.4 + (i % 50) * 0.1,
+        'humidity': 61.3,
+        'light': 48.9,
+        'device_id': 'esp32-01',
+        'local_date': '2025-01-02'
+    } for i in range(rows)]
+    return [b''.join(bson.encode(document) for document in documents[i:i + batch_size]) for i in range(0, rows, batch_size)]
+
+
+def decode_then_convert(batches, convert):
+    documents = []
+    for batch in batches:
+        for document in bson.decode_all(batch, DEFAULT_CODEC_OPTIONS):
+            if isinstance(document.get('timestamp'), datetime):
+                document['timestamp'] = convert(document['timestamp'])
+            documents.append(document)
+    return documents
+
+
+def decode_with_codec(batches):
+    documents = []
+    for batch in batches:
+        documents.extend(bson.decode_all(batch, VIETNAM_CODEC_OPTIONS))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-document timestamp conversion with codec-level decoding')
+    parser.add_argument('--rows', type=int, default=100000, help='readings in the simulated day')
+    parser.add_argument('--batch-size', type=int, default=1000, help='documents per cursor batch')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    batches = make_batches(args.rows, args.batch_size)
+    cases = {
+        'decode + convert (legacy tz)': lambda: decode_then_convert(batches, legacy_convert_to_vietnam_time),
+        'decode + convert (cached tz)': lambda: decode_then_convert(batches, convert_to_vietnam_time),
+        'codec tz_aware=True': lambda: decode_with_codec(batches)
+    }
+
+    expected = [document['timestamp'] for document in cases['decode + convert (legacy tz)']()]
+    assert [document['timestamp'] for document in decode_with_codec(batches)] == expected
+    assert decode_with_codec(batches)[0]['timestamp'].utcoffset() == timedelta(hours=7)
+
+    print(f"{args.rows} rows in batches of {args.batch_size}")
+    print(f"{'case':<32}{'ms/day':>10}{'us/doc':>10}")
+    baseline = None
+    for name, func in cases.items():
+        elapsed = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        baseline = baseline or elapsed
+        print(f"{name:<32}{elapsed * 1000:>10.1f}{elapsed / args.rows * 1e6:>10.3f}  ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,17 @@
 from app.api.routes import api_bp
+from app.api.streaming import prefetch_first, stream_chunks, stream_documents, wants_ndjson
 from app.services.data_service import IoTMQTTReceiver
-from app.core.config import Config
-from app.core.database import DatabaseManager
+from app.core.config import Config, MQTT_EMBEDDED_RECEIVER, MONGODB_COLLECTION_NAME
+from app.core.database import CHRONOLOGICAL, DatabaseManager, SENSOR_LIST_PROJECTION, SENSOR_SORT_FIELDS
+from app.core.mongo_pool import mongo_pool
+from app.core.pagination import InvalidCursorError
+from app.core.projection import ACTION_HISTORY_FIELDS, CHART_PROJECTION, SENSOR_FIELDS, InvalidFieldsError, parse_fields
+from app.core.count_cache import count_cache
+from app.core.query_cache import query_cache
+from app.core.cache_generations import cache_generations
 from app.core.logger_config import logger
+from app.services.downsampling_service import InvalidDownsamplingError, downsample_documents, parse_method
+from app.services.export_service import EXPORT_FORMATS, ExportError, ExportService, parse_sensors
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from flask_restx import Api, Resource, fields
@@ -24,6 +33,11 @@ def create_app():
 
     CORS(app, origins=["*"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
 
+    mongo_pool.warm_up()
+    db = DatabaseManager()
+    export_service = ExportService(db)
+    db.ensure_indexes()
+
     api = Api(
         app,
         version='1.0',
@@ -63,17 +77,22 @@ def create_app():
     class SensorDataResource(Resource):
         @sensors_ns.doc('get_latest_sensor_data',
                         description='Lấy dữ liệu cảm biến mới nhất từ ESP32',
+                        params={
+                            'device_id': 'Mã thiết bị (tùy chọn)',
+                            'fields': 'Các trường cần trả về, phân tách bằng dấu phẩy (hoặc * để lấy toàn bộ document)'
+                        },
                         responses={
                             200: 'Thành công - Trả về dữ liệu cảm biến mới nhất',
                             500: 'Lỗi server - Không thể kết nối database'
                         })
         def get(self):
             try:
-                from app.core.database import DatabaseManager
+                from flask import request
                 from app.services.status_service import StatusService
 
-                db = DatabaseManager()
-                data = db.get_recent_data(limit=1)
+                device_id = request.args.get('device_id') or None
+                projection = parse_fields(request.args.get('fields'), SENSOR_FIELDS)
+                data = db.get_recent_data(limit=1, device_id=device_id, projection=projection)
 
                 if data:
                     doc = data[0]
@@ -102,6 +121,8 @@ def create_app():
                         "message": "Database trống hoặc chưa có dữ liệu từ ESP32"
                     }
 
+            except InvalidFieldsError as e:
+                return {"error": str(e)}, 400
             except Exception as e:
                 return {
                     "error": f"Lỗi khi lấy dữ liệu: {str(e)}",
@@ -120,7 +141,13 @@ def create_app():
                             'sort_field': 'Trường sắp xếp (timestamp, temperature, humidity, light)',
                             'sort_order': 'Thứ tự sắp xếp (asc, desc)',
                             'search': 'Từ khóa tìm kiếm',
-                            'search_criteria': 'Tiêu chí tìm kiếm (all, time, temperature, humidity, light)'
+                            'search_criteria': 'Tiêu chí tìm kiếm (all, time, temperature, humidity, light)',
+                            'after': 'Cursor trang kế tiếp (pagination.next_cursor), thay cho page',
+                            'before': 'Cursor trang trước (pagination.prev_cursor), thay cho page',
+                            'estimated': 'true để dùng tổng số bản ghi ước lượng (nhanh hơn) khi không có bộ lọc',
+                            'stream': 'true (cùng limit=all) để stream toàn bộ kết quả thay vì phân trang',
+                            'format': 'ndjson để nhận mỗi bản ghi trên một dòng khi stream',
+                            'fields': 'Các trường cần trả về, phân tách bằng dấu phẩy (mặc định: timestamp, các cảm biến, device_id)'
                         },
                         responses={
                             200: 'Thành công - Trả về danh sách dữ liệu cảm biến',
@@ -129,86 +156,6 @@ def create_app():
         def get(self):
             try:
                 from flask import request
-                from app.core.database import DatabaseManager
-                import re
-
-                page = int(request.args.get('page', 1))
-                per_page = int(request.args.get('per_page', 10))
-                limit = request.args.get('limit', '10')
-                search_term = request.args.get('search', '')
-                search_criteria = request.args.get('search_criteria', 'all')
-                sort_field = request.args.get('sort_field', 'timestamp')
-                sort_order = request.args.get('sort_order', 'desc')
-
-                try:
-                    sample = int(request.args.get('sample', 1))
-                    if sample < 1:
-                        sample = 1
-                except ValueError:
-                    sample = 1
-
-                db = DatabaseManager()
-
-                if search_term:
-                    if search_criteria == 'time':
-                        data = db.search_by_time_string(search_term)
-                    elif search_criteria in ['temperature', 'humidity', 'light']:
-                        if search_term.replace('.', '').isdigit():
-                            search_value = float(search_term)
-                            criteria = {
-                                f'{search_criteria}_min': search_value,
-                                f'{search_criteria}_max': search_value
-                            }
-                            data = db.search_by_multiple_criteria(criteria)
-                        else:
-                            data = []
-                    else:
-                        criteria = {'text_search': search_term}
-                        data = db.search_by_multiple_criteria(criteria)
-
-                    if sample and sample > 1:
-                        data = data[::sample]
-                else:
-                    if limit == 'all':
-                        data = db.get_recent_data(limit=None)
-                    else:
-                        try:
-                            limit_int = int(limit)
-                            data = db.get_recent_data(limit=limit_int)
-                        except ValueError:
-                            data = db.get_recent_data(limit=10)
-
-                if sample and sample > 1:
-                    data = data[::sample]
-
-                if sort_field in ['temperature', 'humidity', 'light']:
-                    reverse = sort_order == 'desc'
-
-                    def safe_get_numeric_value(x):
-                        value = x.get(sort_field)
-                        if value is None:
-                            return float('-inf') if reverse else float('inf')
-                        try:
-                            return float(value)
-                        except (TypeError, ValueError):
-                            return float('-inf') if reverse else float('inf')
-                    data.sort(key=safe_get_numeric_value, reverse=reverse)
-                elif sort_field == 'timestamp':
-                    reverse = sort_order == 'desc'
-
-                    def get_timestamp_for_sort(x):
-                        ts = x.get('timestamp')
-                        if isinstance(ts, str):
-                            try:
-                                from dateutil import parser
-                                return parser.parse(ts)
-                            except:
-                                return datetime.min
-                        elif isinstance(ts, datetime):
-                            return ts
-                        else:
-                            return datetime.min
-                    data.sort(key=get_timestamp_for_sort, reverse=reverse)
 
                 def serialize_document(doc):
                     serialized = {}
@@ -223,24 +170,72 @@ def create_app():
                             serialized[key] = value
                     return serialized
 
-                data = [serialize_document(doc) for doc in data]
+                page = max(1, int(request.args.get('page', 1)))
+                per_page = max(1, int(request.args.get('per_page', 10)))
+                limit = request.args.get('limit', '10')
+                search_term = request.args.get('search', '')
+                search_criteria = request.args.get('search_criteria', 'all')
+                sort_field = request.args.get('sort_field', 'timestamp')
+                sort_order = 'asc' if request.args.get('sort_order', 'desc').lower() == 'asc' else 'desc'
+                after = request.args.get('after') or None
+                before = request.args.get('before') or None
+                estimated = request.args.get('estimated', 'false').lower() in ('true', '1', 'yes')
+                projection = parse_fields(request.args.get('fields'), SENSOR_FIELDS, SENSOR_LIST_PROJECTION)
+
+                if sort_field not in SENSOR_SORT_FIELDS:
+                    sort_field = 'timestamp'
+
+                try:
+                    sample = int(request.args.get('sample', 1))
+                    if sample < 1:
+                        sample = 1
+                except ValueError:
+                    sample = 1
 
-                total_count = len(data)
-                start_idx = (page - 1) * per_page
-                end_idx = start_idx + per_page
-                paginated_data = data[start_idx:end_idx]
+                window = None
+                if not search_term and limit != 'all':
+                    try:
+                        window = max(1, int(limit))
+                    except ValueError:
+                        window = 10
 
+                query = db.build_sensor_search_query(search_term, search_criteria)
+                streaming = limit == 'all' and (request.args.get('stream', 'false').lower() in ('true', '1', 'yes') or wants_ndjson())
+                if streaming:
+                    documents = db.iter_sensor_search(query, sort_field, sort_order, sample, projection=projection) if query is not None else []
+                    return stream_documents(documents, fields={
+                        "status": "success",
+                        "sort": {"field": sort_field, "order": sort_order},
+                        "search": {"term": search_term, "criteria": search_criteria}
+                    })
+
+                if query is None:
+                    result = {
+                        'data': [],
+                        'pagination': {'mode': 'page', 'page': page, 'per_page': per_page, 'total_count': 0,
+                                       'total_exact': True, 'total_source': 'exact', 'total_pages': 1,
+                                       'has_prev': page > 1, 'has_next': False, 'next_cursor': None, 'prev_cursor': None}
+                    }
+                else:
+                    result = db.find_sensor_page(
+                        query,
+                        sort_field=sort_field,
+                        sort_order=sort_order,
+                        page=page,
+                        per_page=per_page,
+                        window=window,
+                        sample=sample,
+                        projection=projection,
+                        after=after,
+                        before=before,
+                        estimated=estimated
+                    )
+
+                data = [serialize_document(doc) for doc in result['data']]
                 return {
                     "status": "success",
-                    "data": paginated_data,
-                    "pagination": {
-                        "page": page,
-                        "per_page": per_page,
-                        "total_count": total_count,
-                        "total_pages": (total_count + per_page - 1) // per_page,
-                        "has_prev": page > 1,
-                        "has_next": end_idx < total_count
-                    },
+                    "data": data,
+                    "pagination": result['pagination'],
                     "sort": {
                         "field": sort_field,
                         "order": sort_order
@@ -249,10 +244,12 @@ def create_app():
                         "term": search_term,
                         "criteria": search_criteria
                     },
-                    "count": len(paginated_data),
-                    "total_count": total_count
+                    "count": len(data),
+                    "total_count": result['pagination']['total_count']
                 }
 
+            except (InvalidCursorError, InvalidFieldsError) as e:
+                return {"status": "error", "message": str(e), "data": []}, 400
             except Exception as e:
                 return {
                     "error": f"Lỗi khi lấy danh sách dữ liệu: {str(e)}",
@@ -272,7 +269,6 @@ def create_app():
         def post(self):
             try:
                 from flask import request
-                from app.core.database import DatabaseManager
                 from datetime import datetime
 
                 data = request.get_json()
@@ -285,7 +281,6 @@ def create_app():
                 if 'timestamp' not in data:
                     data['timestamp'] = datetime.now()
 
-                db = DatabaseManager()
                 result = db.insert_sensor_data(data)
 
                 if result:
@@ -395,7 +390,11 @@ def create_app():
                             'sort_order': 'Thứ tự sắp xếp (asc, desc)',
                             'search': 'Từ khóa tìm kiếm',
                             'device_filter': 'Lọc theo thiết bị (all, LED1, LED2, LED3, LED4)',
-                            'state_filter': 'Lọc theo trạng thái (all, ON, OFF)'
+                            'state_filter': 'Lọc theo trạng thái (all, ON, OFF)',
+                            'after': 'Cursor trang kế tiếp (pagination.next_cursor), thay cho page',
+                            'before': 'Cursor trang trước (pagination.prev_cursor), thay cho page',
+                            'estimated': 'true để dùng tổng số bản ghi ước lượng (nhanh hơn) khi không có bộ lọc',
+                            'fields': 'Các trường cần trả về, phân tách bằng dấu phẩy (hoặc * để lấy toàn bộ document)'
                         },
                         responses={
                             200: 'Thành công - Trả về lịch sử hành động',
@@ -404,7 +403,6 @@ def create_app():
         def get(self):
             try:
                 from flask import request
-                from app.core.database import DatabaseManager
 
                 page = int(request.args.get('page', 1))
                 per_page = int(request.args.get('per_page', 10))
@@ -414,11 +412,14 @@ def create_app():
                 device_filter = request.args.get('device_filter', 'all')
                 state_filter = request.args.get('state_filter', 'all')
                 limit = int(request.args.get('limit', 0))
+                after = request.args.get('after') or None
+                before = request.args.get('before') or None
+                estimated = request.args.get('estimated', 'false').lower() in ('true', '1', 'yes')
+                projection = parse_fields(request.args.get('fields'), ACTION_HISTORY_FIELDS)
 
                 if limit > 0 and limit < per_page:
                     per_page = limit
 
-                db = DatabaseManager()
                 result = db.search_action_history(
                     search_term=search_term,
                     device_filter=device_filter,
@@ -426,7 +427,11 @@ def create_app():
                     sort_field=sort_field,
                     sort_order=sort_order,
                     page=page,
-                    per_page=per_page
+                    per_page=per_page,
+                    after=after,
+                    before=before,
+                    estimated=estimated,
+                    projection=projection
                 )
 
                 for doc in result['data']:
@@ -446,6 +451,8 @@ def create_app():
                     "total_count": result['pagination']['total_count']
                 }
 
+            except (InvalidCursorError, InvalidFieldsError) as e:
+                return {"status": "error", "message": str(e), "data": []}, 400
             except Exception as e:
                 return {"status": "error", "message": str(e), "data": []}, 500
 
@@ -456,21 +463,30 @@ def create_app():
                         params={
                             'limit': 'Giới hạn số bản ghi (mặc định: 50, có thể là "all")',
                             'date': 'Ngày cụ thể (YYYY-MM-DD)',
-                            'timePeriod': 'Khoảng thời gian (today, 1day, 2days)'
+                            'timePeriod': 'Khoảng thời gian (today, 1day, 2days)',
+                            'device_id': 'Mã thiết bị (tùy chọn)',
+                            'points': 'Số điểm tối đa trả về; dữ liệu dài hơn được giảm mẫu nhưng giữ các đỉnh',
+                            'method': 'Thuật toán giảm mẫu (lttb, minmax; mặc định: lttb)',
+                            'format': 'ndjson để nhận mỗi bản ghi trên một dòng (khi limit=all)',
+                            'fields': 'Các trường cần trả về (mặc định: timestamp, temperature, humidity, light; * để lấy toàn bộ)'
                         },
                         responses={
                             200: 'Thành công - Trả về dữ liệu cho biểu đồ',
+                            400: 'Tham số fields không hợp lệ',
                             500: 'Lỗi server - Không thể lấy dữ liệu biểu đồ'
                         })
         def get(self):
             try:
                 from flask import request
-                from app.core.database import DatabaseManager
                 from app.core.timezone_utils import get_vietnam_timezone, create_vietnam_datetime
 
                 limit_arg = request.args.get('limit', '50')
                 date_str = request.args.get('date', None)
                 time_period = request.args.get('timePeriod', None)
+                device_id = request.args.get('device_id') or None
+                points = request.args.get('points', type=int)
+                method = parse_method(request.args.get('method'))
+                projection = parse_fields(request.args.get('fields'), SENSOR_FIELDS, CHART_PROJECTION)
 
                 limit = 50
                 is_all_data = False
@@ -485,7 +501,15 @@ def create_app():
                     except (ValueError, TypeError):
                         limit = 50
 
-                db = DatabaseManager()
+                if is_all_data and not points:
+                    query = {'device_id': device_id} if device_id else {}
+                    if date_str:
+                        try:
+                            query = db.sensor_date_query(date_str, device_id)
+                        except ValueError:
+                            pass
+                    return stream_documents(db.iter_sensor_data(query, CHRONOLOGICAL, projection))
+
                 vn_tz = get_vietnam_timezone()
                 end_time = datetime.now(vn_tz)
 
@@ -497,20 +521,23 @@ def create_app():
                         )
                         start_time = selected_date_local
                         end_time = selected_date_local.replace(hour=23, minute=59, second=59, microsecond=999999)
-                        data = db.search_by_time_range_optimized(start_time, end_time)
+                        data = db.search_by_time_range_optimized(start_time, end_time, device_id=device_id, projection=projection)
                         data.sort(key=lambda x: x.get('timestamp') or datetime.min)
                         if not is_all_data and limit and len(data) > limit:
                             data = data[-limit:]
                     except ValueError:
-                        data = db.get_recent_data(limit=limit)
+                        data = db.get_recent_data(limit=limit, device_id=device_id, projection=projection)
                         data.sort(key=lambda x: x.get('timestamp') or datetime.min)
                 else:
                     if is_all_data:
-                        data = db.get_recent_data(limit=None)
+                        data = db.get_recent_data(limit=None, device_id=device_id, projection=projection)
                     else:
-                        data = db.get_recent_data(limit=limit)
+                        data = db.get_recent_data(limit=limit, device_id=device_id, projection=projection)
                     data.sort(key=lambda x: x.get('timestamp') or datetime.min)
 
+                if points:
+                    data = downsample_documents(data, points, method)
+
                 for doc in data:
                     if '_id' in doc:
                         doc['_id'] = str(doc['_id'])
@@ -520,6 +547,8 @@ def create_app():
 
                 return data
 
+            except (InvalidFieldsError, InvalidDownsamplingError) as e:
+                return {"error": str(e)}, 400
             except Exception as e:
                 return {"error": f"Lỗi khi lấy dữ liệu biểu đồ: {str(e)}"}, 500
 
@@ -533,28 +562,7 @@ def create_app():
                         })
         def get(self):
             try:
-                db = DatabaseManager()
-                collection = db.collection
-
-                cursor = collection.find({}, {"timestamp": 1}).sort("timestamp", -1)
-                data = list(cursor)
-
-                available_dates = set()
-                for item in data:
-                    if 'timestamp' in item:
-                        timestamp = item['timestamp']
-                        if isinstance(timestamp, datetime):
-                            date_str = timestamp.strftime("%Y-%m-%d")
-                            available_dates.add(date_str)
-                        elif isinstance(timestamp, str):
-                            try:
-                                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                                date_str = dt.strftime("%Y-%m-%d")
-                                available_dates.add(date_str)
-                            except:
-                                continue
-
-                available_dates = sorted(list(available_dates), reverse=True)
+                available_dates = db.get_available_dates(MONGODB_COLLECTION_NAME)
 
                 logger.info(f"Found {len(available_dates)} dates with sensor data")
 
@@ -582,28 +590,7 @@ def create_app():
                         })
         def get(self):
             try:
-                db = DatabaseManager()
-                action_collection = db.db.get_collection('action_history')
-
-                cursor = action_collection.find({}, {"timestamp": 1}).sort("timestamp", -1)
-                data = list(cursor)
-
-                available_dates = set()
-                for item in data:
-                    if 'timestamp' in item:
-                        timestamp = item['timestamp']
-                        if isinstance(timestamp, datetime):
-                            date_str = timestamp.strftime("%Y-%m-%d")
-                            available_dates.add(date_str)
-                        elif isinstance(timestamp, str):
-                            try:
-                                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                                date_str = dt.strftime("%Y-%m-%d")
-                                available_dates.add(date_str)
-                            except:
-                                continue
-
-                available_dates = sorted(list(available_dates), reverse=True)
+                available_dates = db.get_available_dates('action_history')
 
                 logger.info(f"Found {len(available_dates)} dates with LED action history data")
 
@@ -625,7 +612,9 @@ def create_app():
     class SensorDataByDate(Resource):
         @sensors_ns.doc('get_sensor_data_by_date',
                         description='Lấy tất cả dữ liệu cảm biến trong một ngày cụ thể',
-                        params={'date': 'Ngày cần lấy dữ liệu (format: YYYY-MM-DD)'},
+                        params={'date': 'Ngày cần lấy dữ liệu (format: YYYY-MM-DD)',
+                                'format': 'ndjson để nhận mỗi bản ghi trên một dòng',
+                                'fields': 'Các trường cần trả về, phân tách bằng dấu phẩy (hoặc * để lấy toàn bộ document)'},
                         responses={
                             200: 'Thành công',
                             400: 'Format ngày không hợp lệ',
@@ -634,44 +623,125 @@ def create_app():
         def get(self, date):
             try:
                 import re
+                from flask import request
                 if not re.match(r'^\d{4}-\d{2}-\d{2}$', date):
                     return {
                         "status": "error",
                         "message": "Format ngày không hợp lệ. Vui lòng dùng format: YYYY-MM-DD"
                     }, 400
 
-                db = DatabaseManager()
-                data = db.get_data_by_date(date)
+                try:
+                    projection = parse_fields(request.args.get('fields'), SENSOR_FIELDS)
+                except InvalidFieldsError as e:
+                    return {"status": "error", "message": str(e)}, 400
 
-                def serialize_document(doc):
-                    serialized = {}
-                    for key, value in doc.items():
-                        if isinstance(value, ObjectId):
-                            serialized[key] = str(value)
-                        elif isinstance(value, datetime):
-                            serialized[key] = value.isoformat()
-                        elif hasattr(value, 'isoformat'):
-                            serialized[key] = value.isoformat()
-                        else:
-                            serialized[key] = value
-                    return serialized
+                try:
+                    query = db.sensor_date_query(date)
+                except ValueError:
+                    return {
+                        "status": "error",
+                        "message": "Format ngày không hợp lệ. Vui lòng dùng format: YYYY-MM-DD"
+                    }, 400
+
+                return stream_documents(db.iter_sensor_data(query, [('timestamp', -1)], projection),
+                                        fields={"status": "success", "date": date})
+
+            except Exception as e:
+                logger.error(f"Error getting sensor data by date: {e}")
+                return {
+                    "status": "error",
+                    "message": str(e)
+                }, 500
+
+    @sensors_ns.route('/sensor-data/export')
+    class SensorDataExport(Resource):
+        @sensors_ns.doc('export_sensor_data',
+                        description='Xuất dữ liệu cảm biến theo khoảng thời gian (stream CSV, NDJSON, Arrow IPC hoặc Parquet)',
+                        params={
+                            'start': 'Thời điểm bắt đầu (ISO 8601, giờ Việt Nam nếu không có múi giờ)',
+                            'end': 'Thời điểm kết thúc (ISO 8601; YYYY-MM-DD bao gồm cả ngày đó)',
+                            'device_id': 'Mã thiết bị (tùy chọn)',
+                            'sensors': 'Danh sách cảm biến, phân tách bằng dấu phẩy (temperature, humidity, light)',
+                            'format': 'csv (mặc định), ndjson, arrow, parquet',
+                            'after': 'Tiếp tục sau timestamp của dòng cuối cùng đã nhận',
+                            'after_id': '_id của dòng cuối cùng đã nhận (dùng cùng after)',
+                            'limit': 'Số dòng tối đa trong lần xuất này'
+                        },
+                        responses={
+                            200: 'Thành công - Stream dữ liệu',
+                            400: 'Tham số không hợp lệ',
+                            500: 'Lỗi server'
+                        })
+        def get(self):
+            try:
+                from flask import request
+
+                export_format = request.args.get('format', 'csv').lower()
+                export_service.check_format(export_format)
+                sensors = parse_sensors(request.args.get('sensors'))
+                query = export_service.build_query(
+                    start=request.args.get('start'),
+                    end=request.args.get('end'),
+                    device_id=request.args.get('device_id') or None,
+                    after=request.args.get('after'),
+                    after_id=request.args.get('after_id')
+                )
+                limit = request.args.get('limit', type=int)
 
-                data = [serialize_document(doc) for doc in data]
+                rows = prefetch_first(export_service.iter_rows(query, sensors, limit=limit if limit and limit > 0 else None))
+                mimetype, extension = EXPORT_FORMATS[export_format]
+                logger.info(f"Exporting sensor data as {export_format}: {query}")
+                return stream_chunks(export_service.encode(export_format, rows, sensors), mimetype,
+                                     headers={'Content-Disposition': f'attachment; filename=sensor_data.{extension}'})
 
+            except ExportError as e:
+                return {"status": "error", "message": str(e)}, 400
+            except Exception as e:
+                logger.error(f"Error exporting sensor data: {e}")
+                return {"status": "error", "message": str(e)}, 500
+
+    @sensors_ns.route('/db-pool-stats')
+    class DatabasePoolStats(Resource):
+        @sensors_ns.doc('get_db_pool_stats',
+                        description='Lấy thống kê connection pool MongoDB (số kết nối, thời gian chờ checkout)',
+                        responses={
+                            200: 'Thành công',
+                            500: 'Lỗi server'
+                        })
+        def get(self):
+            try:
                 return {
                     "status": "success",
-                    "data": data,
-                    "count": len(data),
-                    "date": date
+                    "data": {**mongo_pool.get_stats(), "count_cache": count_cache.get_metrics(), "query_cache": query_cache.get_metrics(),
+                             "cache_generations": cache_generations.get_metrics()}
                 }
-
             except Exception as e:
-                logger.error(f"Error getting sensor data by date: {e}")
+                logger.error(f"Error getting database pool stats: {e}")
                 return {
                     "status": "error",
                     "message": str(e)
                 }, 500
 
+    @sensors_ns.route('/ingest-stats')
+    class IngestStats(Resource):
+        @sensors_ns.doc('get_ingest_stats',
+                        description='Lấy thống kê ghi dữ liệu cảm biến theo lô (kích thước lô, độ trễ flush)',
+                        responses={
+                            200: 'Thành công',
+                            503: 'MQTT receiver chưa chạy trong tiến trình này'
+                        })
+        def get(self):
+            if mqtt_receiver is None:
+                return {
+                    "status": "error",
+                    "message": "MQTT receiver không chạy trong tiến trình này (xem MQTT_EMBEDDED_RECEIVER, receiver.py)"
+                }, 503
+
+            return {
+                "status": "success",
+                "data": mqtt_receiver.get_ingest_metrics()
+            }
+
     @sensors_ns.route('/thresholds')
     class ThresholdResource(Resource):
         @sensors_ns.doc('get_thresholds',
@@ -754,7 +824,11 @@ def create_app():
     return app
 
 
+mqtt_receiver = None
+
+
 def start_mqtt_receiver():
+    global mqtt_receiver
     mqtt_receiver = IoTMQTTReceiver()
     mqtt_receiver.start_receiving()
 
@@ -774,7 +848,7 @@ def main():
     if debug_mode:
         is_main_process = (os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
 
-    if is_main_process:
+    if is_main_process and MQTT_EMBEDDED_RECEIVER:
         mqtt_thread = threading.Thread(target=start_mqtt_receiver, daemon=True)
         mqtt_thread.start()
 
@@ -0,0 +1,13 @@
+import signal
+from app.services.data_service import main
+from app.core.logger_config import logger
+
+
+def handle_sigterm(signum, frame):
+    logger.info("Received SIGTERM. Stopping receiver...")
+    raise KeyboardInterrupt
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+from app.core.cache_generations import CacheGenerations
+from app.core.count_cache import CountCache
+from app.core.query_cache import QueryCache
+
+
+class CounterCollection:
+
+    def __init__(self):
+        self.documents = {}
+
+    def find_one(self, query, projection=None):
+        return self.documents.get(query['_id'])
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        document = self.documents.setdefault(query['_id'], {'_id': query['_id'], 'value': 0})
+        document['value'] += update['$inc']['value']
+        return dict(document)
+
+
+class SharedGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        collection = CounterCollection()
+        patcher = mock.patch('app.core.cache_generations.mongo_pool.get_collection', return_value=collection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.web = CacheGenerations(poll_seconds=0)
+        self.receiver = CacheGenerations(poll_seconds=0)
+
+    def test_insert_from_other_process_invalidates_cached_page(self):
+        cache = QueryCache(max_bytes=1024 * 1024, ttl_seconds=3600)
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return {'page': len(loads)}
+
+        with mock.patch('app.core.query_cache.cache_generations', self.web):
+            self.assertEqual(cache.get_or_load('sensor_data', {'page': 1}, loader), {'page': 1})
+            self.assertEqual(cache.get_or_load('sensor_data', {'page': 1}, loader), {'page': 1})
+            self.receiver.bump('sensor_data')
+            self.assertEqual(cache.get_or_load('sensor_data', {'page': 1}, loader), {'page': 2})
+
+    def test_insert_from_other_process_invalidates_cached_count(self):
+        cache = CountCache(max_entries=16, ttl_seconds=3600)
+        cache.set('sensor_data', {}, 10, self.web.current('sensor_data'))
+        self.assertEqual(cache.get('sensor_data', {}, self.web.current('sensor_data')), 10)
+
+        self.receiver.bump('sensor_data')
+        self.assertIsNone(cache.get('sensor_data', {}, self.web.current('sensor_data')))
+
+    def test_local_insert_increments_cached_count(self):
+        cache = CountCache(max_entries=16, ttl_seconds=3600)
+        cache.set('sensor_data', {}, 10, self.web.current('sensor_data'))
+
+        generation = self.web.bump('sensor_data')
+        cache.record_inserts('sensor_data', [{'temperature': 25.0}], generation)
+        self.assertEqual(cache.get('sensor_data', {}, self.web.current('sensor_data')), 11)
+
+        self.receiver.bump('sensor_data')
+        generation = self.web.bump('sensor_data')
+        cache.record_inserts('sensor_data', [{'temperature': 25.0}], generation)
+        self.assertIsNone(cache.get('sensor_data', {}, self.web.current('sensor_data')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from bson import json_util
+from app.services.ingest_pipeline import IngestPipeline, RELOADING_SUFFIX
+from app.services.spool_service import SPOOL_JSON_OPTIONS
+
+READING = {'temperature': 25.0, 'humidity': 60.0, 'light': 40.0}
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+class IngestPipelineSpillTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spill_dir = tempfile.mkdtemp()
+        self.spill_path = os.path.join(self.spill_dir, 'spill.ndjson')
+        self.handled = []
+
+    def tearDown(self):
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def _write_spill(self, batches):
+        with open(self.spill_path, 'w', encoding='utf-8') as f:
+            for batch in batches:
+                f.write(json_util.dumps(batch, json_options=SPOOL_JSON_OPTIONS) + '\n')
+
+    def _handler(self, readings):
+        self.handled.extend(readings)
+        return True
+
+    def test_reloads_spill_file_left_by_previous_run(self):
+        self._write_spill([[dict(READING)], [dict(READING), dict(READING)]])
+        pipeline = IngestPipeline(self._handler, workers=1, spill_path=self.spill_path)
+        try:
+            self.assertTrue(wait_for(lambda: len(self.handled) == 3))
+            self.assertFalse(os.path.exists(self.spill_path))
+            self.assertFalse(os.path.exists(self.spill_path + RELOADING_SUFFIX))
+            self.assertEqual(pipeline.get_metrics()['unspilled'], 3)
+        finally:
+            pipeline.stop(timeout=1)
+
+    def test_keeps_spilled_readings_when_processing_fails(self):
+        self._write_spill([[dict(READING)], [dict(READING)]])
+        failures = []
+
+        def flaky_handler(readings):
+            if not failures:
+                failures.append(True)
+                raise RuntimeError('database went away')
+            return self._handler(readings)
+
+        pipeline = IngestPipeline(flaky_handler, workers=1, spill_path=self.spill_path)
+        try:
+            self.assertTrue(wait_for(lambda: len(self.handled) == 2))
+            self.assertFalse(os.path.exists(self.spill_path + RELOADING_SUFFIX))
+        finally:
+            pipeline.stop(timeout=1)
+
+    def test_counts_each_reading_dropped_after_stop(self):
+        pipeline = IngestPipeline(self._handler, workers=1, spill_path=None)
+        pipeline.stop(timeout=1)
+        self.assertFalse(pipeline.submit([dict(READING), dict(READING), dict(READING)]))
+        self.assertEqual(pipeline.get_metrics()['dropped'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
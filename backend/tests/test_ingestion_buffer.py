@@ -0,0 +1,44 @@
+import time
+import unittest
+from app.services.ingestion_buffer import SensorIngestionBuffer
+
+
+class RecordingDatabase:
+
+    def __init__(self):
+        self.batches = []
+
+    def insert_sensor_data_batch(self, documents):
+        self.batches.append(list(documents))
+        return len(documents)
+
+
+class SensorIngestionBufferTest(unittest.TestCase):
+
+    def test_flushes_partial_batch_after_max_age(self):
+        db = RecordingDatabase()
+        buffer = SensorIngestionBuffer(db, max_batch_size=100, max_batch_age=0.2)
+        try:
+            buffer.add_many([{'temperature': 20.0 + i} for i in range(3)])
+            deadline = time.monotonic() + 2
+            while not db.batches and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual([len(batch) for batch in db.batches], [3])
+        finally:
+            buffer.close()
+
+    def test_flushes_full_batch_immediately(self):
+        db = RecordingDatabase()
+        buffer = SensorIngestionBuffer(db, max_batch_size=5, max_batch_age=60)
+        try:
+            buffer.add_many([{'temperature': 20.0 + i} for i in range(5)])
+            deadline = time.monotonic() + 2
+            while not db.batches and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual([len(batch) for batch in db.batches], [5])
+        finally:
+            buffer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
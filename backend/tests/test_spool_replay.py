@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from app.services.data_service import IoTMQTTReceiver
+from app.services.dedup_service import DuplicateFilter
+from app.services.spool_service import SensorSpool
+from app.services.validation_service import DataValidator
+
+
+class CapturingPipeline:
+
+    def __init__(self):
+        self.readings = []
+
+    def submit(self, readings, device_id=None):
+        self.readings.extend(readings)
+        return True
+
+
+class StampingDatabase:
+
+    def __init__(self):
+        self.documents = []
+
+    def insert_sensor_data_batch(self, documents):
+        for document in documents:
+            document.setdefault('timestamp', datetime.now(timezone.utc))
+        self.documents.extend(documents)
+        return len(documents)
+
+
+class SpoolReplayTimestampTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def test_replayed_readings_keep_receive_time(self):
+        receiver = IoTMQTTReceiver.__new__(IoTMQTTReceiver)
+        receiver.duplicate_filter = DuplicateFilter()
+        receiver.ingest_pipeline = CapturingPipeline()
+
+        before = datetime.now(timezone.utc).replace(microsecond=0)
+        receiver.process_sensor_data({'temperature': 25.0, 'humidity': 60.0, 'light': 40.0}, device_id='esp32-01')
+        after = datetime.now(timezone.utc)
+        valid, rejected = DataValidator.validate_sensor_batch(receiver.ingest_pipeline.readings)
+        self.assertEqual((len(valid), rejected), (1, []))
+
+        spool = SensorSpool(self.spool_dir)
+        spool.mark_unavailable()
+        self.assertEqual(spool.append_many(valid), 1)
+        time.sleep(0.2)
+
+        db = StampingDatabase()
+        replay_started = datetime.now(timezone.utc)
+        self.assertEqual(spool.replay(db), 1)
+
+        timestamp = db.documents[0]['timestamp']
+        self.assertTrue(before <= timestamp <= after)
+        self.assertLess(timestamp, replay_started)
+
+    def test_device_timestamp_is_not_overwritten(self):
+        receiver = IoTMQTTReceiver.__new__(IoTMQTTReceiver)
+        receiver.duplicate_filter = DuplicateFilter()
+        receiver.ingest_pipeline = CapturingPipeline()
+
+        receiver.process_sensor_data({'temperature': 25.0, 'humidity': 60.0, 'light': 40.0, 'ts': 1735750800000})
+        reading = receiver.ingest_pipeline.readings[0]
+        self.assertNotIn('timestamp', reading)
+        self.assertEqual(reading['ts'], 1735750800000)
+
+
+if __name__ == '__main__':
+    unittest.main()